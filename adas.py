@@ -1,19 +1,10 @@
 import pandas as pd
-import bar_chart_race as bcr
 import matplotlib.pyplot as plt
+import matplotlib.animation as animation
+import frame_trace
+from bar_race import BarRace, resample_pchip
 
-# Патч для совместимости с pandas 2.x (если у тебя новая версия pandas)
-_original_fillna = pd.core.generic.NDFrame.fillna
-
-def _fillna_compat(self, *args, **kwargs):
-    method = kwargs.get('method') if 'method' in kwargs else (args[0] if len(args) > 0 and isinstance(args[0], str) else None)
-    if method == 'ffill':
-        return self.ffill()
-    if method == 'bfill':
-        return self.bfill()
-    return _original_fillna(self, *args, **kwargs)
-
-pd.core.generic.NDFrame.fillna = _fillna_compat
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # Данные
 data = {
@@ -28,7 +19,7 @@ df['Year'] = pd.to_datetime(df['Year'])
 df = df.set_index('Year')
 
 # Интерполяция для плавной анимации
-df_interpolated = df.resample('MS').interpolate(method='pchip').round(1)
+df_interpolated = resample_pchip(df, 'MS').round(1)
 
 # Стили
 plt.rcParams.update({
@@ -72,30 +63,18 @@ def summary_func(values, ranks):
         'bbox': bbox
     }
 
-print("Рендерим анимацию...")
+STEPS_PER_PERIOD = 5
+PERIOD_LENGTH = 300  # мс на месяц
 
-bcr.bar_chart_race(
-    df=df_interpolated,
-    filename='adas_share_by_segment.mp4',
-    orientation='h',
-    sort='desc',
+race = BarRace(
+    df_interpolated, ax,
     n_bars=3,
-    fixed_order=False,
+    steps_per_period=STEPS_PER_PERIOD,
     fixed_max=True,
-    steps_per_period=5,
-    period_length=300,
-    dpi=100,
-    cmap=colors,
-
-    # Заголовок
-    title={
-        'label': 'Share of Models with ADAS L2+ by Segment',
-        'size': 18,
-        'weight': 'bold',
-        'color': '#000000',
-        'loc': 'center',
-        'pad': 20
-    },
+    fixed_order=False,
+    colors=colors,
+    value_kw={'size': 12, 'weight': 'bold'},
+    name_kw={'size': 11, 'weight': 'bold'},
 
     period_label={
         'x': 0.95,
@@ -106,13 +85,21 @@ bcr.bar_chart_race(
         'color': '#202020',
         'weight': 'bold'
     },
+    period_fmt='%Y',
 
     period_summary_func=summary_func,
-    fig=fig,
-    bar_label_size=12,
-    tick_label_size=11,
-    shared_fontdict={'weight': 'bold'},
-    filter_column_colors=True,
 )
 
-print("Готово! Файл сохранён как: adas_share_by_segment.mp4")
\ No newline at end of file
+# Заголовок по центру фигуры (оси сдвинуты вправо под подписи), 15pt — влезает в ширину 6"
+fig.suptitle('Share of Models with ADAS L2+ by Segment', size=15, weight='bold', color='#000000', y=0.975)
+ax.tick_params(axis='x', labelsize=11)
+for spine in ['top', 'right']:
+    ax.spines[spine].set_visible(False)
+
+if __name__ == '__main__':
+    print("Рендерим анимацию...")
+    writer = animation.FFMpegWriter(fps=1000 / race.interval(PERIOD_LENGTH))
+    ani = animation.FuncAnimation(fig, TRACE.hook(fig, race.update), frames=len(race),
+                                  interval=race.interval(PERIOD_LENGTH))
+    ani.save('adas_share_by_segment.mp4', writer=writer, dpi=100)
+    print("Готово! Файл сохранён как: adas_share_by_segment.mp4")
@@ -0,0 +1,420 @@
+"""
+ДВИЖОК БАР-ГОНОК: ПЛАВНЫЕ ПЕРЕХОДЫ И ПОСТОЯННЫЕ АРТИСТЫ
+
+RaceTimeline заранее считает для каждого кадра между шагами (годами):
+    ids        — какая сущность в каком слоте (-1 — слот пуст)
+    values     — длина бара (интерполяция со сглаживанием)
+    positions  — дробная позиция по рангу (0 — нижний бар), обмен местами плавный
+    alphas     — прозрачность: вход в top-N снизу с проявлением, выход вниз с затуханием
+Все массивы (кадры × слоты) строятся векторно, на кадре — только индексирование.
+
+BarPool — фиксированный набор баров / подписей / логотипов, созданных один
+раз: кадр только двигает и перекрашивает их, без ax.clear() и новых артистов.
+
+    tl = RaceTimeline(steps, step_labels, n=10, frames_per_step=60)
+    pool = BarPool(ax, tl.slots)
+    def update(i):
+        pool.update(tl.ids[i], tl.values[i], tl.positions[i], tl.alphas[i], colors=..., labels=...)
+
+TopK — top-k по кадрам матрицы кадры × сущности (тысячи участников):
+цена кадра зависит от k, а не от числа сущностей.
+
+BarRace — готовая гонка по широкой таблице (индекс — периоды, колонки —
+участники) вместо пакета bar_chart_race; resample_pchip — помесячная
+PCHIP-интерполяция без scipy.
+
+    race = BarRace(resample_pchip(df, 'MS'), ax, n_bars=3, steps_per_period=5, fixed_max=True)
+    ani = animation.FuncAnimation(fig, race.update, frames=len(race), interval=race.interval(300))
+"""
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+
+
+# --- СГЛАЖИВАНИЕ ---
+def ease_in_out_cubic(t):
+    t = np.asarray(t, dtype=np.float64)
+    return np.where(t < 0.5, 4 * t**3, 1 - (-2 * t + 2)**3 / 2)
+
+
+def ease_out_sine(t):
+    return np.sin(np.asarray(t, dtype=np.float64) * (np.pi / 2))
+
+
+def linear(t):
+    return np.asarray(t, dtype=np.float64)
+
+
+# --- PCHIP-ИНТЕРПОЛЯЦИЯ ---
+def _pchip_slopes(x, y):
+    """Производные в узлах по Фричу-Карлсону (как PchipInterpolator в scipy); y — узлы × колонки"""
+    h = np.diff(x)[:, None]
+    m = np.diff(y, axis=0) / h
+    d = np.zeros_like(y)
+    if len(x) == 2:
+        d[:] = m[0]
+        return d
+    # Внутренние узлы: взвешенное гармоническое среднее, 0 на экстремумах
+    w1, w2 = 2 * h[1:] + h[:-1], h[1:] + 2 * h[:-1]
+    same = (m[:-1] * m[1:]) > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d[1:-1] = np.where(same, (w1 + w2) / (w1 / m[:-1] + w2 / m[1:]), 0.0)
+
+    # Края: трехточечная формула с ограничением монотонности
+    def edge(h0, h1, m0, m1):
+        e = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+        e = np.where(np.sign(e) != np.sign(m0), 0.0, e)
+        return np.where((np.sign(m0) != np.sign(m1)) & (np.abs(e) > 3 * np.abs(m0)), 3 * m0, e)
+    d[0] = edge(h[0], h[1], m[0], m[1])
+    d[-1] = edge(h[-1], h[-2], m[-1], m[-2])
+    return d
+
+
+def pchip(x, y, x_new):
+    """Монотонный кубический сплайн по всем колонкам y сразу"""
+    x, x_new = np.asarray(x, np.float64), np.asarray(x_new, np.float64)
+    y = np.asarray(y, np.float64).reshape(len(x), -1)
+    d = _pchip_slopes(x, y)
+    k = np.clip(np.searchsorted(x, x_new, side='right') - 1, 0, len(x) - 2)
+    h = (x[k + 1] - x[k])[:, None]
+    t = ((x_new - x[k])[:, None]) / h
+    t2, t3 = t * t, t * t * t
+    return ((2 * t3 - 3 * t2 + 1) * y[k] + (t3 - 2 * t2 + t) * h * d[k]
+            + (-2 * t3 + 3 * t2) * y[k + 1] + (t3 - t2) * h * d[k + 1])
+
+
+def resample_pchip(df, freq='MS'):
+    """Аналог df.resample(freq).interpolate(method='pchip') для таблицы с датами в индексе"""
+    index = df.resample(freq).asfreq().index
+    x = df.index.asi8 / 86400e9
+    return pd.DataFrame(pchip(x, df.to_numpy(np.float64), index.asi8 / 86400e9),
+                        index=index, columns=df.columns)
+
+
+# --- ТАЙМЛАЙН ---
+def steps_from_matrix(values, n):
+    """
+    Шаги из матрицы (шаги × сущности, NaN — нет данных): для каждой строки
+    top-n сущностей по возрастанию значения -> список (ids, values)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    steps = []
+    for row in values:
+        ok = np.flatnonzero(~np.isnan(row))
+        top = ok[np.argsort(-row[ok], kind='stable')[:n]][::-1]
+        steps.append((top, row[top]))
+    return steps
+
+
+class TopK:
+    """
+    Top-k сущностей на каждом кадре без ранжирования всех сущностей.
+
+    values — опорные кадры × сущности (NaN — нет данных); между соседними
+    опорными кадрами frames_per_step кадров линейной смеси (1 — каждый кадр
+    опорный). Смесь лежит между концами, поэтому на отрезке из block шагов
+    в top-k может попасть только сущность, чей максимум на отрезке не ниже
+    k-го по величине минимума: кандидаты считаются один раз на отрезок,
+    кадр — argpartition по кандидатам и досортировка от порядка прошлого
+    кадра (почти упорядоченный массив, равные значения не мигают).
+
+        top = TopK(df.to_numpy(), k=10)
+        ids, vals = top(i)     # снизу вверх: последний — лидер
+    """
+
+    def __init__(self, values, k, largest=True, frames_per_step=1, block=16):
+        values = np.asarray(values, dtype=np.float64)
+        self.sign = 1.0 if largest else -1.0
+        self.values = values * self.sign
+        self.k, self.frames_per_step = k, frames_per_step
+        self.block = block if frames_per_step == 1 else 1   # Смесь: отрезок — пара опорных кадров
+        self.n_steps = len(values)
+        self._cand = {}
+        self._pos = np.full(values.shape[1], -1, dtype=np.int64)   # Место в прошлом кадре
+        self._prev = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return (self.n_steps - 1) * self.frames_per_step + 1
+
+    def step(self, i):
+        """Опорный кадр и доля перехода к следующему"""
+        s, alpha = divmod(i, self.frames_per_step)
+        alpha /= self.frames_per_step
+        if s >= self.n_steps - 1:
+            s, alpha = max(self.n_steps - 2, 0), 1.0 if self.n_steps > 1 else 0.0
+        return s, alpha
+
+    def candidates(self, g):
+        c = self._cand.get(g)
+        if c is None:
+            rows = self.values[g * self.block:(g + 1) * self.block + 1]
+            lo = np.where(np.isnan(rows), -np.inf, rows).min(axis=0)
+            hi = np.fmax.reduce(rows, axis=0)
+            n = len(lo)
+            bound = np.partition(lo, n - self.k)[n - self.k] if n > self.k else -np.inf
+            c = self._cand[g] = np.flatnonzero(hi >= bound)
+        return c
+
+    def __call__(self, i):
+        s, alpha = self.step(i)
+        c = self.candidates(s // self.block)
+        row = self.values[s, c]
+        if alpha:
+            row = row * (1 - alpha) + self.values[min(s + 1, self.n_steps - 1), c] * alpha
+        ok = ~np.isnan(row)
+        c, row = c[ok], row[ok]
+        if len(c) > self.k:
+            sel = np.argpartition(row, len(c) - self.k)[len(c) - self.k:]
+            c, row = c[sel], row[sel]
+        # Порядок прошлого кадра (новички снизу), затем устойчивая досортировка
+        start = np.argsort(self._pos[c], kind='stable')
+        order = start[np.argsort(row[start], kind='stable')]
+        ids = c[order]
+        self._pos[self._prev] = -1
+        self._pos[ids] = np.arange(len(ids))
+        self._prev = ids
+        return ids, row[order] * self.sign
+
+
+class RaceTimeline:
+    """
+    Покадровые состояния баров между шагами; steps — [(ids, values) снизу вверх]
+    или [(ids, values, tags)]: tags — подпись сущности на этом шаге (например,
+    объем двигателя того года), покадрово в self.tags. Тег, как и подпись шага,
+    меняется в середине перехода; у входящей/уходящей сущности — тег ее шага.
+    """
+
+    def __init__(self, steps, step_labels, n=10, frames_per_step=60, hold_frames=0,
+                 ease=ease_in_out_cubic, enter_from=-1.0):
+        self.n, self.slots = n, 2 * n
+        ids, vals, pos, alpha, label, tags = [], [], [], [], [], []
+        has_tags = len(steps[0]) > 2
+        t = ease(np.arange(frames_per_step) / frames_per_step)[:, None]
+        half = frames_per_step // 2
+
+        for s in range(len(steps) - 1):
+            (ia, va), (ib, vb) = steps[s][:2], steps[s + 1][:2]
+            u = np.union1d(ia, ib)                    # ≤ 2n сущностей перехода
+            pa, pb = self._lookup(u, ia), self._lookup(u, ib)
+            a_in, b_in = pa >= 0, pb >= 0
+            va_u = np.where(a_in, np.asarray(va, np.float64)[pa], np.nan)
+            vb_u = np.where(b_in, np.asarray(vb, np.float64)[pb], np.nan)
+
+            # Вход: снизу, с нуля и с проявлением; выход: вниз с прежней длиной и затуханием
+            p0 = np.where(a_in, pa, enter_from); p1 = np.where(b_in, pb, enter_from)
+            v0 = np.where(a_in, va_u, 0.0);      v1 = np.where(b_in, vb_u, va_u)
+            # Затухание в первой половине перехода, проявление — во второй: подписи не накладываются
+            fade_out, fade_in = np.clip(1 - 2 * t, 0, 1), np.clip(2 * t - 1, 0, 1)
+
+            ids.append(np.broadcast_to(self._pad(u, -1), (frames_per_step, self.slots)))
+            vals.append(self._pad_rows(v0 + (v1 - v0) * t))
+            pos.append(self._pad_rows(p0 + (p1 - p0) * t, enter_from))
+            alpha.append(self._pad_rows(np.where(a_in & b_in, 1.0, np.where(a_in, fade_out, fade_in))))
+            label += [step_labels[s]] * half + [step_labels[s + 1]] * (frames_per_step - half)
+            if has_tags:
+                ta_u = np.asarray(steps[s][2], object)[pa]
+                tb_u = np.asarray(steps[s + 1][2], object)[pb]
+                first, second = np.where(a_in, ta_u, tb_u), np.where(b_in, tb_u, ta_u)
+                tags.append(np.broadcast_to(self._pad(first, None), (half, self.slots)))
+                tags.append(np.broadcast_to(self._pad(second, None), (frames_per_step - half, self.slots)))
+
+        # Последний шаг статично + пауза в конце
+        il, vl = steps[-1][:2]
+        last = 1 + hold_frames
+        ids.append(np.broadcast_to(self._pad(np.asarray(il), -1), (last, self.slots)))
+        vals.append(np.broadcast_to(self._pad(np.asarray(vl, np.float64), 0.0), (last, self.slots)))
+        pos.append(np.broadcast_to(self._pad(np.arange(len(il), dtype=np.float64), enter_from),
+                                   (last, self.slots)))
+        alpha.append(np.broadcast_to(self._pad(np.ones(len(il)), 0.0), (last, self.slots)))
+        label += [step_labels[-1]] * last
+        if has_tags:
+            tags.append(np.broadcast_to(self._pad(np.asarray(steps[-1][2], object), None), (last, self.slots)))
+
+        self.ids = np.concatenate(ids).astype(np.int64)
+        self.values = np.concatenate(vals)
+        self.positions = np.concatenate(pos)
+        self.alphas = np.concatenate(alpha)
+        self.labels = label
+        self.tags = np.concatenate(tags) if has_tags else None
+        # Максимум видимых баров на кадре — для динамической шкалы
+        self.frame_max = np.nanmax(np.where(self.alphas > 0, self.values, np.nan), axis=1, initial=0.0)
+
+    @staticmethod
+    def _lookup(u, ids):
+        """Номер позиции каждой сущности u в ids (снизу вверх) или -1"""
+        where = {e: i for i, e in enumerate(np.asarray(ids).tolist())}
+        return np.array([where.get(e, -1) for e in u.tolist()], dtype=np.int64)
+
+    def _pad(self, row, fill):
+        row = np.asarray(row)
+        out = np.full(self.slots, fill, dtype=row.dtype)
+        out[:len(row)] = row
+        return out
+
+    def _pad_rows(self, rows, fill=0.0):
+        out = np.full((rows.shape[0], self.slots), fill, dtype=np.float64)
+        out[:, :rows.shape[1]] = rows
+        return out
+
+    def __len__(self):
+        return len(self.labels)
+
+
+# --- ПОСТОЯННЫЕ АРТИСТЫ ---
+class BarPool:
+    """
+    slots горизонтальных баров с подписью и (необязательно) логотипом.
+    Артисты создаются один раз; update только меняет их свойства.
+    """
+
+    def __init__(self, ax, slots, height=0.8, bar_kw=None, text_kw=None, logo_zoom=None, logo_kw=None,
+                 name_kw=None, text_sprites=None):
+        self.ax, self.height = ax, height
+        self.bars = list(ax.barh(np.zeros(slots), np.zeros(slots), height=height, **(bar_kw or {})))
+        # Подписи: обычный текст или готовые растры (text_sprites.TextSprites) — стиль тогда задан в кэше
+        self.sprites = text_sprites
+        if text_sprites:
+            kw = text_kw or {}
+            self.texts = [text_sprites.artist(ax, (0, 0), '', ha=kw.get('ha', 'left'), va=kw.get('va', 'center'),
+                                              zorder=kw.get('zorder', 5)) for _ in range(slots)]
+        else:
+            self.texts = [ax.text(0, 0, '', **(text_kw or {})) for _ in range(slots)]
+        # Имена слева от оси (вместо подписей делений, которые пришлось бы пересоздавать)
+        self.names = [] if name_kw is None else [
+            ax.text(-0.01, 0, '', transform=ax.get_yaxis_transform(), **dict(dict(ha='right', va='center'), **name_kw))
+            for _ in range(slots)]
+        self.logos, self._logo_ids = [], [None] * slots
+        if logo_zoom:
+            blank = np.zeros((1, 1, 4))
+            for _ in range(slots):
+                ab = AnnotationBbox(OffsetImage(blank, zoom=logo_zoom), (0, 0), frameon=False,
+                                    **(logo_kw or {}))
+                ab.set_visible(False)
+                ax.add_artist(ab)
+                self.logos.append(ab)
+
+    def update(self, ids, values, positions, alphas, colors, labels, text_x, logos=None, logo_x=None,
+               names=None):
+        """
+        colors / labels / logos / names — значения по слотам (логотип None — скрыт);
+        text_x / logo_x — координаты подписей и логотипов по слотам.
+        """
+        h = self.height
+        for k, (eid, v, y, a) in enumerate(zip(ids, values, positions, alphas)):
+            bar, txt = self.bars[k], self.texts[k]
+            visible = eid >= 0 and a > 0
+            bar.set_visible(visible); txt.set_visible(visible)
+            if self.names:
+                self.names[k].set_visible(visible)
+            if self.logos:
+                self.logos[k].set_visible(bool(visible and logos is not None and logos[k] is not None))
+            if not visible:
+                continue
+            bar.set_y(y - h / 2); bar.set_width(v)
+            bar.set_facecolor(colors[k]); bar.set_alpha(a)
+            if self.sprites:
+                txt.xy = (text_x[k], y); self.sprites.set(txt, labels[k])
+                txt.offsetbox.get_children()[0].set_alpha(a)
+            else:
+                txt.set_position((text_x[k], y)); txt.set_text(labels[k]); txt.set_alpha(a)
+            if self.names:
+                self.names[k].set_y(y); self.names[k].set_text(names[k]); self.names[k].set_alpha(a)
+            if self.logos and logos is not None and logos[k] is not None:
+                ab = self.logos[k]
+                if self._logo_ids[k] != eid:
+                    ab.offsetbox.set_data(logos[k]); self._logo_ids[k] = eid
+                ab.xy = (logo_x[k], y)
+                ab.offsetbox.get_children()[0].set_alpha(a)
+        return self.bars + self.texts + self.names + self.logos
+
+
+# --- ГОТОВАЯ ГОНКА ПО ТАБЛИЦЕ ---
+class BarRace:
+    """
+    Бар-гонка по широкой таблице: строки — периоды, колонки — участники.
+    Между периодами steps_per_period кадров; fixed_max — постоянная шкала X,
+    fixed_order — порядок колонок вместо сортировки по значению.
+
+    period_summary_func(values, ranks) -> dict(x, y, s, **свойства текста) —
+    плашка поверх графика (как в bar_chart_race), координаты в долях осей.
+    """
+
+    def __init__(self, df, ax, n_bars=None, steps_per_period=10, fixed_max=False, fixed_order=False,
+                 colors=None, ease=linear, bar_kw=None, value_kw=None, name_kw=None, value_fmt='{:,.1f}',
+                 period_label=None, period_fmt='%Y-%m', period_summary_func=None):
+        self.df, self.ax = df, ax
+        self.columns = np.asarray(df.columns.astype(str))
+        self.matrix = df.to_numpy(np.float64)
+        self.spp, self.ease = steps_per_period, ease
+        self.value_fmt, self.summary_func = value_fmt, period_summary_func
+        n = n_bars or len(self.columns)
+
+        if fixed_order:
+            order = np.arange(min(n, len(self.columns)))[::-1]   # Первая колонка — сверху
+            steps = [(order, row[order]) for row in self.matrix]
+        else:
+            steps = steps_from_matrix(self.matrix, n)
+        labels = [p.strftime(period_fmt) if hasattr(p, 'strftime') else str(p) for p in df.index]
+        self.timeline = tl = RaceTimeline(steps, labels, n=n, frames_per_step=steps_per_period, ease=ease)
+
+        colors = colors or [matplotlib.colormaps['tab10'](i % 10) for i in range(len(self.columns))]
+        self.colors = [colors[i % len(colors)] for i in range(len(self.columns))]
+
+        # Оформление — один раз
+        ax.set_yticks([])
+        ax.set_ylim(-0.6, n - 0.4)
+        self.fixed_max = np.nanmax(self.matrix) * 1.05 if fixed_max else None
+        if self.fixed_max:
+            ax.set_xlim(0, self.fixed_max)
+        self.pool = BarPool(ax, tl.slots, bar_kw=bar_kw,
+                            text_kw=dict(dict(ha='left', va='center'), **(value_kw or {})),
+                            name_kw=dict(name_kw or {}))
+        self.period = None
+        if period_label is not None:
+            kw = dict(period_label if isinstance(period_label, dict) else {'x': 0.95, 'y': 0.1, 'ha': 'right'})
+            self.period = ax.text(kw.pop('x'), kw.pop('y'), '', transform=ax.transAxes, **kw)
+        self.summary = ax.text(0, 0, '', transform=ax.transAxes) if period_summary_func else None
+
+    def __len__(self):
+        return len(self.timeline)
+
+    def interval(self, period_length):
+        """Интервал кадра, мс, если период длится period_length мс"""
+        return period_length / self.spp
+
+    def frame_values(self, i):
+        """Значения всех колонок на кадре i (та же интерполяция, что у баров)"""
+        s, k = divmod(i, self.spp)
+        if s >= len(self.matrix) - 1:
+            row = self.matrix[-1]
+        else:
+            row = self.matrix[s] + (self.matrix[s + 1] - self.matrix[s]) * float(self.ease(k / self.spp))
+        return pd.Series(row, index=self.columns, name=self.df.index[min(s, len(self.df) - 1)])
+
+    def update(self, i):
+        tl = self.timeline
+        ids, values = tl.ids[i], tl.values[i]
+        live = np.maximum(ids, 0)
+        x_max = self.fixed_max or max(tl.frame_max[i] * 1.05, 1e-9)
+        if not self.fixed_max:
+            self.ax.set_xlim(0, x_max)
+
+        artists = self.pool.update(
+            ids, values, tl.positions[i], tl.alphas[i],
+            colors=[self.colors[e] for e in live],
+            labels=[self.value_fmt.format(v) for v in values],
+            text_x=values + x_max * 0.01,
+            names=self.columns[live])
+        if self.period is not None:
+            self.period.set_text(tl.labels[i])
+            artists.append(self.period)
+        if self.summary is not None:
+            values = self.frame_values(i)
+            kw = dict(self.summary_func(values, values.rank(method='first')))
+            self.summary.set_position((kw.pop('x', 0), kw.pop('y', 0)))
+            self.summary.set_text(kw.pop('s', ''))
+            self.summary.update(kw)
+            artists.append(self.summary)
+        return artists
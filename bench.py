@@ -0,0 +1,232 @@
+"""
+БЕНЧМАРКИ РЕНДЕРА: БАР-ГОНКИ И ФРАКТАЛЫ
+
+Каждый сценарий — уменьшенная версия настоящего кадра (низкий DPI / 1/8
+разрешения) с фиксированным seed. Сценарий запускается в отдельном процессе,
+чтобы честно мерить:
+    ttff   — время от старта интерпретатора до готового первого кадра, с
+    fps    — кадров в секунду после первого кадра
+    peak   — пиковая память процесса (max RSS), МБ
+
+Результат сравнивается с базовой линией (bench_baseline.json). Регрессия —
+падение fps или рост ttff / памяти больше допуска; код выхода тогда 1.
+Упавший сценарий тоже дает код 1, и базовая линия тогда не сохраняется.
+Базовая линия снимается на своей машине: python bench.py --save-baseline
+
+Запуск:
+    python bench.py                         # все сценарии, сравнение с базовой линией
+    python bench.py race_chart top --frames 60
+    python bench.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# --- НАСТРОЙКИ ---
+SETTINGS = {
+    'BASELINE': 'bench_baseline.json',
+    'FRAMES': 30,          # Кадров на сценарий (после первого)
+    'SEED': 42,
+    'MPL_DPI': 40,         # DPI фигур matplotlib в сценариях бар-гонок
+    'FRACTAL_DIV': 8,      # Делитель разрешения 4K для фрактальных ядер
+    'TOLERANCE': {'fps': 0.15, 'ttff': 0.25, 'peak_mb': 0.20},
+}
+
+
+# --- СЦЕНАРИИ (выполняются в дочернем процессе) ---
+# Каждая функция готовит данные и возвращает frame(i), рисующую один кадр целиком.
+
+def _mpl_frame(fig, update):
+    fig.set_dpi(SETTINGS['MPL_DPI'])
+
+    def frame(i):
+        update(i)
+        fig.canvas.draw()
+    return frame
+
+
+def case_race_chart():
+    import race_chart
+    race_chart.df, years = race_chart.prepare_data()
+    return _mpl_frame(race_chart.fig, lambda i: race_chart.draw_barchart(years[i % len(years)]))
+
+
+def case_car_speed_v2():
+    import car_speed_v2
+    return _mpl_frame(car_speed_v2.fig, lambda i: car_speed_v2.update(i % car_speed_v2.total_frames))
+
+
+def case_hp_vertical():
+    import hp_vertical
+    return _mpl_frame(hp_vertical.fig, lambda i: hp_vertical.update(i % len(hp_vertical.TIMELINE)))
+
+
+def case_top():
+    import tempfile
+    import top
+    top.OUTPUT_DIR = tempfile.mkdtemp(prefix='bench_top_')
+    data = top.load_languages(os.path.join(ROOT, top.INPUT_FILE))
+    years = sorted(data)
+    return lambda i: top.generate_image(years[i % len(years)], data[years[i % len(years)]])
+
+
+def _fractal_kernel(task_name):
+    sys.path.insert(0, os.path.join(ROOT, 'fractal'))
+    import fractal
+    t = next(t for t in fractal.tasks if t['n'] == task_name)
+    kernel = fractal.raster_kernel(t)
+    w, h = fractal.WIDTH // SETTINGS['FRACTAL_DIV'], fractal.HEIGHT // SETTINGS['FRACTAL_DIV']
+    return lambda i: kernel(w, h, i * 10)
+
+
+def case_fractal_mandelbrot():
+    return _fractal_kernel('02_Turbo_Mandelbrot')
+
+
+def case_fractal_bifurcation():
+    return _fractal_kernel('17_Bifurcation_Flow')
+
+
+def case_new_fractal():
+    import numpy as np
+    sys.path.insert(0, os.path.join(ROOT, 'fractal'))
+    import new_fractal as nf
+    w, h = nf.WIDTH // SETTINGS['FRACTAL_DIV'], nf.HEIGHT // SETTINGS['FRACTAL_DIV']
+    buf = np.zeros((h, w, 3), np.uint8)
+    t1, t2 = np.zeros((h, w, 3), np.float32), np.zeros((h, w, 3), np.float32)
+
+    def frame(i):
+        nf.render_tree_fern(i * 10, w, h, buf, t1, t2)
+        nf.apply_bloom(buf.astype(np.float32), t1, t2)
+    return frame
+
+
+CASES = {
+    'race_chart': case_race_chart,
+    'car_speed_v2': case_car_speed_v2,
+    'hp_vertical': case_hp_vertical,
+    'top': case_top,
+    'fractal_mandelbrot': case_fractal_mandelbrot,
+    'fractal_bifurcation': case_fractal_bifurcation,
+    'new_fractal': case_new_fractal,
+}
+
+
+def _peak_mb():
+    """Пиковый RSS процесса в МБ"""
+    try:
+        import resource
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / 1024 if sys.platform != 'darwin' else kb / 2**20
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+
+
+def run_case(name, frames):
+    """Тело дочернего процесса: замер одного сценария"""
+    t0 = time.perf_counter()
+    import random
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    random.seed(SETTINGS['SEED'])
+    np.random.seed(SETTINGS['SEED'])
+
+    frame = CASES[name]()
+    frame(0)
+    ttff = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    for i in range(1, frames + 1):
+        frame(i)
+    elapsed = time.perf_counter() - t1
+    return {'fps': round(frames / elapsed, 3), 'ttff': round(ttff, 3), 'peak_mb': round(_peak_mb(), 1)}
+
+
+def measure(name, frames):
+    """Запуск сценария в чистом процессе (рабочая папка — корень репозитория)"""
+    env = dict(os.environ, MPLBACKEND='Agg')
+    env.pop('FRAME_TRACE', None)
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', name, '--frames', str(frames)],
+                         cwd=ROOT, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{name}: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(result, base, tol=SETTINGS['TOLERANCE']):
+    """Список регрессий относительно базовой линии"""
+    if not base:
+        return []
+    flags = []
+    if result['fps'] < base['fps'] * (1 - tol['fps']):
+        flags.append(f"fps {base['fps']} -> {result['fps']}")
+    for key in ('ttff', 'peak_mb'):
+        if result[key] > base[key] * (1 + tol[key]):
+            flags.append(f"{key} {base[key]} -> {result[key]}")
+    return flags
+
+
+def main(names, frames, baseline_path, save_baseline):
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f).get('cases', {})
+
+    print(f"{'сценарий':<22}{'fps':>9}{'ttff, с':>10}{'пик, МБ':>10}   базовая линия")
+    results, regressions, failed = {}, 0, []
+    for name in names:
+        try:
+            r = measure(name, frames)
+        except RuntimeError as e:
+            print(f"{name:<22}  ОШИБКА: {e}")
+            failed.append(name)   # Упавший сценарий — тоже регрессия: код выхода не 0
+            continue
+        results[name] = r
+        base = baseline.get(name)
+        flags = compare(r, base)
+        regressions += bool(flags)
+        if not base:
+            status = "нет"
+        elif flags:
+            status = "РЕГРЕССИЯ: " + ", ".join(flags)
+        else:
+            status = f"ок (fps {r['fps'] / base['fps']:.2f}x)"
+        print(f"{name:<22}{r['fps']:>9.2f}{r['ttff']:>10.2f}{r['peak_mb']:>10.0f}   {status}")
+
+    if save_baseline and failed:
+        # Базовая линия без упавших сценариев молча потеряла бы их замеры
+        print(f"\nБазовая линия НЕ сохранена: упали сценарии {', '.join(failed)}")
+    elif save_baseline:
+        data = {'frames': frames, 'settings': {k: SETTINGS[k] for k in ('SEED', 'MPL_DPI', 'FRACTAL_DIV')},
+                'python': sys.version.split()[0], 'cases': dict(baseline, **results)}
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"\nБазовая линия сохранена: {baseline_path}")
+    return regressions + len(failed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Бенчмарки рендера бар-гонок и фракталов")
+    parser.add_argument('cases', nargs='*', metavar='case', help=f"сценарии: {', '.join(CASES)} (по умолчанию все)")
+    parser.add_argument('--frames', type=int, default=SETTINGS['FRAMES'])
+    parser.add_argument('--baseline', default=SETTINGS['BASELINE'])
+    parser.add_argument('--save-baseline', action='store_true', help="записать результаты как базовую линию")
+    parser.add_argument('--case', help=argparse.SUPPRESS)  # Внутренний режим: один сценарий в этом процессе
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.frames)))
+        sys.exit(0)
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+    baseline_path = os.path.join(ROOT, args.baseline) if not os.path.isabs(args.baseline) else args.baseline
+    sys.exit(1 if main(args.cases or list(CASES), args.frames, baseline_path, args.save_baseline) else 0)
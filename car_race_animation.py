@@ -3,45 +3,42 @@
 # ============================================================
 
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import os
-import re
+from functools import lru_cache
+from operator import itemgetter
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+import datasets
+import panels
+import render_jobs
 
 # =========================
 # 1. НАСТРОЙКИ
 # =========================
 SETTINGS = {
     "CSV_FILE": "car_speed_data_updated.csv", 
-    "FORMAT": "9:16",
+    "FORMAT": "9:16",          # "9:16", "16:9" или оба за один проход: ["9:16", "16:9"]
     "FPS": 60,
     "DPI": 120,
     "SECONDS_PER_TRANSITION": 2.5, 
     "TOP_N": 10,
-    "LOGO_DIR": "logos"
+    "LOGO_DIR": "logos",
+    "PROFILES": None,  # Лестница качеств (frame_pipe), например [{"name": "full", "bitrate": "8M"}, {"name": "half", "scale": 0.5, "bitrate": "3M"}]
+    "PANEL_WORKERS": 0         # 0 — одна фигура, все форматы за проход; иначе панели (panels.py)
 }
+render_jobs.apply_settings(SETTINGS)  # Переопределения из очереди render_jobs
 
 # =========================
 # 2. ПОДГОТОВКА ДАННЫХ
 # =========================
-def extract_number(value):
-    if pd.isna(value): return np.nan
-    match = re.search(r"([-+]?\d*\.?\d+)", str(value))
-    return float(match.group(1)) if match else np.nan
-
 if not os.path.exists(SETTINGS["CSV_FILE"]):
     SETTINGS["CSV_FILE"] = "car_speed_data.csv"
 
-df = pd.read_csv(SETTINGS["CSV_FILE"])
-df["CarLabel"] = df["марка"].str.upper() + " (" + df["модель"] + ")"
-
-for col in ["максимальная_скорость_км_ч", "разгон_0_100_км_ч_сек"]:
-    df[col] = df[col].apply(extract_number)
+# Числа из строк ("350-400"), категории и CarLabel готовит datasets (кэшированный снимок)
+df = datasets.load(SETTINGS["CSV_FILE"])
 
 unique_years = sorted(df["год"].unique())
-all_cars = df["CarLabel"].unique()
+all_cars = df["CarLabel"].unique().tolist()
 car_to_brand = df.set_index("CarLabel")["марка"].to_dict()
 
 history_speed = []
@@ -82,85 +79,115 @@ def get_frame_data(frame_idx):
 # =========================
 # plt.style.use('dark_background')
 
-# УВЕЛИЧЕНА ВЫСОТА: с 12 до 14.5 для растягивания по вертикали
-if SETTINGS["FORMAT"] == "9:16":
-    fig = plt.figure(figsize=(7, 14.5))
-    # Перераспределены пропорции (меньше места заголовку, больше графикам)
-    gs = fig.add_gridspec(3, 1, height_ratios=[0.06, 0.47, 0.47])
-else:
-    fig = plt.figure(figsize=(16, 9))
-    gs = fig.add_gridspec(2, 2, height_ratios=[0.85, 0.15])
-
-ax_title, ax_top, ax_bottom = fig.add_subplot(gs[0]), fig.add_subplot(gs[1]), fig.add_subplot(gs[2])
+# Несколько форматов рендерятся за один проход: данные кадра и логотипы общие
+FORMATS = [SETTINGS["FORMAT"]] if isinstance(SETTINGS["FORMAT"], str) else list(SETTINGS["FORMAT"])
 
-# Уменьшаем пустые поля по краям
-plt.subplots_adjust(left=0.05, right=0.95, top=0.98, bottom=0.02, hspace=0.15)
-
-def draw_logo(ax, car_label, x, y):
-    brand = car_to_brand.get(car_label)
+@lru_cache(maxsize=None)
+def load_logo(brand):
+    """Логотип марки (читается с диска один раз на весь рендер)"""
     path = os.path.join(SETTINGS["LOGO_DIR"], f"{brand}.png")
     if os.path.exists(path):
         try:
-            img = plt.imread(path)
-            # Немного увеличил логотипы
-            ab = AnnotationBbox(OffsetImage(img, zoom=0.06), (x, y), frameon=False, box_alignment=(1.1, 0.5))
-            ax.add_artist(ab)
-        except: pass
+            return plt.imread(path)
+        except Exception: pass
+    return None
+
+def draw_logo(ax, car_label, x, y):
+    img = load_logo(car_to_brand.get(car_label))
+    if img is not None:
+        # Немного увеличил логотипы
+        ab = AnnotationBbox(OffsetImage(img, zoom=0.06), (x, y), frameon=False, box_alignment=(1.1, 0.5))
+        ax.add_artist(ab)
+
+def make_figure(fmt):
+    """Фигура и оси панелей одного формата: год, TOP SPEED, 0-100"""
+    # УВЕЛИЧЕНА ВЫСОТА: с 12 до 14.5 для растягивания по вертикали
+    if fmt == "9:16":
+        fig = plt.figure(figsize=(7, 14.5))
+        # Перераспределены пропорции (меньше места заголовку, больше графикам)
+        gs = fig.add_gridspec(3, 1, height_ratios=[0.06, 0.47, 0.47])
+    else:
+        fig = plt.figure(figsize=(16, 9))
+        gs = fig.add_gridspec(2, 2, height_ratios=[0.85, 0.15])
+
+    ax_title, ax_top, ax_bottom = fig.add_subplot(gs[0]), fig.add_subplot(gs[1]), fig.add_subplot(gs[2])
+
+    # Уменьшаем пустые поля по краям
+    fig.subplots_adjust(left=0.05, right=0.95, top=0.98, bottom=0.02, hspace=0.15)
+    return fig, [ax_title, ax_top, ax_bottom]
+
+# --- ПАНЕЛИ: каждая рисует только свою ось (одна фигура или свой холст в panels) ---
+def year_panel(ax_title):
+    def draw(state):
+        cur_yr = state[-1]
+        ax_title.clear()
+        ax_title.axis("off")
+        ax_title.text(0.5, 0.5, f"YEAR: {int(cur_yr)}", ha="center", va="center", weight="bold", fontsize=55)
+    return draw
+
+def speed_panel(ax_top):
+    def draw(state):
+        s_vals, s_ranks = state[0], state[1]
+        ax_top.clear()
+
+        # --- TOP SPEED ---
+        n_s = min(len(s_ranks), SETTINGS["TOP_N"])
+        top_s_idx = s_ranks.nlargest(n_s).index
+        for car in top_s_idx:
+            val, pos = s_vals[car], s_ranks[car] - (len(s_ranks) - n_s)
+            # УВЕЛИЧЕНА ВЫСОТА БАРА: с 0.75 до 0.82
+            ax_top.barh(pos, val, color="#00d2ff", edgecolor='white', height=0.82)
+            
+            ax_top.text(8, pos, f"{car} | {int(val)} km/h", 
+                        va='center', ha='left', weight='bold', size=10, color='black')
+
+        ax_top.set_xlim(0, max(s_vals.max() * 1.05, 350))
+        ax_top.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6) # Расширил границы Y
+        ax_top.set_yticks([])
+        ax_top.set_title("TOP SPEED", color="#00d2ff", weight="bold", size=16, pad=10)
+    return draw
+
+def accel_panel(ax_bottom):
+    def draw(state):
+        a_vals, a_ranks = state[2], state[3]
+        ax_bottom.clear()
+
+        # --- ACCELERATION ---
+        n_a = min(len(a_ranks), SETTINGS["TOP_N"])
+        top_a_idx = a_ranks.nlargest(n_a).index
+        for car in top_a_idx:
+            val, pos = a_vals[car], a_ranks[car] - (len(a_ranks) - n_a)
+            # УВЕЛИЧЕНА ВЫСОТА БАРА
+            ax_bottom.barh(pos, val, color="#ff4b2b", edgecolor='white', height=0.82)
+            ax_bottom.text(val + 0.25, pos, f"{car} | {val:.2f}s", va='center', weight='bold', size=9)
+            draw_logo(ax_bottom, car, val, pos)
+
+        ax_bottom.set_xlim(max(a_vals.max() * 1.1, 10), 0)
+        ax_bottom.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6)
+        ax_bottom.set_yticks([])
+        ax_bottom.set_title("0-100 KM/H", color="#ff4b2b", weight="bold", size=16, pad=10)
+    return draw
+
+# По осям make_figure: (панель, ключ кэша растра или None); год — последний в состоянии кадра
+PANELS = [(year_panel, itemgetter(-1)), (speed_panel, None), (accel_panel, None)]
+
+LAYOUTS = {fmt: panels.compose(make_figure(fmt), PANELS) for fmt in FORMATS}
+fig, draw_frame = LAYOUTS[FORMATS[0]]
+frame_state = panels.traced(get_frame_data)
 
 def update(i):
-    ax_top.clear()
-    ax_bottom.clear()
-    ax_title.clear()
-    
-    s_vals, s_ranks, a_vals, a_ranks, cur_yr = get_frame_data(i)
-    
-    # --- TOP SPEED ---
-    n_s = min(len(s_ranks), SETTINGS["TOP_N"])
-    top_s_idx = s_ranks.nlargest(n_s).index
-    for car in top_s_idx:
-        val, pos = s_vals[car], s_ranks[car] - (len(s_ranks) - n_s)
-        # УВЕЛИЧЕНА ВЫСОТА БАРА: с 0.75 до 0.82
-        ax_top.barh(pos, val, color="#00d2ff", edgecolor='white', height=0.82)
-        
-        ax_top.text(8, pos, f"{car} | {int(val)} km/h", 
-                    va='center', ha='left', weight='bold', size=10, color='black')
-
-    ax_top.set_xlim(0, max(s_vals.max() * 1.05, 350))
-    ax_top.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6) # Расширил границы Y
-    ax_top.set_yticks([])
-    ax_top.set_title("TOP SPEED", color="#00d2ff", weight="bold", size=16, pad=10)
-
-    # --- ACCELERATION ---
-    n_a = min(len(a_ranks), SETTINGS["TOP_N"])
-    top_a_idx = a_ranks.nlargest(n_a).index
-    for car in top_a_idx:
-        val, pos = a_vals[car], a_ranks[car] - (len(a_ranks) - n_a)
-        # УВЕЛИЧЕНА ВЫСОТА БАРА
-        ax_bottom.barh(pos, val, color="#ff4b2b", edgecolor='white', height=0.82)
-        ax_bottom.text(val + 0.25, pos, f"{car} | {val:.2f}s", va='center', weight='bold', size=9)
-        draw_logo(ax_bottom, car, val, pos)
-
-    ax_bottom.set_xlim(max(a_vals.max() * 1.1, 10), 0)
-    ax_bottom.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6)
-    ax_bottom.set_yticks([])
-    ax_bottom.set_title("0-100 KM/H", color="#ff4b2b", weight="bold", size=16, pad=10)
-
-    # --- YEAR ---
-    ax_title.axis("off")
-    ax_title.text(0.5, 0.5, f"YEAR: {int(cur_yr)}", ha="center", va="center", weight="bold", fontsize=55)
-
-    if i % 30 == 0:
-        print(f"Rendering: {int(i/total_frames*100)}%", end='\r')
+    """Кадр основного формата"""
+    draw_frame(frame_state(i))
 
 # =========================
 # 4. СОХРАНЕНИЕ
 # =========================
-ani = animation.FuncAnimation(fig, update, frames=total_frames, interval=1000/SETTINGS["FPS"])
-output_file = "car_race_stretched.mp4"
-
-print(f"Запуск рендеринга... Графики растянуты по вертикали.")
-ani.save(output_file, writer='ffmpeg', fps=SETTINGS["FPS"], dpi=SETTINGS["DPI"], 
-         codec='libx264', extra_args=['-pix_fmt', 'yuv420p'])
-
-print(f"\n✅ ГОТОВО! Видео сохранено: {output_file}")
-plt.close()
\ No newline at end of file
+if __name__ == '__main__':
+    print(f"Запуск рендеринга... Графики растянуты по вертикали. Форматы: {', '.join(LAYOUTS)}")
+    saved = panels.render_formats(LAYOUTS, range(total_frames), get_frame_data, PANELS, "car_race_stretched.mp4",
+                                  SETTINGS["FPS"], workers=SETTINGS["PANEL_WORKERS"], dpi=SETTINGS["DPI"],
+                                  codec='libx264', extra_args=['-pix_fmt', 'yuv420p'],
+                                  profiles=SETTINGS["PROFILES"])
+
+    print(f"\n✅ ГОТОВО! Видео сохранено: {', '.join(saved)}")
+    plt.close('all')
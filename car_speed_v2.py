@@ -1,44 +1,43 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import os
-import re
+from functools import lru_cache
+from operator import itemgetter
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-import matplotlib.patheffects as path_effects
+import datasets
+import panels
+import render_jobs
+from bar_race import TopK
+from text_sprites import TextSprites
 
 # =========================
 # 1. НАСТРОЙКИ
 # =========================
 SETTINGS = {
     "CSV_FILE": "car_speed_data_updated.csv", 
-    "FORMAT": "9:16",
+    "FORMAT": "9:16",          # "9:16", "16:9" или оба за один проход: ["9:16", "16:9"]
     "FPS": 60,
     "DPI": 120,
     "SECONDS_PER_TRANSITION": 2.5, 
     "TOP_N": 10,
-    "LOGO_DIR": "logos"
+    "LOGO_DIR": "logos",
+    "PROFILES": None,  # Лестница качеств (frame_pipe), например [{"name": "full", "bitrate": "8M"}, {"name": "half", "scale": 0.5, "bitrate": "3M"}]
+    "PANEL_WORKERS": 0         # 0 — одна фигура, все форматы за проход; иначе панели (panels.py)
 }
+render_jobs.apply_settings(SETTINGS)  # Переопределения из очереди render_jobs
 
 # =========================
 # 2. ПОДГОТОВКА ДАННЫХ
 # =========================
-def extract_number(value):
-    if pd.isna(value): return np.nan
-    match = re.search(r"([-+]?\d*\.?\d+)", str(value))
-    return float(match.group(1)) if match else np.nan
-
 if not os.path.exists(SETTINGS["CSV_FILE"]):
     SETTINGS["CSV_FILE"] = "car_speed_data.csv"
 
-df = pd.read_csv(SETTINGS["CSV_FILE"])
-df["CarLabel"] = df["марка"].str.upper() + " (" + df["модель"] + ")"
-
-for col in ["максимальная_скорость_км_ч", "разгон_0_100_км_ч_сек"]:
-    df[col] = df[col].apply(extract_number)
+# Числа из строк ("350-400"), категории и CarLabel готовит datasets (кэшированный снимок)
+df = datasets.load(SETTINGS["CSV_FILE"])
 
 unique_years = sorted(df["год"].unique())
-all_cars = df["CarLabel"].unique()
+all_cars = df["CarLabel"].unique().tolist()
 car_to_brand = df.set_index("CarLabel")["марка"].to_dict()
 
 history_speed = []
@@ -57,120 +56,144 @@ for yr in unique_years:
 frames_per_step = int(SETTINGS["SECONDS_PER_TRANSITION"] * SETTINGS["FPS"])
 total_frames = (len(unique_years) - 1) * frames_per_step
 
+# Top-N по годам (годы × машины) с плавным переходом: цена кадра зависит от TOP_N,
+# а не от числа машин (bar_race.TopK). Разгон — чем меньше, тем выше.
+speed_matrix = np.vstack([h.to_numpy() for h in history_speed])
+accel_matrix = np.vstack([h.to_numpy() for h in history_accel])
+TOP_SPEED = TopK(speed_matrix, SETTINGS["TOP_N"], frames_per_step=frames_per_step)
+TOP_ACCEL = TopK(accel_matrix, SETTINGS["TOP_N"], largest=False, frames_per_step=frames_per_step)
+SLOWEST_ACCEL = TopK(accel_matrix, 1, frames_per_step=frames_per_step)   # Масштаб оси разгона
+CAR_LABELS = np.array(all_cars, dtype=object)
+
 def get_frame_data(frame_idx):
-    step = frame_idx // frames_per_step
-    alpha = (frame_idx % frames_per_step) / frames_per_step
-    if step >= len(unique_years) - 1:
-        step, alpha = len(unique_years) - 2, 1.0
-        
-    s_vals = history_speed[step] * (1 - alpha) + history_speed[step+1] * alpha
-    a_vals = history_accel[step] * (1 - alpha) + history_accel[step+1] * alpha
+    """Top-N машин по скорости и по разгону (снизу вверх) и год кадра"""
+    step, alpha = TOP_SPEED.step(frame_idx)
     display_year = unique_years[step] if alpha < 0.5 else unique_years[step+1]
-    
-    s_active = s_vals.dropna()
-    a_active = a_vals.dropna()
-    s_ranks = s_active.rank(method='first', ascending=True)
-    a_ranks = a_active.rank(method='first', ascending=False)
-    
-    return s_active, s_ranks, a_active, a_ranks, display_year
+
+    s_ids, s_vals = TOP_SPEED(frame_idx)
+    a_ids, a_vals = TOP_ACCEL(frame_idx)
+    a_max = SLOWEST_ACCEL(frame_idx)[1]
+    a_max = a_max[0] if len(a_max) else np.nan
+
+    return CAR_LABELS[s_ids], s_vals, CAR_LABELS[a_ids], a_vals, a_max, display_year
 
 # =========================
 # 3. ГРАФИКА
 # =========================
 plt.style.use('default') # Переход на светлую тему
 
-if SETTINGS["FORMAT"] == "9:16":
-    fig = plt.figure(figsize=(7, 14.5), facecolor='white')
-    gs = fig.add_gridspec(3, 1, height_ratios=[0.08, 0.46, 0.46])
-else:
-    fig = plt.figure(figsize=(16, 9), facecolor='white')
-    gs = fig.add_gridspec(2, 2, height_ratios=[0.85, 0.15])
-
-ax_title, ax_top, ax_bottom = fig.add_subplot(gs[0]), fig.add_subplot(gs[1]), fig.add_subplot(gs[2])
-plt.subplots_adjust(left=0.05, right=0.95, top=0.95, bottom=0.05, hspace=0.2)
+# Несколько форматов рендерятся за один проход: данные кадра и логотипы общие
+FORMATS = [SETTINGS["FORMAT"]] if isinstance(SETTINGS["FORMAT"], str) else list(SETTINGS["FORMAT"])
 
-def draw_logo(ax, car_label, x, y):
-    brand = car_to_brand.get(car_label)
+@lru_cache(maxsize=None)
+def load_logo(brand):
+    """Логотип марки (читается с диска один раз на весь рендер)"""
     path = os.path.join(SETTINGS["LOGO_DIR"], f"{brand}.png")
     if os.path.exists(path):
         try:
-            img = plt.imread(path)
-            # Логотип смещен чуть правее текста значения
-            ab = AnnotationBbox(OffsetImage(img, zoom=0.07), (x - 0.5, y), frameon=False, box_alignment=(1.1, 0.5))
-            ax.add_artist(ab)
-        except: pass
+            return plt.imread(path)
+        except Exception: pass
+    return None
 
-def update(i):
-    ax_top.clear()
-    ax_bottom.clear()
-    ax_title.clear()
-    
-    # Установка белого фона для каждой оси
-    for ax in [ax_top, ax_bottom, ax_title]:
-        ax.set_facecolor('white')
-
-    s_vals, s_ranks, a_vals, a_ranks, cur_yr = get_frame_data(i)
-    
-    # Общие настройки эффекта обводки для текста
-    stroke = [path_effects.withStroke(linewidth=3, foreground='white')]
-
-    # --- TOP SPEED ---
-    n_s = min(len(s_ranks), SETTINGS["TOP_N"])
-    top_s_idx = s_ranks.nlargest(n_s).index
-    max_s = max(s_vals.max() * 1.1, 400)
-    
-    for car in top_s_idx:
-        val, pos = s_vals[car], s_ranks[car] - (len(s_ranks) - n_s)
-        ax_top.barh(pos, val, color="#00d2ff", edgecolor='black', height=0.8)
+def draw_logo(ax, car_label, x, y):
+    img = load_logo(car_to_brand.get(car_label))
+    if img is not None:
+        # Логотип смещен чуть правее текста значения
+        ab = AnnotationBbox(OffsetImage(img, zoom=0.07), (x - 0.5, y), frameon=False, box_alignment=(1.1, 0.5))
+        ax.add_artist(ab)
+
+# Подписи черные на белой обводке: каждая строка растрируется один раз (text_sprites)
+LABELS = TextSprites(dpi=SETTINGS["DPI"], fontsize=11, fontweight='bold', color='black',
+                     stroke=3, stroke_color='white')
+
+def make_figure(fmt):
+    """Фигура и оси панелей одного формата: год, TOP SPEED, 0-100"""
+    if fmt == "9:16":
+        fig = plt.figure(figsize=(7, 14.5), facecolor='white')
+        gs = fig.add_gridspec(3, 1, height_ratios=[0.08, 0.46, 0.46])
+    else:
+        fig = plt.figure(figsize=(16, 9), facecolor='white')
+        gs = fig.add_gridspec(2, 2, height_ratios=[0.85, 0.15])
+
+    ax_title, ax_top, ax_bottom = fig.add_subplot(gs[0]), fig.add_subplot(gs[1]), fig.add_subplot(gs[2])
+    fig.subplots_adjust(left=0.05, right=0.95, top=0.95, bottom=0.05, hspace=0.2)
+    return fig, [ax_title, ax_top, ax_bottom]
+
+# --- ПАНЕЛИ: каждая рисует только свою ось (одна фигура или свой холст в panels) ---
+def year_panel(ax_title):
+    def draw(state):
+        cur_yr = state[-1]
+        ax_title.clear()
+        ax_title.set_facecolor('white')
+        ax_title.axis("off")
+        ax_title.text(0.5, 0.5, f"YEAR: {int(cur_yr)}", ha="center", va="center", 
+                      weight="bold", fontsize=50, color='black')
+    return draw
+
+def speed_panel(ax_top):
+    def draw(state):
+        s_cars, s_vals = state[0], state[1]
+        ax_top.clear()
+        ax_top.set_facecolor('white')
+
+        # --- TOP SPEED --- (лидер — последний, на позиции n)
+        max_s = max(np.nanmax(s_vals, initial=0) * 1.1, 400)
         
-        # Текст от левого края
-        txt = ax_top.text(5, pos, f"{car} | {int(val)} km/h", 
-                    va='center', ha='left', weight='bold', size=11, color='black')
-        txt.set_path_effects(stroke)
-
-    ax_top.set_xlim(0, max_s)
-    ax_top.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6)
-    ax_top.set_yticks([])
-    ax_top.set_title("TOP SPEED (KM/H)", color="black", weight="bold", size=18, pad=15)
-
-    # --- ACCELERATION (0-100 KM/H) ---
-    n_a = min(len(a_ranks), SETTINGS["TOP_N"])
-    top_a_idx = a_ranks.nlargest(n_a).index
-    max_a = max(a_vals.max() * 1.1, 10)
-    
-    for car in top_a_idx:
-        val, pos = a_vals[car], a_ranks[car] - (len(a_ranks) - n_a)
-        ax_bottom.barh(pos, val, color="#ff4b2b", edgecolor='black', height=0.8)
+        for pos, (car, val) in enumerate(zip(s_cars, s_vals), 1):
+            ax_top.barh(pos, val, color="#00d2ff", edgecolor='black', height=0.8)
+            
+            # Текст от левого края
+            LABELS.artist(ax_top, (5, pos), f"{car} | {int(val)} km/h", ha='left')
+
+        ax_top.set_xlim(0, max_s)
+        ax_top.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6)
+        ax_top.set_yticks([])
+        ax_top.set_title("TOP SPEED (KM/H)", color="black", weight="bold", size=18, pad=15)
+    return draw
+
+def accel_panel(ax_bottom):
+    def draw(state):
+        a_cars, a_vals, a_slowest = state[2], state[3], state[4]
+        ax_bottom.clear()
+        ax_bottom.set_facecolor('white')
+
+        # --- ACCELERATION (0-100 KM/H) --- (самый быстрый разгон — наверху)
+        max_a = max(np.nan_to_num(a_slowest) * 1.1, 10)
         
-        # ВАЖНО: Текст начинается от левого края (max_a), так как ось инвертирована
-        # Мы используем координаты данных. В инвертированной оси лево — это большее число.
-        txt = ax_bottom.text(max_a - 0.2, pos, f"{car} | {val:.2f}s", 
-                       va='center', ha='left', weight='bold', size=11, color='black')
-        txt.set_path_effects(stroke)
-        draw_logo(ax_bottom, car, val, pos)
-
-    ax_bottom.set_xlim(max_a, 0) # Инвертированная ось
-    ax_bottom.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6)
-    ax_bottom.set_yticks([])
-    ax_bottom.set_title("0-100 KM/H (SEC)", color="black", weight="bold", size=18, pad=15)
-
-    # --- YEAR ---
-    ax_title.axis("off")
-    ax_title.text(0.5, 0.5, f"YEAR: {int(cur_yr)}", ha="center", va="center", 
-                  weight="bold", fontsize=50, color='black')
-
-    if i % 30 == 0:
-        print(f"Rendering: {int(i/total_frames*100)}%", end='\r')
+        for pos, (car, val) in enumerate(zip(a_cars, a_vals), 1):
+            ax_bottom.barh(pos, val, color="#ff4b2b", edgecolor='black', height=0.8)
+            
+            # ВАЖНО: Текст начинается от левого края (max_a), так как ось инвертирована
+            # Мы используем координаты данных. В инвертированной оси лево — это большее число.
+            LABELS.artist(ax_bottom, (max_a - 0.2, pos), f"{car} | {val:.2f}s", ha='left')
+            draw_logo(ax_bottom, car, val, pos)
+
+        ax_bottom.set_xlim(max_a, 0) # Инвертированная ось
+        ax_bottom.set_ylim(0.4, SETTINGS["TOP_N"] + 0.6)
+        ax_bottom.set_yticks([])
+        ax_bottom.set_title("0-100 KM/H (SEC)", color="black", weight="bold", size=18, pad=15)
+    return draw
+
+# По осям make_figure: (панель, ключ кэша растра или None); год — последний в состоянии кадра
+PANELS = [(year_panel, itemgetter(-1)), (speed_panel, None), (accel_panel, None)]
+
+LAYOUTS = {fmt: panels.compose(make_figure(fmt), PANELS) for fmt in FORMATS}
+fig, draw_frame = LAYOUTS[FORMATS[0]]
+frame_state = panels.traced(get_frame_data)
+
+def update(i):
+    """Кадр основного формата (бенчмарк / превью)"""
+    draw_frame(frame_state(i))
 
 # =========================
 # 4. СОХРАНЕНИЕ
 # =========================
-ani = animation.FuncAnimation(fig, update, frames=total_frames, interval=1000/SETTINGS["FPS"])
-output_file = "car_race_white_clean.mp4"
-
-print(f"Запуск рендеринга... Фон: БЕЛЫЙ. Текст выровнен по левому краю.")
-ani.save(output_file, writer='ffmpeg', fps=SETTINGS["FPS"], dpi=SETTINGS["DPI"], 
-         codec='libx264', extra_args=['-pix_fmt', 'yuv420p'])
-
-print(f"\n✅ ГОТОВО! Видео сохранено: {output_file}")
-plt.close()
\ No newline at end of file
+if __name__ == '__main__':
+    print(f"Запуск рендеринга... Фон: БЕЛЫЙ. Текст выровнен по левому краю. Форматы: {', '.join(LAYOUTS)}")
+    saved = panels.render_formats(LAYOUTS, range(total_frames), get_frame_data, PANELS, "car_race_white_clean.mp4",
+                                  SETTINGS["FPS"], workers=SETTINGS["PANEL_WORKERS"], dpi=SETTINGS["DPI"],
+                                  codec='libx264', extra_args=['-pix_fmt', 'yuv420p'],
+                                  profiles=SETTINGS["PROFILES"])
+
+    print(f"\n✅ ГОТОВО! Видео сохранено: {', '.join(saved)}")
+    plt.close('all')
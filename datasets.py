@@ -0,0 +1,180 @@
+"""
+ОБЩАЯ ЗАГРУЗКА ДАННЫХ ДЛЯ СКРИПТОВ РЕНДЕРА
+
+Каждый CSV разбирается один раз: типизированные колонки, строки-категории
+(марка, модель, компания), числа из строк вида "350-400" извлекаются
+векторно. Результат сохраняется снимком Arrow/Feather в .cache/datasets/
+и при следующих запусках читается через memory map. Экономится разбор CSV
+(извлечение чисел, типы, категории), а не память: to_pandas() копирует
+колонки в обычный изменяемый DataFrame, так что скрипты работают с ним как
+с результатом read_csv.
+
+Снимок привязан к хэшу содержимого CSV и версии схемы: изменили файл или
+схему — снимок пересобирается сам. Без pyarrow всё работает, но без кэша.
+
+    import datasets
+    df = datasets.load('car_speed_data.csv')
+
+Прогрев / очистка кэша:
+    python datasets.py
+    python datasets.py --clear
+"""
+
+import argparse
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT, '.cache', 'datasets')
+SCHEMA_VERSION = 1
+
+
+def _car_label(df):
+    """"ФЕРРАРИ (250 GT)": подпись машины в гонках скорости"""
+    return df['марка'].astype(str).str.upper() + ' (' + df['модель'].astype(str) + ')'
+
+
+_SPEED = {
+    'ints': ['год', 'место'],
+    'numbers': ['максимальная_скорость_км_ч', 'разгон_0_100_км_ч_сек'],
+    'categories': ['марка', 'модель'],
+    'derive': {'CarLabel': _car_label},
+}
+
+# Схемы по шаблону имени файла; всё, что не указано, выводится автоматически
+SCHEMAS = {
+    'car_sales.csv': {'ints': ['Year'], 'index': 'Year'},
+    'car_speed_data*.csv': _SPEED,
+    'super_car_speed*.csv': _SPEED,
+    'engines_data.csv': {'ints': ['Year', 'Horsepower'], 'categories': ['Company', 'Engine_Name']},
+}
+
+NUMBER_RE = r"([-+]?\d*\.?\d+)"
+
+
+def schema_for(path):
+    name = os.path.basename(path)
+    return next((s for pattern, s in SCHEMAS.items() if fnmatch.fnmatch(name, pattern)), {})
+
+
+# --- РАЗБОР CSV ---
+def parse(path, schema=None):
+    """Читает CSV и приводит колонки к компактным типам"""
+    schema = schema_for(path) if schema is None else schema
+    df = pd.read_csv(path)
+
+    # Первое число из строки ("350-400" -> 350.0) — векторно, без .apply по строкам
+    for col in schema.get('numbers', []):
+        if col in df and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col].astype('string').str.extract(NUMBER_RE, expand=False),
+                                    errors='coerce').astype('float64')
+    for col in schema.get('ints', []):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col, fn in schema.get('derive', {}).items():
+        df[col] = fn(df)
+
+    cats = schema.get('categories', [])
+    for col in df.columns:
+        # Повторяющиеся строки -> category (явно из схемы или если уникальных меньше половины)
+        is_text = pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])
+        if is_text and (col in cats or df[col].nunique() < len(df) / 2):
+            df[col] = df[col].astype('category')
+    if 'index' in schema:
+        df = df.set_index(schema['index'])
+    return df
+
+
+# --- СНИМКИ ---
+def _index_path():
+    return os.path.join(CACHE_DIR, 'index.json')
+
+
+def _read_index():
+    try:
+        with open(_index_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def content_hash(path, schema):
+    """Хэш содержимого CSV и схемы; по (mtime, size) повторно файл не читается"""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    index = _read_index()
+    entry = index.get(key)
+    if not entry or entry['mtime'] != st.st_mtime_ns or entry['size'] != st.st_size:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        entry = {'mtime': st.st_mtime_ns, 'size': st.st_size, 'sha1': h.hexdigest()}
+        index[key] = entry
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = _index_path() + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, _index_path())
+    spec = repr((SCHEMA_VERSION, sorted((k, v if not isinstance(v, dict) else sorted(v)) for k, v in schema.items())))
+    return hashlib.sha1((entry['sha1'] + spec).encode()).hexdigest()[:16]
+
+
+def snapshot_path(path, schema=None):
+    schema = schema_for(path) if schema is None else schema
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{content_hash(path, schema)}.arrow")
+
+
+def load(path, schema=None):
+    """DataFrame из CSV через кэшированный снимок Arrow (без повторного разбора CSV)"""
+    if not os.path.isabs(path) and not os.path.exists(path):
+        path = os.path.join(ROOT, path)
+    schema = schema_for(path) if schema is None else schema
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return parse(path, schema)
+
+    snap = snapshot_path(path, schema)
+    if not os.path.exists(snap):
+        df = parse(path, schema)
+        stem = os.path.splitext(os.path.basename(snap))[0].rsplit('-', 1)[0]
+        for old in glob.glob(os.path.join(CACHE_DIR, f"{glob.escape(stem)}-*.arrow")):
+            os.remove(old)
+        # Без сжатия: чтение — memory map без распаковки; в DataFrame данные копируются
+        feather.write_feather(df, snap + '.tmp', compression='uncompressed')
+        os.replace(snap + '.tmp', snap)
+    with pa.memory_map(snap) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def clear():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Снимки данных для скриптов рендера")
+    parser.add_argument('files', nargs='*', help="CSV-файлы (по умолчанию все *.csv в корне)")
+    parser.add_argument('--clear', action='store_true', help="удалить кэш снимков")
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+        print(f"Кэш удален: {CACHE_DIR}")
+    else:
+        files = args.files or sorted(glob.glob(os.path.join(ROOT, '*.csv')))
+        print(f"{'файл':<52}{'строк':>8}{'CSV, мс':>10}{'снимок, мс':>12}")
+        for path in files:
+            t0 = time.perf_counter(); pd.read_csv(path); t_csv = time.perf_counter() - t0
+            load(path)
+            t0 = time.perf_counter(); df = load(path); t_snap = time.perf_counter() - t0
+            print(f"{os.path.basename(path):<52}{len(df):>8}{t_csv*1000:>10.1f}{t_snap*1000:>12.1f}")
@@ -2,8 +2,17 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from geometry import forest_segments
 import time
 import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import frame_trace
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # --- НАСТРОЙКИ КАЧЕСТВА ---
 WIDTH, HEIGHT = 3840, 2160
@@ -17,14 +26,75 @@ tree_pos = np.random.uniform(-40, 40, (NUM_TREES, 2))
 tree_heights = np.random.uniform(7, 13, NUM_TREES)
 tree_depths = np.random.randint(5, 7, NUM_TREES)
 
+LEAF_POINTS = 500    # Точек на один лист (баланс качества и скорости)
+LEAF_VARIANTS = 16   # Сколько разных шаблонов листа посчитать заранее
+BRANCH_SCALE, BRANCH_RISE = 0.73, 0.8
+
 # Время начала для расчета прогресса
 start_time = time.time()
 
-def draw_forest_frame(f, ax):
-    ax.clear()
+# --- ГЕОМЕТРИЯ ЛЕСА (топология и листья считаются один раз) ---
+def leaf_template(rng, n_pts=LEAF_POINTS):
+    """IFS-папоротник в локальных координатах листа: массив (n_pts, 2)"""
+    pts = np.zeros((n_pts, 2))
+    lx, ly = 0.0, 0.0
+    for i, r in enumerate(rng.random(n_pts - 1), 1):
+        if r < 0.01: lx, ly = 0.0, 0.16 * ly
+        elif r < 0.86: lx, ly = 0.85 * lx + 0.04 * ly, -0.04 * lx + 0.85 * ly + 1.6
+        elif r < 0.93: lx, ly = 0.2 * lx - 0.26 * ly, 0.23 * lx + 0.22 * ly + 1.6
+        else: lx, ly = -0.15 * lx + 0.28 * ly, 0.26 * lx + 0.24 * ly + 0.44
+        pts[i] = lx, ly
+    return pts
+
+rng = np.random.default_rng(42)
+leaf_templates = np.array([leaf_template(rng) for _ in range(LEAF_VARIANTS)])
+
+# Деревья группируются по глубине: внутри группы все ветви считаются одним проходом
+tree_groups = [np.flatnonzero(tree_depths == d) for d in np.unique(tree_depths)]
+# Каждому листу навсегда закреплен свой шаблон (без мерцания между кадрами)
+leaf_shapes = [leaf_templates[rng.integers(0, LEAF_VARIANTS, len(idx) * 2**tree_depths[idx[0]])]
+               for idx in tree_groups]
+
+def forest_geometry(f):
+    """Все ветви и листья леса на кадре f: (отрезки, толщины, полилинии листьев)"""
+    # Ветер (плавное качание): наклон ветки зависит от ее высоты (d)
+    wind = np.sin(f / 20) * 0.05
+    segs, widths, leaves = [], [], []
+    for idx, shapes in zip(tree_groups, leaf_shapes):
+        depth = tree_depths[idx[0]]
+        bend = wind * (7 - (depth - np.arange(depth)))
+        # Угол ветвления немного "дышит"
+        split = np.deg2rad(25 + np.sin(f/30 + idx)*3)
+        origins = np.column_stack((tree_pos[idx], np.zeros(len(idx))))
+        s, d, tips, ang, size = forest_segments(origins, tree_heights[idx], depth, np.pi/2,
+                                                split, BRANCH_SCALE, BRANCH_RISE, bend)
+        segs.append(s); widths.append(d * 1.1)
+
+        # Шаблоны листьев: поворот на угол ветки и масштаб — одно векторное преобразование
+        size = size[:, None] * 0.5
+        c, sn = np.cos(ang)[:, None], np.sin(ang)[:, None]
+        lx, ly = shapes[..., 0], shapes[..., 1]
+        leaves.append(np.stack((tips[:, None, 0] + (lx*c - ly*sn)*size,
+                                tips[:, None, 1] + (lx*sn + ly*c)*size,
+                                tips[:, None, 2] + ly*size*0.4), axis=-1))
+    return np.concatenate(segs), np.concatenate(widths), np.concatenate(leaves)
+
+# Постоянные артисты: на кадре меняются только их координаты
+_segs, _widths, _leaves = forest_geometry(0)
+branch_lines = Line3DCollection(_segs, colors='#4b3621', linewidths=_widths, alpha=0.7)
+leaf_lines = Line3DCollection(_leaves, colors='#2ecc71', linewidths=0.3, alpha=0.3)
+
+def setup_axes(ax):
     ax.set_facecolor('black')
     ax.axis('off')
-    
+    # Фиксируем камеру и лимиты
+    ax.set_xlim(-60, 60)
+    ax.set_ylim(-60, 60)
+    ax.set_zlim(0, 50)
+    ax.add_collection3d(branch_lines)
+    ax.add_collection3d(leaf_lines)
+
+def draw_forest_frame(f, ax):
     # Расчет прогресса в консоли
     if f > 0:
         elapsed = time.time() - start_time
@@ -32,63 +102,23 @@ def draw_forest_frame(f, ax):
         remaining = per_frame * (TOTAL_FRAMES - f)
         print(f"Кадр {f}/{TOTAL_FRAMES} | Осталось примерно: {remaining/60:.1f} мин.", end='\r')
 
-    # Ветер (плавное качание)
-    wind = np.sin(f / 20) * 0.05
-    
-    def draw_leaf(x, y, z, size, angle):
-        n_pts = 500  # Точек на один лист (баланс качества и скорости)
-        pts = np.zeros((n_pts, 3))
-        lx, ly = 0.0, 0.0
-        for i in range(1, n_pts):
-            r = np.random.rand()
-            if r < 0.01: lx, ly = 0.0, 0.16 * ly
-            elif r < 0.86: lx, ly = 0.85 * lx + 0.04 * ly, -0.04 * lx + 0.85 * ly + 1.6
-            elif r < 0.93: lx, ly = 0.2 * lx - 0.26 * ly, 0.23 * lx + 0.22 * ly + 1.6
-            else: lx, ly = -0.15 * lx + 0.28 * ly, 0.26 * lx + 0.24 * ly + 0.44
-            
-            s_ang, c_ang = np.sin(angle), np.cos(angle)
-            pts[i] = [x + (lx*c_ang - ly*s_ang)*size, 
-                      y + (lx*s_ang + ly*c_ang)*size, 
-                      z + ly*size*0.4]
-        
-        ax.plot(pts[:, 0], pts[:, 1], pts[:, 2], color='#2ecc71', lw=0.3, alpha=0.3)
-
-    def build_branch(x, y, z, s, a, d, t_idx):
-        if d == 0:
-            draw_leaf(x, y, z, s * 0.5, a)
-            return
-        
-        # Наклон от ветра зависит от высоты ветки (d)
-        w_effect = wind * (7 - d) 
-        x1 = x + s * np.cos(a + w_effect)
-        y1 = y + s * np.sin(a + w_effect)
-        z1 = z + s * 0.8
-        
-        ax.plot([x, x1], [y, y1], [z, z1], color='#4b3621', lw=d*1.1, alpha=0.7)
-        
-        new_s = s * 0.73
-        # Угол ветвления немного "дышит"
-        branch_split = np.deg2rad(25 + np.sin(f/30 + t_idx)*3)
-        build_branch(x1, y1, z1, new_s, a + branch_split, d - 1, t_idx)
-        build_branch(x1, y1, z1, new_s, a - branch_split, d - 1, t_idx)
-
-    # Рисуем все деревья
-    for i in range(NUM_TREES):
-        build_branch(tree_pos[i,0], tree_pos[i,1], 0, tree_heights[i], np.pi/2, tree_depths[i], i)
+    with TRACE.stage('prep'):
+        segs, widths, leaves = forest_geometry(f)
+    branch_lines.set_segments(segs)
+    branch_lines.set_linewidths(widths)
+    leaf_lines.set_segments(leaves)
 
-    # Фиксируем камеру и лимиты
-    ax.set_xlim(-60, 60)
-    ax.set_ylim(-60, 60)
-    ax.set_zlim(0, 50)
     # Облет камеры по кругу с изменением высоты
     ax.view_init(elev=20 + np.cos(f/60)*10, azim=f*0.6)
+    return branch_lines, leaf_lines
 
 # --- Исполнение ---
 fig = plt.figure(figsize=(WIDTH/100, HEIGHT/100), dpi=100, facecolor='black')
 ax = fig.add_axes([0, 0, 1, 1], projection='3d')
+setup_axes(ax)
 
 # Исправленная строка FuncAnimation (передаем ax через lambda)
-ani = animation.FuncAnimation(fig, lambda f: draw_forest_frame(f, ax), frames=TOTAL_FRAMES)
+ani = animation.FuncAnimation(fig, TRACE.hook(fig, lambda f: draw_forest_frame(f, ax)), frames=TOTAL_FRAMES)
 
 print(f">>> Запуск рендеринга 4K: {WIDTH}x{HEIGHT}")
 writer = animation.FFMpegWriter(fps=FPS, bitrate=40000)
@@ -0,0 +1,193 @@
+"""
+ПАКЕТНЫЙ РЕНДЕР ФРАКТАЛОВ (fractal.py / fractal_3d.py)
+
+- один холст 38.4×21.6" на рабочий процесс, переиспользуется между задачами
+- кадры уходят в ffmpeg сырыми байтами (frame_pipe.FramePipe), без savefig
+- прогрев Numba выполняется один раз на процесс, а не на каждую задачу
+- несколько задач параллельно в пределах бюджета памяти
+- рендер сегментами (segments.py): после падения продолжается с последнего сегмента
+- отчет по каждой задаче: пиковый RSS и кадры/сек
+
+Запуск:
+    python batch.py fractal
+    python batch.py fractal_3d --jobs 3 --mem-budget 24000
+    python batch.py fractal --only 02_Turbo_Mandelbrot 10_Morph_Julia
+"""
+
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numba
+import numpy as np
+
+from segments import SEGMENT_FRAMES, render_segmented
+import frame_trace
+import render_jobs
+
+# --- НАСТРОЙКИ ---
+SETTINGS = {
+    'JOBS': 1,                      # Желаемое число параллельных задач
+    'MEM_BUDGET_MB': 16000,         # Общий бюджет памяти на все задачи
+    'TASK_MEM_MB': 6000,            # Оценка пика одной задачи (уточняется по прошлому отчету)
+    'SEGMENT_FRAMES': SEGMENT_FRAMES, # Кадров в одном возобновляемом сегменте
+    'REPORT': 'batch_report_{}.json'
+}
+render_jobs.apply_settings(SETTINGS)  # Переопределения из очереди render_jobs
+
+# Состояние рабочего процесса: модуль с задачами и переиспользуемый холст
+_MOD = None
+_FIG = None
+
+
+def _rss_mb():
+    """Текущий RSS процесса в МБ"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+class _PeakRss(threading.Thread):
+    """Фоновый замер пикового RSS на время одной задачи"""
+
+    def __init__(self, interval=0.25):
+        super().__init__(daemon=True)
+        self.interval, self.peak = interval, _rss_mb()
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        while not self._stop_evt.wait(self.interval):
+            self.peak = max(self.peak, _rss_mb())
+
+    def stop(self):
+        self._stop_evt.set(); self.join()
+        return max(self.peak, _rss_mb())
+
+
+def _init_worker(module_name, numba_threads):
+    global _MOD
+    numba.set_num_threads(numba_threads)
+    _MOD = importlib.import_module(module_name)
+    # После fork ядра уже скомпилированы родителем, здесь это почти мгновенно
+    _MOD.warm_up()
+
+
+def _canvas():
+    """Холст 4K, создаваемый один раз на рабочий процесс"""
+    global _FIG
+    if _FIG is None:
+        _FIG = plt.figure(figsize=(38.4, 21.6), facecolor='black')
+    _FIG.clear()
+    _FIG.set_facecolor('black')
+    return _FIG
+
+
+def fingerprint(mod):
+    """
+    Хэш исходника модуля задач и его констант (ANTIALIAS, MANDEL_CENTER, BIF_* ...,
+    в том числе подмененных на лету): сегменты другой версии ядер не склеиваются
+    """
+    h = hashlib.sha1()
+    with open(inspect.getsourcefile(mod), 'rb') as f:
+        h.update(f.read())
+    for name in sorted(n for n in vars(mod) if n.isupper()):
+        value = getattr(mod, name)
+        if isinstance(value, np.ndarray):
+            h.update(f'{name}{value.dtype.str}{value.shape}'.encode()); h.update(value.tobytes())
+        elif isinstance(value, (bool, int, float, str, tuple, list)):
+            h.update(f'{name}={value!r};'.encode())
+    return h.hexdigest()[:16]
+
+
+def render_task(name):
+    """Рендер одной задачи на переиспользуемом холсте; возвращает строку отчета"""
+    t = next(t for t in _MOD.tasks if t['n'] == name)
+    fig = _canvas()
+    sampler = _PeakRss(); sampler.start()
+    start = time.time()
+
+    update = _MOD.setup_task(fig, t)
+    params = {'module': _MOD.__name__, 'task': name, 'max_iter': _MOD.MAX_ITER, 'code': fingerprint(_MOD)}
+    frames = render_segmented(fig, update, _MOD.OUTPUT_TEMPLATE.format(name), _MOD.TOTAL_FRAMES,
+                              _MOD.WRITER_ARGS, params=params, seg_frames=SETTINGS['SEGMENT_FRAMES'])
+
+    elapsed = time.time() - start
+    # При FRAME_TRACE=1 — трасса этапов кадра на каждую задачу
+    frame_trace.get().save(name)
+    return {'task': name, 'frames': frames, 'seconds': round(elapsed, 1),
+            'fps': round(frames / elapsed, 3) if frames else 0.0, 'peak_rss_mb': round(sampler.stop())}
+
+
+def plan_jobs(jobs, mem_budget_mb, task_mem_mb, report_path):
+    """Число параллельных задач: не больше, чем помещается в бюджет памяти"""
+    if os.path.exists(report_path):
+        with open(report_path, encoding='utf-8') as f:
+            peaks = [r['peak_rss_mb'] for r in json.load(f)]
+        if peaks:
+            task_mem_mb = max(peaks)
+    return max(1, min(jobs, int(mem_budget_mb // task_mem_mb))), task_mem_mb
+
+
+def run_batch(module_name, names=None, jobs=SETTINGS['JOBS'],
+              mem_budget_mb=SETTINGS['MEM_BUDGET_MB'], task_mem_mb=SETTINGS['TASK_MEM_MB']):
+    report_path = SETTINGS['REPORT'].format(module_name)
+    jobs, task_mem_mb = plan_jobs(jobs, mem_budget_mb, task_mem_mb, report_path)
+    # Ядра делятся между задачами; в очереди render_jobs бюджет задан через NUMBA_NUM_THREADS
+    numba_threads = max(1, numba.config.NUMBA_NUM_THREADS // jobs)
+
+    mod = importlib.import_module(module_name)
+    names = names or [t['n'] for t in mod.tasks]
+    print(f">>> {len(names)} задач, параллельно: {jobs} "
+          f"(~{task_mem_mb:.0f} МБ на задачу, потоков Numba на задачу: {numba_threads})")
+
+    # Общий прогрев: при fork дочерние процессы наследуют скомпилированные ядра
+    t0 = time.time()
+    mod.warm_up()
+    print(f">>> Прогрев Numba: {time.time() - t0:.1f} с")
+
+    report = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(module_name, numba_threads)) as pool:
+        futures = {pool.submit(render_task, n): n for n in names}
+        for fut in as_completed(futures):
+            row = fut.result()
+            report.append(row)
+            print(f"  ✔ {row['task']}: {row['seconds']} с, {row['fps']} кадр/с, "
+                  f"пик RSS {row['peak_rss_mb']} МБ")
+
+    report.sort(key=lambda r: r['task'])
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    total = sum(r['frames'] for r in report)
+    wall = time.time() - t0
+    print(f"\nГОТОВО: {total} кадров за {wall/60:.1f} мин ({total/wall:.2f} кадр/с). Отчет: {report_path}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Пакетный рендер фрактальных роликов")
+    parser.add_argument('module', choices=['fractal', 'fractal_3d'])
+    parser.add_argument('--only', nargs='*', help="имена задач, например 02_Turbo_Mandelbrot")
+    parser.add_argument('--jobs', type=int, default=SETTINGS['JOBS'])
+    parser.add_argument('--mem-budget', type=float, default=SETTINGS['MEM_BUDGET_MB'])
+    parser.add_argument('--task-mem', type=float, default=SETTINGS['TASK_MEM_MB'])
+    parser.add_argument('--segment', type=int, default=SETTINGS['SEGMENT_FRAMES'])
+    args = parser.parse_args()
+    SETTINGS['SEGMENT_FRAMES'] = args.segment
+
+    if 'fork' in mp.get_all_start_methods():
+        mp.set_start_method('fork')
+    run_batch(args.module, args.only, args.jobs, args.mem_budget, args.task_mem)
@@ -2,9 +2,17 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.collections import LineCollection, PolyCollection
 from numba import jit, prange
+from geometry import dragon_curve, levy_curve, tree_segments, vicsek_cells, squares_to_polys
 import gc
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import frame_trace
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # --- ГЛОБАЛЬНЫЕ НАСТРОЙКИ 4K ---
 WIDTH, HEIGHT = 3840, 2160
@@ -12,6 +20,16 @@ FPS, SECONDS = 30, 30
 TOTAL_FRAMES = FPS * SECONDS
 MAX_ITER = 120
 
+# Явная сигнатура растровых ядер (w, h, frame) -> кадр: ядра компилируются один раз
+# при импорте, берутся из дискового кэша Numba и не перекомпилируются под другие типы.
+# Прогрев кэша и замер старта: python warmup.py [--bench]
+RASTER_SIG = "float64[:, :](int64, int64, int64)"
+
+# Параметры сцен, которые удобно подбирать в предпросмотре (python preview.py ... --set)
+MANDEL_CENTER = (-0.743643887037151, 0.13182590420643)  # Цель зума Мандельброта
+SHIP_CENTER = (-1.75, -0.03)                            # Цель зума Горящего корабля
+JULIA_C = (-0.7, 0.27)                                  # Базовое c для Жюлиа
+
 # --- СЛОЖНЫЕ ЦИКЛИЧЕСКИЕ ПАЛИТРЫ (2048 ОТТЕНКОВ) ---
 # Радужный вихрь (для Мандельброта/Жюлиа)
 neon_colors = [(0, "#000000"), (0.1, "#1a0033"), (0.2, "#00ffff"), 
@@ -30,7 +48,7 @@ bio_cmap = LinearSegmentedColormap.from_list("deep_sea", bio_colors, N=2048)
 
 # --- РАСТРОВЫЕ ЯДРА (1-10) - С ГЛУБОКИМ СГЛАЖИВАНИЕМ И ДИНАМИКОЙ ---
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_fire_plasma(w, h, frame):
     plasma = np.empty((h, w), dtype=np.float64)
     t = frame * 0.08
@@ -44,33 +62,42 @@ def render_fire_plasma(w, h, frame):
             plasma[i, j] = (v + 4) / 8 * 100
     return plasma
 
-@jit(nopython=True, parallel=True)
-def render_mandelbrot_dynamic(w, h, frame):
-    fractal = np.zeros((h, w), dtype=np.float64)
+@jit(nopython=True, cache=True)
+def mandel_view(w, h, frame):
     # Экспоненциальный зум и вращение
     zoom = 1.5 * (0.94 ** (frame**0.6))
     angle = frame * 0.015
-    cx, cy = -0.743643887037151, 0.13182590420643
-    s_a, c_a = np.sin(angle), np.cos(angle)
-    sx, sy = zoom, zoom * (h/w)
+    return zoom, zoom * (h/w), np.sin(angle), np.cos(angle)
+
+@jit(nopython=True, cache=True)
+def mandel_sample(px, py, w, h, sx, sy, s_a, c_a):
+    # Значение в точке (px, py) в пикселях; дробные координаты — для субпикселей
+    cx, cy = MANDEL_CENTER
+    nx, ny = -sx + (2*sx*px/w), -sy + (2*sy*py/h)
+    x0, y0 = cx + nx*c_a - ny*s_a, cy + nx*s_a + ny*c_a
+    x, y, it = 0.0, 0.0, 0
+    while x*x + y*y <= 256 and it < MAX_ITER:
+        x, y, it = x*x - y*y + x0, 2*x*y + y0, it + 1
+    if it < MAX_ITER:
+        lz = np.log(x*x + y*y)/2
+        return it + 1 - np.log(lz/np.log(2))/np.log(2)
+    return 0.0
+
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
+def render_mandelbrot_dynamic(w, h, frame):
+    fractal = np.zeros((h, w), dtype=np.float64)
+    sx, sy, s_a, c_a = mandel_view(w, h, frame)
     for i in prange(h):
         for j in range(w):
-            nx, ny = -sx + (2*sx*j/w), -sy + (2*sy*i/h)
-            x0, y0 = cx + nx*c_a - ny*s_a, cy + nx*s_a + ny*c_a
-            x, y, it = 0.0, 0.0, 0
-            while x*x + y*y <= 256 and it < MAX_ITER:
-                x, y, it = x*x - y*y + x0, 2*x*y + y0, it + 1
-            if it < MAX_ITER:
-                lz = np.log(x*x + y*y)/2
-                fractal[i, j] = it + 1 - np.log(lz/np.log(2))/np.log(2)
+            fractal[i, j] = mandel_sample(j, i, w, h, sx, sy, s_a, c_a)
     return fractal
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_burning_ship_turbo(w, h, frame):
     fractal = np.zeros((h, w), dtype=np.float64)
     # Быстрый зум
     zoom = 1.2 * (0.96 ** (frame**0.5))
-    cx, cy = -1.75, -0.03
+    cx, cy = SHIP_CENTER
     for i in prange(h):
         for j in range(w):
             x0, y0 = cx - zoom + (2*zoom*j/w), cy - zoom*(h/w) + (2*zoom*(h/w)*i/h)
@@ -81,7 +108,7 @@ def render_burning_ship_turbo(w, h, frame):
             fractal[i, j] = it
     return fractal
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_phoenix_morph(w, h, frame):
     fractal = np.zeros((h, w), dtype=np.float64)
     # Дышащий зум и изменение формы
@@ -97,7 +124,7 @@ def render_phoenix_morph(w, h, frame):
             fractal[i, j] = it
     return fractal
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_newton_crystal(w, h, frame):
     fractal = np.zeros((h, w), dtype=np.float64)
     # Ускоряющийся зум и вращение
@@ -118,7 +145,7 @@ def render_newton_crystal(w, h, frame):
             fractal[i, j] = it * 2 + abs(z)
     return fractal
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_biomorph_alien(w, h, frame):
     fractal = np.zeros((h, w), dtype=np.float64)
     # Пульсация биоморфной формы
@@ -136,7 +163,7 @@ def render_biomorph_alien(w, h, frame):
                 it += 1
     return fractal
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_lyapunov_space(w, h, frame):
     fractal = np.zeros((h, w), dtype=np.float64)
     # Изменение последовательности AB
@@ -152,7 +179,7 @@ def render_lyapunov_space(w, h, frame):
             fractal[i, j] = 50 + (lyap / 100) * 50
     return fractal
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_clifford_smoke(w, h, frame):
     res = np.zeros((h, w), dtype=np.float64)
     # Медленный дрейф параметров
@@ -166,7 +193,7 @@ def render_clifford_smoke(w, h, frame):
         if 0<=px<w and 0<=py<h: res[py, px] += 1
     return np.log1p(res) * 20
 
-@jit(nopython=True, parallel=True)
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
 def render_dejong_plasma(w, h, frame):
     res = np.zeros((h, w), dtype=np.float64)
     # Быстрое изменение формы
@@ -179,23 +206,133 @@ def render_dejong_plasma(w, h, frame):
         if 0<=px<w and 0<=py<h: res[py, px] += 1
     return np.log1p(res) * 20
 
-@jit(nopython=True, parallel=True)
-def render_julia_morph(w, h, frame):
-    res = np.zeros((h, w), dtype=np.float64)
+@jit(nopython=True, cache=True)
+def julia_view(w, h, frame):
     # Трансформация C и дышащий зум
-    ca = -0.7 + 0.3*np.cos(frame/60)
-    cb = 0.27 + 0.15*np.sin(frame/40)
+    ca = JULIA_C[0] + 0.3*np.cos(frame/60)
+    cb = JULIA_C[1] + 0.15*np.sin(frame/40)
     zoom = 1.2 + 0.4*np.sin(frame/100)
+    return ca, cb, zoom
+
+@jit(nopython=True, cache=True)
+def julia_sample(px, py, w, h, ca, cb, zoom):
+    zx, zy, it = -zoom + (2*zoom*px/w), -zoom*(h/w) + (2*zoom*(h/w)*py/h), 0
+    while zx*zx + zy*zy <= 256 and it < MAX_ITER:
+        zx, zy, it = zx*zx - zy*zy + ca, 2*zx*zy + cb, it + 1
+    if it < MAX_ITER:
+        lz = np.log(zx*zx + zy*zy)/2
+        return it + 1 - np.log(lz/np.log(2))/np.log(2)
+    return 0.0
+
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
+def render_julia_morph(w, h, frame):
+    res = np.zeros((h, w), dtype=np.float64)
+    ca, cb, zoom = julia_view(w, h, frame)
+    for i in prange(h):
+        for j in range(w):
+            res[i, j] = julia_sample(j, i, w, h, ca, cb, zoom)
+    return res
+
+# --- АДАПТИВНОЕ СГЛАЖИВАНИЕ (ДЛЯ МАНДЕЛЬБРОТА И ЖЮЛИА) ---
+# Первый проход — обычный кадр. Пиксели, отличающиеся от соседей больше чем на
+# AA_THRESHOLD, досчитываются AA_SAMPLES субпикселями с джиттером и усредняются.
+# Остальной кадр не трогается, поэтому цена близка к одному проходу.
+ANTIALIAS = True
+AA_SAMPLES = 8
+AA_THRESHOLD = 3.0
+# Последовательность R2 (низкая расходимость) — смещения субпикселей внутри пикселя
+_R2_A1, _R2_A2 = 0.7548776662466927, 0.5698402909980532
+AA_OFFSETS = np.array([[(0.5 + _R2_A1*(k+1)) % 1.0, (0.5 + _R2_A2*(k+1)) % 1.0]
+                       for k in range(AA_SAMPLES)]) - 0.5
+
+@jit(nopython=True, parallel=True, cache=True)
+def edge_mask(img, threshold):
+    h, w = img.shape
+    mask = np.zeros((h, w), dtype=np.bool_)
+    for i in prange(h):
+        for j in range(w):
+            v = img[i, j]
+            d = 0.0
+            if i > 0: d = max(d, abs(v - img[i-1, j]))
+            if i < h-1: d = max(d, abs(v - img[i+1, j]))
+            if j > 0: d = max(d, abs(v - img[i, j-1]))
+            if j < w-1: d = max(d, abs(v - img[i, j+1]))
+            mask[i, j] = d > threshold
+    return mask
+
+@jit(nopython=True, cache=True)
+def _pixel_jitter(i, j):
+    # Постоянный для пикселя сдвиг узора (Cranley–Patterson): без мерцания между кадрами
+    hsh = (i * 73856093) ^ (j * 19349663)
+    return (hsh % 1024) / 1024.0, ((hsh // 1024) % 1024) / 1024.0
+
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
+def render_mandelbrot_aa(w, h, frame):
+    res = render_mandelbrot_dynamic(w, h, frame)
+    mask = edge_mask(res, AA_THRESHOLD)
+    sx, sy, s_a, c_a = mandel_view(w, h, frame)
+    for i in prange(h):
+        for j in range(w):
+            if mask[i, j]:
+                ru, rv = _pixel_jitter(i, j)
+                acc = res[i, j]
+                for k in range(AA_SAMPLES):
+                    ox = (AA_OFFSETS[k, 0] + ru) % 1.0 - 0.5
+                    oy = (AA_OFFSETS[k, 1] + rv) % 1.0 - 0.5
+                    acc += mandel_sample(j + ox, i + oy, w, h, sx, sy, s_a, c_a)
+                res[i, j] = acc / (AA_SAMPLES + 1)
+    return res
+
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
+def render_julia_aa(w, h, frame):
+    res = render_julia_morph(w, h, frame)
+    mask = edge_mask(res, AA_THRESHOLD)
+    ca, cb, zoom = julia_view(w, h, frame)
     for i in prange(h):
         for j in range(w):
-            zx, zy, it = -zoom + (2*zoom*j/w), -zoom*(h/w) + (2*zoom*(h/w)*i/h), 0
-            while zx*zx + zy*zy <= 256 and it < MAX_ITER:
-                zx, zy, it = zx*zx - zy*zy + ca, 2*zx*zy + cb, it + 1
-            if it < MAX_ITER:
-                lz = np.log(zx*zx + zy*zy)/2
-                res[i, j] = it + 1 - np.log(lz/np.log(2))/np.log(2)
+            if mask[i, j]:
+                ru, rv = _pixel_jitter(i, j)
+                acc = res[i, j]
+                for k in range(AA_SAMPLES):
+                    ox = (AA_OFFSETS[k, 0] + ru) % 1.0 - 0.5
+                    oy = (AA_OFFSETS[k, 1] + rv) % 1.0 - 0.5
+                    acc += julia_sample(j + ox, i + oy, w, h, ca, cb, zoom)
+                res[i, j] = acc / (AA_SAMPLES + 1)
     return res
 
+# --- БИФУРКАЦИЯ ЛОГИСТИЧЕСКОГО ОТОБРАЖЕНИЯ КАК РАСТР ---
+# Вместо 150 вызовов ax.plot на кадр все итерации копятся в гистограмме плотности.
+# Прогрев (400 итераций) считается один раз на мелкой сетке r и берется из таблицы:
+# окно r сдвигается от кадра к кадру, а прогретое состояние соседнего r почти то же,
+# поэтому на точном r достаточно BIF_SETTLE итераций дожима.
+BIF_R_MIN, BIF_R_MAX = 2.8, 4.0
+BIF_SAMPLES = 8000       # Значений r в окне (как в исходной версии)
+BIF_ITERS = 150          # Итераций, попадающих в кадр
+BIF_SETTLE = 20
+_bif_r = np.linspace(BIF_R_MIN, BIF_R_MAX, 32768)
+BIF_WARM = 0.5 * np.ones_like(_bif_r)
+for _ in range(400): BIF_WARM = _bif_r * BIF_WARM * (1 - BIF_WARM)
+
+@jit(RASTER_SIG, nopython=True, parallel=True, cache=True)
+def render_bifurcation_flow(w, h, frame):
+    res = np.zeros((h, w), dtype=np.float64)
+    # Зум в область хаоса: окно r сужается к 4.0
+    r0 = BIF_R_MIN + frame/TOTAL_FRAMES
+    per_col = BIF_SAMPLES // w + 1
+    n_warm = BIF_WARM.shape[0]
+    # Каждый столбец пикселей — свой набор r, поэтому потоки не пишут в одни ячейки
+    for j in prange(w):
+        for s in range(per_col):
+            r = r0 + (j + (s + 0.5)/per_col) / w * (BIF_R_MAX - r0)
+            k = int((r - BIF_R_MIN) / (BIF_R_MAX - BIF_R_MIN) * (n_warm - 1) + 0.5)
+            x = BIF_WARM[min(k, n_warm - 1)]
+            for _ in range(BIF_SETTLE): x = r*x*(1-x)
+            for _ in range(BIF_ITERS):
+                x = r*x*(1-x)
+                py = int(x * h)
+                if 0 <= py < h: res[py, j] += 1
+    return np.log1p(res) * (100 / np.log1p(per_col * BIF_ITERS))
+
 # --- ВЕКТОРНЫЕ И ХАОС-ИГРЫ (11-20) - С ГРАДИЕНТАМИ СВЕЧЕНИЯ ---
 
 def draw_lorenz_glow(ax, f):
@@ -216,12 +353,8 @@ def draw_lorenz_glow(ax, f):
 
 def draw_dragon_morph(ax, f):
     it, am = min(13, int(f/65)+6), np.deg2rad(90 + np.sin(f/45)*12)
-    pts = np.array([[0,0], [1,0]], dtype=np.float64)
-    for _ in range(it):
-        c = pts[-1]
-        rot = np.array([[np.cos(am), -np.sin(am)], [np.sin(am), np.cos(am)]])
-        # Рекурсивное "развертывание"
-        pts = np.vstack((pts, (np.dot(pts[:-1]-c, rot) + c)[::-1]))
+    # "Развертывание" в заранее выделенном массиве
+    pts = dragon_curve(it, am)
     pts -= np.mean(pts, axis=0)
     pts *= 1.3 / (np.max(np.abs(pts)) + 0.1)
     # Динамический цвет по времени построения
@@ -230,12 +363,9 @@ def draw_dragon_morph(ax, f):
 def draw_pythagoras_wind_tree(ax, f):
     # Угол "колыхания" под ветром
     ang = np.deg2rad(30 + np.sin(f/25)*12)
-    def pb(x, y, s, a, d):
-        if d==0: return
-        x1, y1 = x+s*np.cos(a), y+s*np.sin(a)
-        ax.plot([x,x1], [y,y1], color=neon_cmap(d/10), lw=d*0.8)
-        pb(x1, y1, s*0.8, a+ang, d-1); pb(x1, y1, s*0.8, a-ang, d-1)
-    pb(0, -1.5, 0.5, np.pi/2, 10)
+    # Все 1023 ветви одной коллекцией; топология дерева кэширована, меняется только угол
+    segs, d = tree_segments(10, 0.5, np.pi/2, ang, 0.8, origin=(0, -1.5))
+    ax.add_collection(LineCollection(segs, colors=neon_cmap(d/10), linewidths=d*0.8))
 
 def draw_barnsley_fern_growth(ax, f):
     n, pts = 10000 + f*500, [[0,0]]
@@ -249,12 +379,7 @@ def draw_barnsley_fern_growth(ax, f):
     ax.scatter(p[:,0], p[:,1], s=0.1, color='#00ff66', alpha=0.5)
 
 def draw_levy_curve_morph(ax, f):
-    def lv(p1, p2, d):
-        if d==0: return [p1, p2]
-        v = p2-p1
-        p3 = p1 + 0.5*np.array([v[0]-v[1], v[0]+v[1]])
-        return lv(p1,p3,d-1)[:-1] + lv(p3,p2,d-1)
-    p = np.array(lv(np.array([-0.5,0]), np.array([0.5,0]), min(12, 5+int(f/80))))
+    p = levy_curve(min(12, 5+int(f/80)))
     ax.plot(p[:,0], p[:,1], color=bio_cmap(0.5), lw=1)
 
 def draw_henon_star_dust(ax, f):
@@ -266,15 +391,6 @@ def draw_henon_star_dust(ax, f):
     p = np.array(pts)
     ax.scatter(p[:,0], p[:,1], s=0.2, color=fire_cmap(0.7), alpha=0.4)
 
-def draw_bifurcation_flow(ax, f):
-    # Зум в область хаоса
-    r = np.linspace(2.8+f/TOTAL_FRAMES, 4.0, 8000)
-    x = 0.5*np.ones_like(r)
-    for _ in range(400): x = r*x*(1-x)
-    for _ in range(150):
-        x = r*x*(1-x)
-        ax.plot(r, x, ',w', alpha=0.15, color=neon_cmap(f/TOTAL_FRAMES))
-
 def draw_sierpinski_gasket_dots(ax, f):
     pts = np.array([[0,0], [1,0], [0.5, 0.86]])
     cur = np.array([0.5, 0.5])
@@ -294,20 +410,14 @@ def draw_lissajous_neon_flow(ax, f):
     ax.plot(np.sin(a*t + delta), np.sin(b*t), color=neon_cmap(0.6), lw=2)
 
 def draw_vicsek_fractal_morph(ax, f):
-    def vs(x, y, s, d):
-        if d==0: 
-            ax.add_patch(plt.Rectangle((x,y), s, s, color=neon_cmap(0.4)))
-            return
-        ns = s/3
-        # Крестообразное деление
-        for dx, dy in [(0,0), (2,0), (1,1), (0,2), (2,2)]:
-            vs(x+dx*ns, y+dy*ns, ns, d-1)
-    vs(-0.5, -0.5, 1.0, min(4, 2+int(f/200)))
+    # Крестообразное деление: клетки глубины кэшированы, все квадраты — одна коллекция
+    corners, s = vicsek_cells(min(4, 2+int(f/200)))
+    ax.add_collection(PolyCollection(squares_to_polys(corners, s), facecolors=neon_cmap(0.4), edgecolors='none'))
 
 # --- ГРАНДИОЗНЫЙ СПИСОК ЗАДАЧ (20 ШЕДЕВРОВ) ---
 tasks = [
     {"n": "01_Liquid_Fire_Plasma", "t": "r", "f": render_fire_plasma, "c": fire_cmap},
-    {"n": "02_Turbo_Mandelbrot", "t": "r", "f": render_mandelbrot_dynamic, "c": neon_cmap},
+    {"n": "02_Turbo_Mandelbrot", "t": "r", "f": render_mandelbrot_dynamic, "aa": render_mandelbrot_aa, "c": neon_cmap},
     {"n": "03_Burning_Ship_Z", "t": "r", "f": render_burning_ship_turbo, "c": fire_cmap},
     {"n": "04_Phoenix_Morph", "t": "r", "f": render_phoenix_morph, "c": bio_cmap},
     {"n": "05_Newton_Crystal", "t": "r", "f": render_newton_crystal, "c": fire_cmap},
@@ -315,50 +425,72 @@ tasks = [
     {"n": "07_Lyapunov_Space", "t": "r", "f": render_lyapunov_space, "c": fire_cmap},
     {"n": "08_Clifford_Smoke", "t": "r", "f": render_clifford_smoke, "c": neon_cmap},
     {"n": "09_DeJong_Plasma", "t": "r", "f": render_dejong_plasma, "c": fire_cmap},
-    {"n": "10_Morph_Julia", "t": "r", "f": render_julia_morph, "c": neon_cmap},
+    {"n": "10_Morph_Julia", "t": "r", "f": render_julia_morph, "aa": render_julia_aa, "c": neon_cmap},
     {"n": "11_Lorenz_Energy_Glow", "t": "3", "f": draw_lorenz_glow},
     {"n": "12_Dragon_Morph", "t": "v", "f": draw_dragon_morph},
     {"n": "13_Pythagoras_Wind_Tree", "t": "v", "f": draw_pythagoras_wind_tree},
     {"n": "14_Barnsley_Fern", "t": "v", "f": draw_barnsley_fern_growth},
     {"n": "15_Levy_Curve", "t": "v", "f": draw_levy_curve_morph},
     {"n": "16_Henon_Dust", "t": "v", "f": draw_henon_star_dust},
-    {"n": "17_Bifurcation_Flow", "t": "v", "f": draw_bifurcation_flow},
+    {"n": "17_Bifurcation_Flow", "t": "r", "f": render_bifurcation_flow, "c": neon_cmap},
     {"n": "18_Sierpinski_Gasket", "t": "v", "f": draw_sierpinski_gasket_dots},
     {"n": "19_Lissajous_Flow", "t": "v", "f": draw_lissajous_neon_flow},
     {"n": "20_Vicsek_Fractal", "t": "v", "f": draw_vicsek_fractal_morph}
 ]
 
+# --- ПОДГОТОВКА ХОЛСТА ПОД ЗАДАЧУ ---
+OUTPUT_TEMPLATE = "{}_4K.mp4"
+WRITER_ARGS = dict(fps=FPS, bitrate=35000, extra_args=['-pix_fmt', 'yuv420p', '-preset', 'faster'])
+
+def warm_up():
+    """Компилирует все растровые ядра на крошечном кадре до начала рендера"""
+    for t in tasks:
+        if t['t'] == "r": raster_kernel(t)(8, 8, 0)
+
+def raster_kernel(t):
+    """Ядро задачи: со сглаживанием, если оно есть у задачи и включено"""
+    return t['aa'] if ANTIALIAS and 'aa' in t else t['f']
+
+def setup_task(fig, t):
+    """Создает оси задачи на готовой фигуре и возвращает функцию update(f)"""
+    if t['t'] == "r": # Растровые задачи
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.axis('off')
+        img = ax.imshow(np.zeros((HEIGHT, WIDTH)), cmap=t['c'], vmin=0, vmax=100, origin='lower', aspect='auto')
+        kernel = raster_kernel(t)
+        def update(f):
+            with TRACE.stage('prep'):
+                data = kernel(WIDTH, HEIGHT, f)
+            img.set_data(data)
+            if f % 10 == 0: print(f"Кадр {f}/{TOTAL_FRAMES}", end='\r')
+            return [img]
+    else: # Векторные и 3D задачи
+        is3 = t['t']=="3"
+        ax = fig.add_axes([0, 0, 1, 1], projection='3d' if is3 else None)
+        def update(f):
+            ax.clear(); ax.set_facecolor('black'); ax.axis('off')
+            if not is3: ax.set_xlim(-1.2, 1.2); ax.set_ylim(-0.7, 0.7)
+            t['f'](ax, f)
+            if f % 10 == 0: print(f"Кадр {f}/{TOTAL_FRAMES}", end='\r')
+            return []
+    return TRACE.hook(fig, update)
+
 # --- ИСПОЛНЕНИЕ (С ОЧИСТКОЙ ПАМЯТИ) ---
+# Пакетный режим с переиспользованием холста и параллельными задачами: python batch.py fractal
 if __name__ == '__main__':
-    writer = animation.FFMpegWriter(fps=FPS, bitrate=35000, extra_args=['-pix_fmt', 'yuv420p', '-preset', 'faster'])
+    writer = animation.FFMpegWriter(**WRITER_ARGS)
     
     for t in tasks:
         print(f"\n>>> Начинаю рендеринг: {t['n']}...")
         # Устанавливаем черный фон сразу при создании фигуры
         fig = plt.figure(figsize=(38.4, 21.6), facecolor='black')
-        
-        if t['t'] == "r": # Растровые задачи
-            ax = fig.add_axes([0, 0, 1, 1])
-            ax.axis('off')
-            img = ax.imshow(np.zeros((HEIGHT, WIDTH)), cmap=t['c'], vmin=0, vmax=100, origin='lower', aspect='auto')
-            def update(f):
-                img.set_data(t['f'](WIDTH, HEIGHT, f))
-                if f % 10 == 0: print(f"Кадр {f}/{TOTAL_FRAMES}", end='\r')
-                return [img]
-        else: # Векторные и 3D задачи
-            is3 = t['t']=="3"
-            ax = fig.add_axes([0, 0, 1, 1], projection='3d' if is3 else None)
-            def update(f):
-                ax.clear(); ax.set_facecolor('black'); ax.axis('off')
-                if not is3: ax.set_xlim(-1.2, 1.2); ax.set_ylim(-0.7, 0.7)
-                t['f'](ax, f)
-                if f % 10 == 0: print(f"Кадр {f}/{TOTAL_FRAMES}", end='\r')
-                return []
+        update = setup_task(fig, t)
 
         ani = animation.FuncAnimation(fig, update, frames=TOTAL_FRAMES)
-        ani.save(f"{t['n']}_4K.mp4", writer=writer)
+        ani.save(OUTPUT_TEMPLATE.format(t['n']), writer=writer)
+        TRACE.save(t['n'])
         # Явная очистка ресурсов после каждого видео
         plt.close(fig)
         gc.collect() # Принудительный запуск сборщика мусора
 
-print("\n\nГОТОВО! Фрактальная Энциклопедия из 20 шедевров создана.")
\ No newline at end of file
+    print("\n\nГОТОВО! Фрактальная Энциклопедия из 20 шедевров создана.")
\ No newline at end of file
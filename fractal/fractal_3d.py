@@ -5,8 +5,17 @@ import matplotlib.animation as animation
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.colors import LinearSegmentedColormap
 from numba import jit, prange
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from heightfield import HeightfieldRenderer, colormap_lut
+from geometry import dragon_curve, levy_curve, tree_segments, vicsek_cells
 import gc
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import frame_trace
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # --- НАСТРОЙКИ 4K 3D ---
 WIDTH, HEIGHT = 3840, 2160
@@ -14,6 +23,12 @@ FPS, SECONDS = 30, 30
 TOTAL_FRAMES = FPS * SECONDS
 GRID_RES = 400 
 MAX_ITER = 100
+# Рендер поверхностей: "numba" — собственный z-буфер, "mplot3d" — ax.plot_surface
+SURFACE_RENDERER = "numba"
+
+# Явная сигнатура ядер поверхностей (f, X, Y) -> Z: компиляция один раз при импорте,
+# дисковый кэш Numba, без случайных перекомпиляций. Прогрев: python warmup.py
+SURFACE_SIG = "float64[:, :](int64, float64[:, :], float64[:, :])"
 
 # Глобальная сетка для растровых задач
 _x = np.linspace(-2.2, 2.2, GRID_RES)
@@ -27,7 +42,7 @@ ice_cmap = LinearSegmentedColormap.from_list("ice", ["#000510", "#002244", "#00c
 
 # --- БЛОК 1: 10 РАСТРОВЫХ ЯДЕР (SURFACES) ---
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_mandel(f, X, Y):
     Z = np.zeros((GRID_RES, GRID_RES))
     zoom = 1.0 + (f / 50)
@@ -41,7 +56,7 @@ def calc_mandel(f, X, Y):
             Z[i,j] = it
     return Z
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_ship(f, X, Y):
     Z = np.zeros((GRID_RES, GRID_RES))
     zoom = 1.0 + (f / 30)
@@ -55,7 +70,7 @@ def calc_ship(f, X, Y):
             Z[i,j] = it
     return Z
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_julia(f, X, Y):
     Z = np.zeros((GRID_RES, GRID_RES))
     ca, cb = -0.7 + 0.1*np.cos(f/60), 0.27 + 0.05*np.sin(f/40)
@@ -68,12 +83,12 @@ def calc_julia(f, X, Y):
             Z[i,j] = it
     return Z
 
-@jit(nopython=True)
+@jit(SURFACE_SIG, nopython=True, cache=True)
 def calc_plasma(f, X, Y):
     t = f * 0.1
     return (np.sin(X+t) + np.sin((Y+t)/2) + np.cos(np.sqrt(X**2+Y**2)+t)) * 5 + 10
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_newton(f, X, Y):
     Z = np.zeros((GRID_RES, GRID_RES))
     zoom = 1.0 + (f / 40)
@@ -92,7 +107,7 @@ def calc_newton(f, X, Y):
             Z[i,j] = it + np.sqrt(zx*zx + zy*zy)
     return Z
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_biomorph(f, X, Y):
     Z = np.zeros((GRID_RES, GRID_RES))
     cr, ci = 0.5 + 0.1*np.sin(f/50), 0.5
@@ -111,7 +126,7 @@ def calc_biomorph(f, X, Y):
                 it += 1
     return Z
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_phoenix(f, X, Y):
     Z = np.zeros((GRID_RES, GRID_RES))
     c, p = -0.4, 0.3
@@ -125,7 +140,7 @@ def calc_phoenix(f, X, Y):
             Z[i,j] = it
     return Z
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_lyapunov(f, X, Y):
     Z = np.zeros((GRID_RES, GRID_RES))
     for i in prange(GRID_RES):
@@ -139,7 +154,7 @@ def calc_lyapunov(f, X, Y):
             Z[i,j] = max(lyap, -50)
     return Z
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_clifford(f, X, Y):
     res = np.zeros((GRID_RES, GRID_RES))
     a, b, c, d = -1.4 + 0.1*np.sin(f/50), 1.6, 1.0, 0.7
@@ -151,7 +166,7 @@ def calc_clifford(f, X, Y):
         if 0<=px<GRID_RES and 0<=py<GRID_RES: res[py, px] += 1
     return np.log1p(res)*8
 
-@jit(nopython=True, parallel=True)
+@jit(SURFACE_SIG, nopython=True, parallel=True, cache=True)
 def calc_dejong(f, X, Y):
     res = np.zeros((GRID_RES, GRID_RES))
     a, b, c, d = 1.4, -2.3 + 0.1*np.sin(f/40), 2.4, -1.2
@@ -176,20 +191,14 @@ def draw_lorenz(ax, f):
 
 def draw_dragon(ax, f):
     it, am = min(12, int(f/70)+6), np.deg2rad(90 + np.sin(f/45)*15)
-    pts = np.array([[0,0], [1,0]], dtype=np.float64)
-    for _ in range(it):
-        c = pts[-1]; rot = np.array([[np.cos(am), -np.sin(am)], [np.sin(am), np.cos(am)]])
-        pts = np.vstack((pts, (np.dot(pts[:-1]-c, rot) + c)[::-1]))
+    pts = dragon_curve(it, am)
     ax.plot(pts[:,0], pts[:,1], np.linspace(0,10,len(pts)), color='#00ffff', lw=1)
 
 def draw_tree(ax, f):
     ang = np.deg2rad(25 + np.sin(f/30)*10)
-    def pb(x, y, z, s, a, d):
-        if d==0: return
-        x1, y1, z1 = x+s*np.cos(a), y+s*np.sin(a), z+s*0.6
-        ax.plot([x,x1], [y,y1], [z,z1], color=gold_cmap(d/10), lw=d)
-        pb(x1, y1, z1, s*0.7, a+ang, d-1); pb(x1, y1, z1, s*0.7, a-ang, d-1)
-    pb(0,0,0, 5, np.pi/2, 8)
+    segs, d = tree_segments(8, 5, np.pi/2, ang, 0.7, origin=(0, 0, 0), rise=0.6)
+    ax.add_collection3d(Line3DCollection(segs, colors=gold_cmap(d/10), linewidths=d))
+    ax.auto_scale_xyz(segs[..., 0], segs[..., 1], segs[..., 2])
 
 def draw_fern(ax, f):
     n, pts = 8000 + f*200, [[0,0,0]]
@@ -202,11 +211,7 @@ def draw_fern(ax, f):
     p = np.array(pts); ax.scatter(p[:,0], p[:,1], p[:,2], s=0.2, color='#00ff66', alpha=0.3)
 
 def draw_levy(ax, f):
-    def lv(p1, p2, d):
-        if d==0: return [p1, p2]
-        v = p2-p1; p3 = p1 + 0.5*np.array([v[0]-v[1], v[0]+v[1]])
-        return lv(p1,p3,d-1)[:-1] + lv(p3,p2,d-1)
-    p = np.array(lv(np.array([-0.5,0]), np.array([0.5,0]), 11))
+    p = levy_curve(11)
     ax.plot(p[:,0], p[:,1], np.sin(np.linspace(0,5,len(p))), color='#00ccff', lw=0.8)
 
 def draw_henon(ax, f):
@@ -234,12 +239,9 @@ def draw_lissa(ax, f):
     ax.plot(np.sin(3*t+f/20), np.cos(2*t), np.sin(5*t+f/50), color='#ff00ff', lw=2)
 
 def draw_vicsek(ax, f):
-    def vs(x, y, z, s, d):
-        if d==0: ax.scatter([x], [y], [z], s=1, color='#00ffff'); return
-        ns = s/3
-        for dx, dy, dz in [(1,1,1), (0,1,1), (2,1,1), (1,0,1), (1,2,1)]:
-            vs(x+dx*ns, y+dy*ns, z+dz*ns, ns, d-1)
-    vs(0,0,0, 1, 3)
+    # Все точки креста — один scatter вместо отдельного артиста на точку
+    p, _ = vicsek_cells(3, offsets=((1,1,1), (0,1,1), (2,1,1), (1,0,1), (1,2,1)), x=0, y=0, size=1)
+    ax.scatter(p[:, 0], p[:, 1], p[:, 2], s=1, color='#00ffff')
 
 # --- ИСПОЛНИТЕЛЬНЫЙ БЛОК ---
 
@@ -266,30 +268,58 @@ tasks = [
     {"n": "20_Vicsek_3D", "m": "v", "f": draw_vicsek}
 ]
 
-if __name__ == '__main__':
-    writer = animation.FFMpegWriter(fps=FPS, bitrate=45000, extra_args=['-pix_fmt', 'yuv420p'])
+OUTPUT_TEMPLATE = "{}_4K_3D.mp4"
+WRITER_ARGS = dict(fps=FPS, bitrate=45000, extra_args=['-pix_fmt', 'yuv420p'])
+
+def warm_up():
+    """Компилирует ядра поверхностей и рендер карты высот до начала рендера"""
+    hf = HeightfieldRenderer(X_GRID, Y_GRID, 16, 9, colormap_lut(neon_cmap))
     for t in tasks:
-        print(f"\n>>> ГЕНЕРАЦИЯ: {t['n']}")
-        fig = plt.figure(figsize=(38.4, 21.6), facecolor='black')
+        if t['m'] == "s": hf.render(t['f'](0, X_GRID, Y_GRID), elev=35, azim=0)
+
+def setup_task(fig, t):
+    """Создает оси задачи на готовой фигуре и возвращает функцию update(f)"""
+    if t['m'] == "s" and SURFACE_RENDERER == "numba":
+        # Кадр целиком собирается в ядре, matplotlib только выводит массив
+        ax = fig.add_axes([0, 0, 1, 1]); ax.axis('off')
+        hf = HeightfieldRenderer(X_GRID, Y_GRID, WIDTH, HEIGHT, colormap_lut(t['c']))
+        img = ax.imshow(hf.frame, interpolation='nearest', aspect='auto')
+        def update(f):
+            with TRACE.stage('prep'):
+                frame = hf.render(t['f'](f, X_GRID, Y_GRID), elev=35, azim=f*0.8)
+            img.set_data(frame)
+            return [img]
+    elif t['m'] == "s":
         ax = fig.add_axes([0, 0, 1, 1], projection='3d')
         ax.set_facecolor('black'); ax.axis('off')
-
-        if t['m'] == "s":
-            def update(f):
-                ax.clear(); ax.axis('off')
+        def update(f):
+            ax.clear(); ax.axis('off')
+            with TRACE.stage('prep'):
                 Z = t['f'](f, X_GRID, Y_GRID)
-                surf = ax.plot_surface(X_GRID, Y_GRID, Z, cmap=t['c'], linewidth=0, antialiased=False, shade=True)
-                ax.view_init(elev=35, azim=f*0.8)
-                return [surf]
-        else:
-            def update(f):
-                ax.clear(); ax.axis('off')
-                t['f'](ax, f)
-                ax.view_init(elev=25, azim=f*1.2)
-                return []
+            surf = ax.plot_surface(X_GRID, Y_GRID, Z, cmap=t['c'], linewidth=0, antialiased=False, shade=True)
+            ax.view_init(elev=35, azim=f*0.8)
+            return [surf]
+    else:
+        ax = fig.add_axes([0, 0, 1, 1], projection='3d')
+        ax.set_facecolor('black'); ax.axis('off')
+        def update(f):
+            ax.clear(); ax.axis('off')
+            t['f'](ax, f)
+            ax.view_init(elev=25, azim=f*1.2)
+            return []
+    return TRACE.hook(fig, update)
+
+# Пакетный режим с переиспользованием холста и параллельными задачами: python batch.py fractal_3d
+if __name__ == '__main__':
+    writer = animation.FFMpegWriter(**WRITER_ARGS)
+    for t in tasks:
+        print(f"\n>>> ГЕНЕРАЦИЯ: {t['n']}")
+        fig = plt.figure(figsize=(38.4, 21.6), facecolor='black')
+        update = setup_task(fig, t)
 
         ani = animation.FuncAnimation(fig, update, frames=TOTAL_FRAMES)
-        ani.save(f"{t['n']}_4K_3D.mp4", writer=writer)
+        ani.save(OUTPUT_TEMPLATE.format(t['n']), writer=writer)
+        TRACE.save(t['n'])
         plt.close(fig); gc.collect()
         send_email('admin@obzhora.org', f'Готов: {t["n"]}', f'Файл успешно создан.')
 
@@ -0,0 +1,124 @@
+"""
+ГЕОМЕТРИЯ КРИВЫХ И ДЕРЕВЬЕВ БЕЗ РЕКУРСИИ
+
+Кривые Леви и дракона, двоичные деревья и ковер Вичека строятся итеративно
+в заранее выделенных массивах NumPy. Неизменная между кадрами топология
+(номера поворотов ветвей, клетки Вичека, точки Леви) кэшируется, на кадре
+пересчитываются только углы. Результат отдается одной коллекцией на кадр
+(LineCollection / PolyCollection / Line3DCollection) вместо тысяч артистов.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def levy_curve(depth, p1=(-0.5, 0.0), p2=(0.5, 0.0)):
+    """Точки C-кривой Леви глубины depth: массив (2**depth + 1, 2)"""
+    n = 2**depth + 1
+    pts = np.empty((n, 2))
+    pts[0], pts[-1] = p1, p2
+    step = n - 1
+    # На каждом уровне между соседними точками вставляется вершина прямого угла
+    while step > 1:
+        a, b = pts[0:n-1:step], pts[step::step]
+        v = b - a
+        pts[step//2::step] = a + 0.5 * np.column_stack((v[:, 0] - v[:, 1], v[:, 0] + v[:, 1]))
+        step //= 2
+    pts.flags.writeable = False
+    return pts
+
+
+def dragon_curve(iterations, angle):
+    """Кривая дракона: iterations разворотов на угол angle (рад), массив (2**it + 1, 2)"""
+    pts = np.empty((2**iterations + 1, 2))
+    pts[0], pts[1] = (0.0, 0.0), (1.0, 0.0)
+    rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    n = 2
+    for _ in range(iterations):
+        c = pts[n-1]
+        # Копия уже построенной части, повернутая вокруг последней точки, в обратном порядке
+        pts[n:2*n-1] = ((pts[:n-1] - c) @ rot + c)[::-1]
+        n = 2*n - 1
+    return pts
+
+
+@lru_cache(maxsize=None)
+def _tree_turns(depth):
+    """Для каждого уровня двоичного дерева: сколько раз ветвь повернула влево минус вправо"""
+    turns = [np.zeros(1, dtype=np.int64)]
+    for _ in range(1, depth):
+        prev = turns[-1]
+        lvl = np.empty(prev.size * 2, dtype=np.int64)
+        lvl[0::2], lvl[1::2] = prev + 1, prev - 1
+        turns.append(lvl)
+    return tuple(turns)
+
+
+def tree_segments(depth, length, root_angle, split, scale, origin=(0.0, 0.0), rise=None):
+    """
+    Отрезки двоичного дерева (как рекурсия pb в fractal.py), посчитанные по уровням.
+    rise — если задан, добавляет третью координату z += длина * rise (дерево в 3D).
+    Возвращает (segments (M, 2, D), remaining (M,)), где remaining — «d» из рекурсии.
+    """
+    dims = 2 if rise is None else 3
+    origin = [list(origin) + [0.0] * (dims - len(origin))]
+    segs, remaining, _, _, _ = forest_segments(origin, [length], depth, root_angle, [split], scale, rise)
+    return segs, remaining
+
+
+def forest_segments(origins, lengths, depth, root_angle, split, scale, rise=None, bend=None):
+    """
+    Отрезки T деревьев одной глубины сразу, одним проходом по уровням.
+    lengths, split — длина ствола и угол ветвления каждого дерева (T,);
+    bend — добавка к углу ветвей каждого уровня (depth,), например ветер.
+    Возвращает (segments (T*M, 2, D), remaining (T*M,), кончики (T*2**depth, D),
+    их углы и длины следующей ветви) — кончики нужны для листьев.
+    """
+    start = np.array(origins, dtype=np.float64)[:, None, :]
+    lengths, split = np.asarray(lengths, dtype=np.float64), np.asarray(split, dtype=np.float64)
+    trees, dims = start.shape[0], start.shape[2]
+    total = 2**depth - 1
+    segs = np.empty((trees, total, 2, dims))
+    remaining = np.empty((trees, total))
+    turns = _tree_turns(depth + 1)
+    k = 0
+    for level in range(depth):
+        ang = root_angle + turns[level][None, :] * split[:, None]
+        if bend is not None:
+            ang = ang + bend[level]
+        s = (lengths * scale**level)[:, None]
+        end = start.copy()
+        end[..., 0] += s * np.cos(ang)
+        end[..., 1] += s * np.sin(ang)
+        if dims == 3:
+            end[..., 2] += s * rise
+        m = turns[level].size
+        segs[:, k:k+m, 0], segs[:, k:k+m, 1] = start, end
+        remaining[:, k:k+m] = depth - level
+        k += m
+        start = np.repeat(end, 2, axis=1)
+    tip_angles = root_angle + turns[depth][None, :] * split[:, None]
+    tip_sizes = np.repeat(lengths * scale**depth, 2**depth)
+    return (segs.reshape(-1, 2, dims), remaining.ravel(), start.reshape(-1, dims),
+            tip_angles.ravel(), tip_sizes)
+
+
+@lru_cache(maxsize=None)
+def vicsek_cells(depth, offsets=((0, 0), (2, 0), (1, 1), (0, 2), (2, 2)), x=-0.5, y=-0.5, size=1.0):
+    """Клетки фрактала Вичека: (углы (K, D), сторона клетки). offsets задают крест или X"""
+    offs = np.array(offsets, dtype=np.float64)
+    corners = np.array([[x, y] + [0.0] * (offs.shape[1] - 2)])
+    s = size
+    for _ in range(depth):
+        s /= 3
+        corners = (corners[:, None, :] + offs[None, :, :] * s).reshape(-1, offs.shape[1])
+    corners.flags.writeable = False
+    return corners, s
+
+
+def squares_to_polys(corners, size):
+    """Квадраты со стороной size в вершины для PolyCollection: (K, 4, 2)"""
+    quad = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float64) * size
+    return corners[:, None, :2] + quad[None, :, :]
@@ -0,0 +1,137 @@
+"""
+ПРОГРАММНЫЙ РЕНДЕР КАРТЫ ВЫСОТ (ЗАМЕНА ax.plot_surface)
+
+mplot3d сортирует и рисует 160 000 полигонов сетки GRID_RES×GRID_RES на Python.
+Здесь та же поверхность проецируется камерой view_init(elev, azim), проходит
+z-буфер и плоское затенение в скомпилированном ядре, а на выходе сразу
+получается RGB-кадр для imshow / ffmpeg.
+"""
+
+import numpy as np
+from numba import jit, prange
+
+# Пропорции куба осей, как у mplot3d по умолчанию (box_aspect 4:4:3)
+BOX_XY, BOX_Z = 1.0, 0.75
+# Доля высоты кадра на единицу куба (куб целиком помещается в 16:9 при любом azim)
+VIEW_SCALE = 0.34
+# Источник света mplot3d по умолчанию: LightSource(azdeg=225, altdeg=19.4712)
+LIGHT_AZDEG, LIGHT_ALTDEG = 225.0, 19.4712
+BG_COLOR = np.array([0, 0, 0], dtype=np.uint8)
+
+
+def colormap_lut(cmap, n=1024):
+    """Таблица цветов палитры в виде массива (n, 3) float64 в диапазоне 0..255"""
+    return np.ascontiguousarray(cmap(np.linspace(0, 1, n))[:, :3] * 255.0)
+
+
+def _light_dir():
+    az, alt = np.radians(90 - LIGHT_AZDEG), np.radians(LIGHT_ALTDEG)
+    return np.array([np.cos(az)*np.cos(alt), np.sin(az)*np.cos(alt), np.sin(alt)])
+
+
+LIGHT_DIR = _light_dir()
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def _project(X, Y, Z, elev, azim, w, h, px, py, pd):
+    n, m = Z.shape
+    zmin, zmax = Z.min(), Z.max()
+    zspan = zmax - zmin if zmax > zmin else 1.0
+    xmin, xspan = X.min(), X.max() - X.min()
+    ymin, yspan = Y.min(), Y.max() - Y.min()
+    e, a = np.radians(elev), np.radians(azim)
+    # Базис камеры: w — к наблюдателю, u — вправо, v — вверх (как proj3d._view_axes)
+    wx, wy, wz = np.cos(e)*np.cos(a), np.cos(e)*np.sin(a), np.sin(e)
+    ux, uy = -np.sin(a), np.cos(a)
+    vx, vy, vz = -np.sin(e)*np.cos(a), -np.sin(e)*np.sin(a), np.cos(e)
+    scale = VIEW_SCALE * h
+    for i in prange(n):
+        for j in range(m):
+            x = (2*(X[i, j] - xmin)/xspan - 1) * BOX_XY
+            y = (2*(Y[i, j] - ymin)/yspan - 1) * BOX_XY
+            z = (2*(Z[i, j] - zmin)/zspan - 1) * BOX_Z
+            px[i, j] = w/2 + (x*ux + y*uy) * scale
+            py[i, j] = h/2 - (x*vx + y*vy + z*vz) * scale
+            pd[i, j] = x*wx + y*wy + z*wz
+    return zmin, zspan
+
+
+@jit(nopython=True, cache=True)
+def _fill_triangle(img, zbuf, x0, y0, d0, x1, y1, d1, x2, y2, d2, r, g, b):
+    h, w = zbuf.shape
+    area = (x1 - x0)*(y2 - y0) - (x2 - x0)*(y1 - y0)
+    if abs(area) < 1e-12:
+        return
+    lo_x, hi_x = max(int(min(x0, x1, x2)), 0), min(int(max(x0, x1, x2)) + 1, w)
+    lo_y, hi_y = max(int(min(y0, y1, y2)), 0), min(int(max(y0, y1, y2)) + 1, h)
+    inv = 1.0 / area
+    for yy in range(lo_y, hi_y):
+        cy = yy + 0.5
+        for xx in range(lo_x, hi_x):
+            cx = xx + 0.5
+            # Барицентрические координаты центра пикселя
+            b0 = ((x1 - cx)*(y2 - cy) - (x2 - cx)*(y1 - cy)) * inv
+            b1 = ((x2 - cx)*(y0 - cy) - (x0 - cx)*(y2 - cy)) * inv
+            b2 = 1.0 - b0 - b1
+            if b0 < 0 or b1 < 0 or b2 < 0:
+                continue
+            d = b0*d0 + b1*d1 + b2*d2
+            if d > zbuf[yy, xx]:
+                zbuf[yy, xx] = d
+                img[yy, xx, 0] = r
+                img[yy, xx, 1] = g
+                img[yy, xx, 2] = b
+
+
+@jit(nopython=True, cache=True)
+def _rasterize(Z, zmin, zspan, px, py, pd, lut, light, img, zbuf):
+    n, m = Z.shape
+    nl = lut.shape[0] - 1
+    sx = 2.0 * BOX_XY / (m - 1)
+    sy = 2.0 * BOX_XY / (n - 1)
+    for i in range(n - 1):
+        for j in range(m - 1):
+            # Цвет грани — по средней высоте, как facecolors у plot_surface
+            zm = (Z[i, j] + Z[i+1, j] + Z[i, j+1] + Z[i+1, j+1]) * 0.25
+            c = lut[min(max(int((zm - zmin) / zspan * nl), 0), nl)]
+            # Нормаль грани в координатах куба
+            dzx = ((Z[i, j+1] + Z[i+1, j+1]) - (Z[i, j] + Z[i+1, j])) * BOX_Z / zspan / sx
+            dzy = ((Z[i+1, j] + Z[i+1, j+1]) - (Z[i, j] + Z[i, j+1])) * BOX_Z / zspan / sy
+            nx, ny, nz = -dzx, -dzy, 2.0
+            norm = np.sqrt(nx*nx + ny*ny + nz*nz)
+            dot = (nx*light[0] + ny*light[1] + nz*light[2]) / norm
+            # Та же шкала, что mplot3d._shade_colors: [-1, 1] -> [0.3, 1]
+            k = 0.3 + 0.7 * (dot + 1) * 0.5
+            r, g, b = np.uint8(c[0]*k), np.uint8(c[1]*k), np.uint8(c[2]*k)
+            _fill_triangle(img, zbuf,
+                           px[i, j], py[i, j], pd[i, j],
+                           px[i+1, j], py[i+1, j], pd[i+1, j],
+                           px[i+1, j+1], py[i+1, j+1], pd[i+1, j+1], r, g, b)
+            _fill_triangle(img, zbuf,
+                           px[i, j], py[i, j], pd[i, j],
+                           px[i+1, j+1], py[i+1, j+1], pd[i+1, j+1],
+                           px[i, j+1], py[i, j+1], pd[i, j+1], r, g, b)
+
+
+class HeightfieldRenderer:
+    """Держит буферы кадра и рисует поверхность Z(X, Y) в массив (h, w, 3) uint8"""
+
+    def __init__(self, X, Y, width, height, lut):
+        self.X, self.Y = np.ascontiguousarray(X), np.ascontiguousarray(Y)
+        self.width, self.height = width, height
+        self.lut = lut
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.zbuf = np.empty((height, width), dtype=np.float64)
+        self.px = np.empty(X.shape, dtype=np.float64)
+        self.py = np.empty(X.shape, dtype=np.float64)
+        self.pd = np.empty(X.shape, dtype=np.float64)
+
+    def render(self, Z, elev, azim):
+        Z = np.ascontiguousarray(Z, dtype=np.float64)
+        self.frame[:] = BG_COLOR
+        self.zbuf.fill(-np.inf)
+        zmin, zspan = _project(self.X, self.Y, Z, float(elev), float(azim),
+                               self.width, self.height, self.px, self.py, self.pd)
+        _rasterize(Z, zmin, zspan, self.px, self.py, self.pd, self.lut, LIGHT_DIR,
+                   self.frame, self.zbuf)
+        return self.frame
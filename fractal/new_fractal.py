@@ -14,6 +14,13 @@ import numpy as np
 import imageio
 import time
 import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import frame_trace
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # ==================== НАСТРОЙКИ ====================
 WIDTH       = 3840
@@ -34,6 +41,10 @@ BLOOM_SIGMA_BASE   = 6.0
 # Тестовый режим — раскомментировать при необходимости
 # WIDTH=1280; HEIGHT=720; FRAMES=120; TREE_DEPTH=10; FERN_POINTS=5000; BLOOM_PASSES=2
 
+# Основные ядра объявлены с явными сигнатурами: компилируются при импорте один раз,
+# лежат в дисковом кэше Numba и не перекомпилируются под другие типы аргументов.
+# Прогрев кэша и замер старта: python warmup.py [--bench]
+
 @nb.njit(fastmath=True, cache=True)
 def hsv_to_rgb(h, s, v):
     h = h % 1.0
@@ -50,7 +61,7 @@ def hsv_to_rgb(h, s, v):
     else:        return v, p, q
 
 # ==================== BLOOM ====================
-@nb.njit(fastmath=True, parallel=True, cache=True)
+@nb.njit("void(float32[:, :, ::1], float32[:, :, ::1], float64)", fastmath=True, parallel=True, cache=True)
 def apply_gaussian_blur(img_in, img_out, sigma):
     ksize = int(sigma * 3.5) * 2 + 1
     if ksize % 2 == 0: ksize += 1
@@ -95,7 +106,7 @@ def apply_gaussian_blur(img_in, img_out, sigma):
                     b += temp[yy, x, 2] * ww
             img_out[y, x, 0] = r; img_out[y, x, 1] = g; img_out[y, x, 2] = b
 
-@nb.njit(fastmath=True, parallel=True, cache=True)
+@nb.njit("void(float32[:, :, ::1], float32[:, :, ::1], float32[:, :, ::1])", fastmath=True, parallel=True, cache=True)
 def apply_bloom(img, temp1, temp2):
     h, w, _ = img.shape
     for y in nb.prange(h):
@@ -136,7 +147,8 @@ def barnsley_fern_step(x, y):
     else:
         return -0.15 * x + 0.28 * y, 0.26 * x + 0.24 * y + 0.44
 
-@nb.njit(fastmath=True, parallel=True, cache=True)
+@nb.njit("void(int64, int64, int64, uint8[:, :, ::1], float32[:, :, ::1], float32[:, :, ::1])",
+         fastmath=True, parallel=True, cache=True)
 def render_tree_fern(frame_idx, w, h, img, temp1, temp2):
     t = frame_idx / 180.0
     cam_angle = t * 0.55 + math.sin(t * 0.2) * 0.15
@@ -314,12 +326,16 @@ def render_and_save(filename):
     
     for f in range(FRAMES):
         t0 = time.time()
-        render_tree_fern(f, WIDTH, HEIGHT, buffer, bloom_temp1, bloom_temp2)
+        TRACE.frame()
+        with TRACE.stage('prep'):
+            render_tree_fern(f, WIDTH, HEIGHT, buffer, bloom_temp1, bloom_temp2)
         
         if BLOOM_PASSES > 0:
-            apply_bloom(buffer.astype(np.float32), bloom_temp1, bloom_temp2)
+            with TRACE.stage('draw'):
+                apply_bloom(buffer.astype(np.float32), bloom_temp1, bloom_temp2)
         
-        writer.append_data(buffer)
+        with TRACE.stage('encode'):
+            writer.append_data(buffer)
         print(f"  кадр {f+1:4d}/{FRAMES}   — {time.time()-t0:5.2f} с")
     
     writer.close()
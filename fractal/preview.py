@@ -0,0 +1,144 @@
+"""
+БЫСТРЫЙ ПРЕДПРОСМОТР РАСТРОВЫХ ФРАКТАЛОВ (fractal.py)
+
+То же ядро, что и в 4K-рендере (со сглаживанием, если оно включено), но на 1/8, 1/4 и 1/2 разрешения и только
+на каждом k-м кадре анимации. Уровни идут по нарастающей: лист-превью
+(контактный лист) перезаписывается после каждого уровня, так что первая
+картинка появляется за секунды, а дальше только уточняется.
+
+Параметры сцен (MANDEL_CENTER, SHIP_CENTER, JULIA_C, MAX_ITER ...) можно
+подменить без правки скрипта — ядро перекомпилируется с новыми значениями.
+--samples уменьшает число субпикселей сглаживания (AA_SAMPLES) ради скорости.
+Стороны уровней округляются до четных, чтобы прокси-видео принял libx264.
+
+Запуск:
+    python preview.py 02_Turbo_Mandelbrot --every 90
+    python preview.py 10_Morph_Julia --set "JULIA_C=(-0.8, 0.156)" --levels 8 4
+    python preview.py 03_Burning_Ship_Z --video proxy.mp4 --levels 8
+    python preview.py 02_Turbo_Mandelbrot --samples 2 --levels 16 8
+"""
+
+import argparse
+import ast
+import math
+import os
+import sys
+import types
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from numba import jit
+from numba.core.dispatcher import Dispatcher
+
+import fractal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_pipe import FramePipe, even
+
+LEVELS = (8, 4, 2)   # Делители разрешения, от грубого к точному
+EVERY = 60           # Брать каждый k-й кадр анимации
+
+
+def with_overrides(kernel, overrides, _done=None):
+    """
+    Копия ядра с подмененными глобальными константами (Numba вшивает их при
+    компиляции). Вызываемые ядром jit-функции (mandel_sample, julia_view,
+    render_mandelbrot_dynamic ...) заморожены так же, поэтому перекомпилируется
+    вся цепочка вызовов.
+    """
+    if not overrides:
+        return kernel
+    done = {} if _done is None else _done
+    if kernel in done:
+        return done[kernel]
+    py = kernel.py_func
+    env = dict(py.__globals__, **overrides)
+    for name in py.__code__.co_names:
+        callee = env.get(name)
+        if isinstance(callee, Dispatcher):
+            env[name] = with_overrides(callee, overrides, done)
+    fn = types.FunctionType(py.__code__, env, py.__name__, py.__defaults__, py.__closure__)
+    # Без cache: кэш Numba привязан к файлу функции, а не к значениям констант
+    options = {k: v for k, v in kernel.targetoptions.items() if k != 'cache'}
+    done[kernel] = jit(**options)(fn)
+    return done[kernel]
+
+
+def colorize(data, cmap):
+    """Кадр ядра -> RGB uint8 так же, как imshow(vmin=0, vmax=100, origin='lower')"""
+    rgba = cmap(np.clip(data / 100.0, 0, 1), bytes=True)
+    return rgba[::-1, :, :3]
+
+
+def contact_sheet(tiles, cols=None):
+    """Склейка одинаковых тайлов в сетку"""
+    n = len(tiles)
+    cols = cols or math.ceil(math.sqrt(n))
+    rows = math.ceil(n / cols)
+    th, tw, _ = tiles[0].shape
+    sheet = np.zeros((rows * th, cols * tw, 3), dtype=np.uint8)
+    for k, tile in enumerate(tiles):
+        r, c = divmod(k, cols)
+        sheet[r*th:(r+1)*th, c*tw:(c+1)*tw] = tile
+    return sheet
+
+
+def render_level(kernel, cmap, frames, div):
+    w, h = even(fractal.WIDTH // div), even(fractal.HEIGHT // div)
+    return [colorize(kernel(w, h, f), cmap) for f in frames]
+
+
+def preview(task_name, overrides=None, every=EVERY, levels=LEVELS, sheet_file=None, video_file=None,
+            samples=None):
+    t = next(t for t in fractal.tasks if t['n'] == task_name)
+    if t['t'] != "r":
+        raise ValueError(f"{task_name}: предпросмотр доступен только для растровых задач")
+    overrides = dict(overrides or {})
+    if samples is not None:
+        if not 1 <= samples <= len(fractal.AA_OFFSETS):
+            raise ValueError(f"--samples: от 1 до {len(fractal.AA_OFFSETS)}")
+        overrides['AA_SAMPLES'] = samples
+    # То же ядро, что у финального рендера (fractal.raster_kernel)
+    kernel = with_overrides(fractal.raster_kernel(t), overrides)
+    frames = list(range(0, fractal.TOTAL_FRAMES, every))
+    sheet_file = sheet_file or f"{task_name}_preview.png"
+
+    for div in levels:
+        tiles = render_level(kernel, t['c'], frames, div)
+        if video_file:
+            h, w, _ = tiles[0].shape
+            with FramePipe(video_file, w, h, max(1, fractal.FPS // every), pix_fmt='rgb24',
+                           extra_args=['-pix_fmt', 'yuv420p']) as pipe:
+                for tile in tiles:
+                    pipe.write(tile)
+        else:
+            plt.imsave(sheet_file, contact_sheet(tiles))
+        print(f"  1/{div}: {len(frames)} кадров -> {video_file or sheet_file}")
+
+
+def _parse_overrides(items):
+    overrides = {}
+    for item in items or []:
+        name, value = item.split('=', 1)
+        if not hasattr(fractal, name.strip()):
+            raise KeyError(f"В fractal.py нет константы {name}")
+        overrides[name.strip()] = ast.literal_eval(value.strip())
+    return overrides
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Предпросмотр растровых фракталов на низком разрешении")
+    parser.add_argument('task', help="имя задачи, например 02_Turbo_Mandelbrot")
+    parser.add_argument('--set', action='append', metavar='NAME=VALUE',
+                        help="подменить константу fractal.py, например \"MANDEL_CENTER=(-0.75, 0.1)\"")
+    parser.add_argument('--every', type=int, default=EVERY)
+    parser.add_argument('--levels', type=int, nargs='+', default=list(LEVELS))
+    parser.add_argument('--sheet', help="файл контактного листа (по умолчанию <задача>_preview.png)")
+    parser.add_argument('--video', help="вместо листа записать прокси-видео")
+    parser.add_argument('--samples', type=int, help="субпикселей сглаживания (по умолчанию как в рендере)")
+    args = parser.parse_args()
+
+    preview(args.task, _parse_overrides(args.set), args.every, args.levels, args.sheet, args.video,
+            args.samples)
@@ -0,0 +1,83 @@
+"""
+ВОЗОБНОВЛЯЕМЫЙ РЕНДЕР ПО СЕГМЕНТАМ
+
+Ролик пишется кусками по SEGMENT_FRAMES кадров, каждый в свой файл в папке
+<ролик>.parts/. В manifest.json хранятся параметры рендера и список готовых
+сегментов. Повторный запуск пропускает готовые сегменты, а финальная склейка
+идет через concat-демультиплексор ffmpeg без перекодирования (-c copy).
+"""
+
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_pipe import concat, figure_pipe
+
+SEGMENT_FRAMES = 90     # 3 секунды при 30 fps
+KEEP_PARTS = False      # Оставлять ли сегменты после успешной склейки
+
+
+def _load_manifest(path, params):
+    """Манифест с прошлого запуска, если он был сделан с теми же параметрами"""
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('params') == params:
+            return manifest
+    return {'params': params, 'done': {}}
+
+
+def _save_manifest(path, manifest):
+    # Атомарная запись: оборванный запуск не оставит битый манифест
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def stitch(parts, out_file):
+    """Склейка готовых сегментов в один файл без перекодирования"""
+    concat(parts, out_file)
+
+
+def render_segmented(fig, update, out_file, total_frames, writer_args,
+                     params=None, seg_frames=SEGMENT_FRAMES):
+    """
+    Рендер кадров 0..total_frames-1 сегментами с возобновлением.
+    params — всё, от чего зависит картинка (имя задачи, размеры, константы ядер);
+    при их изменении старые сегменты считаются недействительными.
+    Возвращает число реально отрисованных кадров.
+    """
+    parts_dir = out_file + '.parts'
+    os.makedirs(parts_dir, exist_ok=True)
+    manifest_path = os.path.join(parts_dir, 'manifest.json')
+    w, h = fig.canvas.get_width_height(physical=True)
+    params = dict(params or {}, frames=total_frames, seg_frames=seg_frames,
+                  size=[w, h], writer=writer_args)
+    manifest = _load_manifest(manifest_path, params)
+
+    rendered, parts = 0, []
+    for start in range(0, total_frames, seg_frames):
+        end = min(start + seg_frames, total_frames)
+        part = os.path.join(parts_dir, f"seg_{start:06d}.mp4")
+        parts.append(part)
+        if str(start) in manifest['done'] and os.path.exists(part):
+            continue
+
+        # Сегмент пишется во временный файл и переименовывается только целиком
+        tmp = part + '.tmp.mp4'
+        with figure_pipe(fig, tmp, **writer_args) as pipe:
+            for f in range(start, end):
+                update(f)
+                pipe.write_figure(fig)
+        os.replace(tmp, part)
+        rendered += end - start
+        manifest['done'][str(start)] = {'frames': [start, end], 'file': os.path.basename(part)}
+        _save_manifest(manifest_path, manifest)
+
+    stitch(parts, out_file)
+    if not KEEP_PARTS:
+        shutil.rmtree(parts_dir)
+    return rendered
@@ -0,0 +1,38 @@
+"""
+Подмена констант в preview.py должна менять кадр: и у базового ядра, и у
+ядра со сглаживанием, которое зовет другие jit-функции (mandel_sample,
+julia_view, render_mandelbrot_dynamic ...).
+
+    python -m pytest fractal
+"""
+
+import numpy as np
+import pytest
+
+import fractal
+import preview
+
+W, H, FRAME = 64, 36, 300
+
+CASES = [
+    ('render_mandelbrot_dynamic', {'MANDEL_CENTER': (-0.1011, 0.9563)}),
+    ('render_mandelbrot_aa', {'MANDEL_CENTER': (-0.1011, 0.9563)}),
+    ('render_julia_morph', {'JULIA_C': (-0.8, 0.156)}),
+    ('render_julia_aa', {'JULIA_C': (-0.8, 0.156)}),
+    ('render_julia_aa', {'MAX_ITER': 30}),
+]
+
+
+@pytest.mark.parametrize('name, overrides', CASES)
+def test_override_changes_frame(name, overrides):
+    kernel = getattr(fractal, name)
+    base = kernel(W, H, FRAME)
+    changed = preview.with_overrides(kernel, overrides)(W, H, FRAME)
+    assert changed.shape == base.shape
+    assert not np.allclose(changed, base)
+    # Исходное ядро не задето
+    assert np.array_equal(kernel(W, H, FRAME), base)
+
+
+def test_no_overrides_returns_same_kernel():
+    assert preview.with_overrides(fractal.render_mandelbrot_aa, {}) is fractal.render_mandelbrot_aa
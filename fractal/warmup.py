@@ -0,0 +1,73 @@
+"""
+ПРОГРЕВ ДИСКОВОГО КЭША NUMBA И ЗАМЕР ВРЕМЕНИ ДО ПЕРВОГО КАДРА
+
+Все ядра fractal.py / fractal_3d.py / new_fractal.py объявлены с явными
+сигнатурами и cache=True: они компилируются один раз и дальше грузятся из
+кэша (__pycache__ рядом со скриптами или NUMBA_CACHE_DIR).
+
+Запуск:
+    python warmup.py                  # скомпилировать всё в кэш
+    python warmup.py --bench          # время до первого кадра: пустой кэш vs прогретый
+    python warmup.py fractal --bench  # только один модуль
+"""
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODULES = ['fractal', 'fractal_3d', 'new_fractal']
+
+# Код первого кадра для каждого модуля (кадр уменьшен в 10 раз, чтобы мерить именно старт)
+FIRST_FRAME = {
+    'fractal': "m.tasks[1]['f'](m.WIDTH // 10, m.HEIGHT // 10, 0)",
+    'fractal_3d': ("from heightfield import HeightfieldRenderer, colormap_lut; "
+                   "HeightfieldRenderer(m.X_GRID, m.Y_GRID, m.WIDTH // 10, m.HEIGHT // 10, "
+                   "colormap_lut(m.neon_cmap)).render(m.calc_mandel(0, m.X_GRID, m.Y_GRID), 35, 0)"),
+    'new_fractal': ("import numpy as np; w, h = m.WIDTH // 10, m.HEIGHT // 10; "
+                    "m.render_tree_fern(0, w, h, np.zeros((h, w, 3), np.uint8), "
+                    "np.zeros((h, w, 3), np.float32), np.zeros((h, w, 3), np.float32))"),
+}
+
+
+def warm(name):
+    """Импорт (компиляция ядер с явными сигнатурами) плюс ленивые ядра модуля"""
+    t0 = time.time()
+    mod = importlib.import_module(name)
+    if hasattr(mod, 'warm_up'):
+        mod.warm_up()
+    return time.time() - t0
+
+
+def time_to_first_frame(name, cache_dir=None):
+    """Время от запуска интерпретатора до первого кадра в отдельном процессе"""
+    code = (f"import time; t0 = time.perf_counter(); import {name} as m; "
+            f"{FIRST_FRAME[name]}; print(time.perf_counter() - t0)")
+    env = dict(os.environ)
+    if cache_dir:
+        env['NUMBA_CACHE_DIR'] = cache_dir
+    out = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Прогрев кэша Numba для фрактальных скриптов")
+    parser.add_argument('modules', nargs='*', default=MODULES, choices=MODULES)
+    parser.add_argument('--bench', action='store_true', help="замерить время до первого кадра")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    for name in args.modules:
+        print(f">>> Прогрев {name}: {warm(name):.1f} с")
+
+    if args.bench:
+        print(f"\n{'модуль':<14}{'без кэша, с':>14}{'с кэшем, с':>14}")
+        for name in args.modules:
+            with tempfile.TemporaryDirectory() as empty:
+                cold = time_to_first_frame(name, cache_dir=empty)
+            hot = time_to_first_frame(name)
+            print(f"{name:<14}{cold:>14.2f}{hot:>14.2f}")
@@ -0,0 +1,187 @@
+"""
+КЭШ КАДРОВ ПО СОДЕРЖИМОМУ: ПОВТОРНЫЙ РЕНДЕР ТОЛЬКО ИЗМЕНЕННОГО
+
+Ключ кадра — хэш его итогового состояния (значения, ранги, подпись года),
+стиля (настройки, размер холста, зафиксированный макет) и исходников
+функции отрисовки и общих модулей отрисовки. Два уровня:
+    сегменты — готовые куски mp4 по SEGMENT_FRAMES кадров; ключ сегмента —
+               хэш ключей его кадров. Неизмененный сегмент не рисуется и не
+               кодируется, финал — склейка -c copy.
+    растры   — сжатые RGBA-кадры: в измененном сегменте неизмененные кадры
+               берутся из хранилища, matplotlib рисует только новые (и
+               одинаковые кадры паузы в конце — один раз).
+Хранилище — .cache/frames/, старые файлы вытесняются сверх LIMIT_MB.
+
+    stats = frame_cache.render(states, draw, fig, 'out.mp4', fps=60,
+                               style={'orientation': '9:16'}, codec='libx264')
+"""
+
+import hashlib
+import inspect
+import os
+import time
+import zlib
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from frame_pipe import FramePipe, concat, even_size
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# --- НАСТРОЙКИ ---
+SETTINGS = {
+    'DIR': os.path.join(ROOT, '.cache', 'frames'),
+    'SEGMENT_FRAMES': 60,     # Кадров в кэшируемом сегменте: чем меньше, тем точнее досчет
+    'RASTERS': True,          # Хранить ли растры кадров (быстрее досчет, больше места)
+    'LIMIT_MB': 4000,         # Предел хранилища; сверх него удаляются самые старые файлы
+    # Общие модули отрисовки: их правка меняет кадры так же, как правка самого скрипта
+    'CODE_FILES': ('bar_race.py', 'layout_lock.py', 'text_sprites.py'),
+}
+
+
+# --- КЛЮЧИ ---
+def _feed(h, obj):
+    """Детерминированный хэш вложенного состояния кадра"""
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        h.update(b'pd'); _feed(h, list(map(str, obj.index))); _feed(h, obj.to_numpy())
+        if isinstance(obj, pd.DataFrame):
+            _feed(h, list(map(str, obj.columns)))
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            _feed(h, obj.tolist())
+        else:
+            h.update(f'nd{obj.dtype.str}{obj.shape}'.encode()); h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for k in sorted(obj, key=str):
+            _feed(h, k); _feed(h, obj[k])
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for v in obj:
+            _feed(h, v)
+        h.update(b']')
+    elif isinstance(obj, np.generic):
+        _feed(h, obj.item())
+    else:
+        h.update(f'{type(obj).__name__}:{obj!r};'.encode())
+
+
+def state_key(state, style=None):
+    h = hashlib.sha1()
+    _feed(h, state); _feed(h, style)
+    return h.hexdigest()
+
+
+def code_key(func):
+    """
+    Хэш файла, где определена функция отрисовки, и общих модулей отрисовки
+    (SETTINGS['CODE_FILES']): правка любого из них сбрасывает кэш
+    """
+    h = hashlib.sha1()
+    paths = [inspect.getsourcefile(func)] + [os.path.join(ROOT, n) for n in SETTINGS['CODE_FILES']]
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+# --- ХРАНИЛИЩЕ ---
+def _path(kind, key, ext):
+    return os.path.join(SETTINGS['DIR'], kind, key[:2], key + ext)
+
+
+def _touch(path):
+    """Отметка использования для вытеснения старых файлов"""
+    os.utime(path, None)
+
+
+def get_raster(key, shape):
+    path = _path('rasters', key, '.z')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        data = zlib.decompress(f.read())
+    _touch(path)
+    return np.frombuffer(data, np.uint8).reshape(shape)
+
+
+def put_raster(key, buf):
+    path = _path('rasters', key, '.z')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(zlib.compress(bytes(buf), 1))   # Белый фон бар-чартов жмется в десятки раз
+    os.replace(path + '.tmp', path)
+
+
+def prune(limit_mb=None):
+    """Удаляет самые давно использованные файлы, пока хранилище больше предела"""
+    limit = (limit_mb or SETTINGS['LIMIT_MB']) * 2**20
+    files = []
+    for root, _, names in os.walk(SETTINGS['DIR']):
+        for n in names:
+            p = os.path.join(root, n)
+            st = os.stat(p)
+            files.append((st.st_mtime, st.st_size, p))
+    total = sum(f[1] for f in files)
+    for _, size, p in sorted(files):
+        if total <= limit:
+            break
+        os.remove(p)
+        total -= size
+
+
+# --- РЕНДЕР ---
+def render(states, draw, fig, out_file, fps, style=None, seg_frames=None, **pipe_kwargs):
+    """
+    states — состояния кадров (всё, что видно на кадре); draw(state) рисует кадр на fig.
+    pipe_kwargs — параметры FramePipe (codec, bitrate, extra_args); входят в ключ сегмента.
+    Возвращает статистику: кадров, отрисовано, из растров, сегментов из кэша.
+    """
+    seg_frames = seg_frames or SETTINGS['SEGMENT_FRAMES']
+    even_size(fig)
+    w, h = fig.canvas.get_width_height(physical=True)
+    style = {'style': style, 'size': (w, h), 'code': code_key(draw), 'mpl': matplotlib.__version__}
+    keys = [state_key(s, style) for s in states]
+    stats = {'frames': len(keys), 'drawn': 0, 'rasters': 0, 'segments': 0, 'segments_cached': 0}
+    t0 = time.time()
+
+    parts = []
+    for start in range(0, len(keys), seg_frames):
+        seg = keys[start:start + seg_frames]
+        seg_key = state_key(seg, {'fps': fps, 'pipe': pipe_kwargs})
+        part = _path('segments', seg_key, '.mp4')
+        parts.append(part)
+        stats['segments'] += 1
+        if os.path.exists(part):
+            _touch(part)
+            stats['segments_cached'] += 1
+            continue
+
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        tmp = part + '.tmp.mp4'
+        with FramePipe(tmp, w, h, fps, pix_fmt='rgba', **pipe_kwargs) as pipe:
+            done = {}   # Повторы внутри сегмента (пауза в конце) — без повторного чтения
+            for i, key in enumerate(seg, start):
+                buf = done.get(key)
+                if buf is None and SETTINGS['RASTERS']:
+                    buf = get_raster(key, (h, w, 4))
+                    stats['rasters'] += buf is not None
+                if buf is None:
+                    draw(states[i])
+                    fig.canvas.draw()
+                    buf = np.asarray(fig.canvas.buffer_rgba()).copy()
+                    stats['drawn'] += 1
+                    if SETTINGS['RASTERS']:
+                        put_raster(key, buf)
+                done = {key: buf}
+                pipe.write(buf)
+        os.replace(tmp, part)
+
+    concat(parts, out_file)
+    prune()
+    stats['seconds'] = round(time.time() - t0, 1)
+    return stats
@@ -0,0 +1,194 @@
+"""
+ПОТОКОВАЯ ЗАПИСЬ КАДРОВ В FFMPEG
+
+Кадры (numpy-массивы или буфер холста matplotlib) пишутся сырыми байтами
+прямо в stdin процесса ffmpeg — без savefig и промежуточных PNG.
+
+render_targets — один проход по кадрам для нескольких макетов (9:16 и 16:9):
+данные кадра считаются один раз, каждый макет рисует свою фигуру в свой
+кодировщик.
+
+Лестница качеств (ABR): profiles — список вариантов выхода, например
+    [{'name': '1080p', 'height': 1920, 'bitrate': '8M'},
+     {'name': '720p',  'height': 1280, 'bitrate': '4M'}]
+Кадр рендерится один раз в полном разрешении, один процесс ffmpeg делит
+поток фильтром split/scale и пишет все варианты сразу (<имя>_<name>.mp4).
+Вместо 'height' можно задать 'scale' (доля исходного размера — подходит
+сразу для 9:16 и 16:9). Вариант без них — исходное разрешение.
+"""
+
+import contextlib
+import os
+import subprocess
+import sys
+import numpy as np
+from matplotlib import animation
+
+import frame_trace
+from render_jobs import ffmpeg_progress_args, ffmpeg_thread_args
+
+TRACE = frame_trace.get()
+
+
+# --- ЛЕСТНИЦА КАЧЕСТВ ---
+def ladder_filename(filename, profile):
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{profile['name']}{ext}"
+
+
+def ladder_args(filename, profiles, codec='libx264', extra_args=(), vf=None):
+    """
+    Аргументы выхода ffmpeg для всех профилей из одного входа:
+    [0:v] (vf) split=N -> scale на каждый вариант -> свой -map / битрейт / файл
+    """
+    n = len(profiles)
+    graph = f"[0:v]{vf + ',' if vf else ''}split={n}" + ''.join(f"[s{i}]" for i in range(n))
+    for i, p in enumerate(profiles):
+        if p.get('height'):
+            scale = f"scale=-2:{p['height']}:flags=lanczos"
+        elif p.get('scale'):
+            scale = f"scale=trunc(iw*{p['scale']}/2)*2:-2:flags=lanczos"
+        else:
+            scale = 'null'
+        graph += f";[s{i}]{scale}[o{i}]"
+    args = ['-filter_complex', graph]
+    for i, p in enumerate(profiles):
+        args += ['-map', f'[o{i}]', '-c:v', p.get('codec', codec)] + ffmpeg_thread_args()
+        if p.get('bitrate'):
+            args += ['-b:v', str(p['bitrate'])]
+        args += list(extra_args) + list(p.get('extra_args', ())) + [ladder_filename(filename, p)]
+    return args
+
+
+class LadderWriter(animation.FFMpegWriter):
+    """FFMpegWriter, пишущий все профили лестницы за один проход"""
+
+    def __init__(self, profiles, **kwargs):
+        super().__init__(**kwargs)
+        self.profiles = profiles
+
+    @property
+    def output_args(self):
+        extra = list(self.extra_args or [])
+        if '-pix_fmt' not in extra:
+            extra += ['-pix_fmt', 'yuv420p']
+        for k, v in self.metadata.items():
+            extra += ['-metadata', f'{k}={v}']
+        return ffmpeg_progress_args(self.outfile) + ['-y'] + ladder_args(self.outfile, self.profiles, self.codec, extra)
+
+
+# --- ПОТОКОВАЯ ЗАПИСЬ ---
+class FramePipe:
+    """Один процесс ffmpeg, принимающий сырые кадры через stdin"""
+
+    def __init__(self, filename, width, height, fps, pix_fmt='rgba',
+                 codec='libx264', bitrate=None, extra_args=(), profiles=None):
+        self.filename = filename
+        self.width, self.height = width, height
+        self.frames = 0
+        # В очереди render_jobs: свои -threads и -progress для задачи
+        cmd = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error'] + ffmpeg_progress_args(filename) + [
+               '-f', 'rawvideo', '-pix_fmt', pix_fmt,
+               '-s', f'{width}x{height}', '-r', str(fps), '-i', '-']
+        if profiles:
+            cmd += ladder_args(filename, profiles, codec, extra_args)
+            self.outputs = [ladder_filename(filename, p) for p in profiles]
+        else:
+            cmd += ['-c:v', codec] + ffmpeg_thread_args()
+            if bitrate:
+                cmd += ['-b:v', f'{bitrate}k']
+            cmd += list(extra_args) + [filename]
+            self.outputs = [filename]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        """Отправляет кадр (массив или memoryview) кодировщику"""
+        with TRACE.stage('encode'):
+            self._proc.stdin.write(np.ascontiguousarray(frame).data
+                                   if isinstance(frame, np.ndarray) else frame)
+        self.frames += 1
+
+    def write_figure(self, fig):
+        """Отрисовывает фигуру и отправляет ее RGBA-буфер без savefig"""
+        TRACE.attach(fig)
+        fig.canvas.draw()
+        with TRACE.stage('grab'):
+            buf = fig.canvas.buffer_rgba()
+        self.write(buf)
+
+    def close(self):
+        self._proc.stdin.close()
+        if self._proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg завершился с ошибкой при записи {self.filename}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+            return
+        # Тело упало: ffmpeg закрывается молча, наружу идет исходная ошибка, а не
+        # «ffmpeg завершился с ошибкой» из-за недописанного ролика
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass   # ffmpeg уже мертв: BrokenPipe при сбросе буфера
+        self._proc.wait()
+
+
+def concat(parts, out_file):
+    """Склейка готовых роликов с одинаковыми параметрами кодирования без перекодирования"""
+    list_file = out_file + '.concat.txt'
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for p in parts:
+            f.write(f"file '{os.path.abspath(p)}'\n")
+    subprocess.run(['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+                    '-f', 'concat', '-safe', '0', '-i', list_file,
+                    '-c', 'copy', out_file], check=True)
+    os.remove(list_file)
+
+
+def figure_pipe(fig, filename, fps, **kwargs):
+    """FramePipe с размером кадра, равным холсту фигуры"""
+    w, h = fig.canvas.get_width_height(physical=True)
+    return FramePipe(filename, w, h, fps, pix_fmt='rgba', **kwargs)
+
+
+def even(n):
+    """Ближайшее четное вниз: yuv420p (libx264) не принимает нечетные стороны кадра"""
+    return n - n % 2
+
+
+def even_size(fig):
+    """Подгоняет холст под четные ширину и высоту (требование yuv420p), как MovieWriter"""
+    for _ in range(3):
+        w, h = fig.canvas.get_width_height(physical=True)
+        if w % 2 == 0 and h % 2 == 0:
+            return
+        fig.set_size_inches(even(w) / fig.dpi, even(h) / fig.dpi)
+
+
+def render_targets(frames, prep, targets, fps, **kwargs):
+    """
+    frames  — значения кадров (индексы, годы ...)
+    prep    — frame -> состояние кадра, вызывается один раз на кадр
+    targets — [(fig, draw, filename)], draw(state) обновляет артисты своей фигуры
+    kwargs  — параметры FramePipe (codec, bitrate, extra_args, profiles)
+    Возвращает список записанных файлов.
+    """
+    frames = list(frames)
+    for fig, _, _ in targets:
+        even_size(fig)
+    with contextlib.ExitStack() as stack:
+        pipes = [stack.enter_context(figure_pipe(fig, filename, fps, **kwargs)) for fig, _, filename in targets]
+        for i, frame in enumerate(frames):
+            TRACE.frame()
+            state = prep(frame)
+            for (fig, draw, _), pipe in zip(targets, pipes):
+                with TRACE.stage('artists'):
+                    draw(state)
+                pipe.write_figure(fig)
+            if i % 30 == 0:
+                print(f"Rendering: {int(i / len(frames) * 100)}%", end='\r', file=sys.stderr)
+    return [out for pipe in pipes for out in pipe.outputs]
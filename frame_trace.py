@@ -0,0 +1,210 @@
+"""
+ПОКАДРОВЫЙ ЗАМЕР ВРЕМЕНИ РЕНДЕРА
+
+Включается одной переменной окружения (по умолчанию выключено, накладных
+расходов нет):
+    FRAME_TRACE=1            -> <скрипт>_trace.json
+    FRAME_TRACE=csv          -> <скрипт>_trace.csv (+ <скрипт>_trace_summary.csv)
+    FRAME_TRACE=out/run.json -> свой путь к файлу
+
+Этапы кадра:
+    prep    — подготовка данных кадра (интерполяция, ядра Numba ...)
+    artists — обновление артистов matplotlib
+    draw    — отрисовка холста (Figure.draw)
+    grab    — получение буфера кадра
+    encode  — запись в кодировщик / savefig
+
+Время этапов эксклюзивное: вложенный этап вычитается из внешнего. В конце
+печатается сводка p50/p95/max по каждому этапу.
+
+Использование в скрипте:
+    import frame_trace
+    TRACE = frame_trace.get()
+    ani = animation.FuncAnimation(fig, TRACE.hook(fig, update), ...)
+    ...
+    with TRACE.stage('prep'):
+        data = get_frame_data(i)
+"""
+
+import atexit
+import contextlib
+import csv
+import functools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ENV_FLAG = 'FRAME_TRACE'
+STAGES = ('prep', 'artists', 'draw', 'grab', 'encode')
+
+_NULL = contextlib.nullcontext()
+
+
+class NullTrace:
+    """Заглушка, когда замер выключен: все методы ничего не делают"""
+    enabled = False
+
+    def stage(self, name):
+        return _NULL
+
+    def hook(self, fig, update):
+        return update
+
+    def attach(self, fig):
+        pass
+
+    def frame(self):
+        pass
+
+    def save(self, tag=None):
+        return None
+
+
+class FrameTrace:
+    """Накопитель времени этапов по кадрам"""
+    enabled = True
+
+    def __init__(self, name, path):
+        self.name, self.path = name, path
+        self.rows = []
+        self._cur = None
+        self._stack = []
+
+    # --- ЗАМЕР ---
+    def _add(self, stage, seconds):
+        if self._cur is None:
+            self._cur = dict.fromkeys(STAGES, 0.0)
+        self._cur[stage] = self._cur.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self._add(outer[0], now - outer[1])
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._add(name, now - self._stack.pop()[1])
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def frame(self):
+        """Закрывает текущий кадр"""
+        if self._cur:
+            self.rows.append(dict(self._cur, frame=len(self.rows)))
+        self._cur = None
+
+    # --- ПОДКЛЮЧЕНИЕ К MATPLOTLIB ---
+    def attach(self, fig):
+        """Оборачивает отрисовку и сохранение фигуры в этапы draw / grab / encode"""
+        if getattr(fig, '_frame_trace', None) is self:
+            return
+        fig._frame_trace = self
+        draw, savefig, canvas = fig.draw, fig.savefig, fig.canvas
+
+        def traced_draw(*args, **kwargs):
+            with self.stage('draw'):
+                return draw(*args, **kwargs)
+
+        def traced_savefig(*args, **kwargs):
+            with self.stage('encode'):
+                return savefig(*args, **kwargs)
+
+        fig.draw, fig.savefig = traced_draw, traced_savefig
+
+        # Путь FFMpegWriter / PillowWriter: savefig(format='rgba') -> print_raw
+        if hasattr(canvas, 'print_raw') and hasattr(canvas, 'get_renderer'):
+            def print_raw(filename_or_obj, **kwargs):
+                type(canvas).draw(canvas)
+                with self.stage('grab'):
+                    buf = canvas.get_renderer().buffer_rgba()
+                if hasattr(filename_or_obj, 'write'):
+                    filename_or_obj.write(buf)
+                else:
+                    with open(filename_or_obj, 'wb') as fh:
+                        fh.write(buf)
+            canvas.print_raw = canvas.print_rgba = print_raw
+
+    def hook(self, fig, update):
+        """Функция кадра для FuncAnimation с замером; каждый вызов открывает новый кадр"""
+        self.attach(fig)
+
+        @functools.wraps(update)
+        def traced(*args, **kwargs):
+            self.frame()
+            with self.stage('artists'):
+                return update(*args, **kwargs)
+        return traced
+
+    # --- ОТЧЕТ ---
+    def summary(self):
+        """p50 / p95 / max по этапам в миллисекундах"""
+        out = {}
+        cols = list(STAGES) + sorted({k for r in self.rows for k in r} - set(STAGES) - {'frame'})
+        for col in cols + ['total']:
+            if col == 'total':
+                vals = np.array([sum(v for k, v in r.items() if k != 'frame') for r in self.rows])
+            else:
+                vals = np.array([r.get(col, 0.0) for r in self.rows])
+            out[col] = {'p50': round(float(np.percentile(vals, 50)) * 1000, 3),
+                        'p95': round(float(np.percentile(vals, 95)) * 1000, 3),
+                        'max': round(float(vals.max()) * 1000, 3)}
+        return out
+
+    def save(self, tag=None):
+        """Пишет трассу и сводку; tag добавляется к имени файла (например, имя задачи)"""
+        self.frame()
+        if not self.rows:
+            return None
+        root, ext = os.path.splitext(self.path)
+        path = f"{root}_{tag}{ext}" if tag else self.path
+        summary = self.summary()
+
+        if ext == '.csv':
+            fields = ['frame'] + [k for k in summary if k != 'total']
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                w = csv.DictWriter(f, fieldnames=fields, restval=0.0)
+                w.writeheader(); w.writerows(self.rows)
+            with open(f"{os.path.splitext(path)[0]}_summary.csv", 'w', newline='', encoding='utf-8') as f:
+                w = csv.writer(f)
+                w.writerow(['stage', 'p50_ms', 'p95_ms', 'max_ms'])
+                w.writerows([k, v['p50'], v['p95'], v['max']] for k, v in summary.items())
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'script': self.name, 'task': tag, 'frames': len(self.rows),
+                           'summary_ms': summary, 'trace_s': self.rows}, f, ensure_ascii=False, indent=1)
+
+        print(f"\n>>> Замер кадров ({len(self.rows)} шт.): {path}", file=sys.stderr)
+        print(f"    {'этап':<10}{'p50, мс':>10}{'p95, мс':>10}{'max, мс':>10}", file=sys.stderr)
+        for k, v in summary.items():
+            print(f"    {k:<10}{v['p50']:>10.1f}{v['p95']:>10.1f}{v['max']:>10.1f}", file=sys.stderr)
+        self.rows = []
+        return path
+
+
+_TRACE = None
+
+
+def get(name=None):
+    """Общий трассировщик процесса: FrameTrace при заданном FRAME_TRACE, иначе NullTrace"""
+    global _TRACE
+    if _TRACE is None:
+        flag = os.environ.get(ENV_FLAG, '').strip()
+        if flag.lower() in ('', '0', 'false', 'no', 'off'):
+            _TRACE = NullTrace()
+        else:
+            script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else ''
+            name = name or (os.path.splitext(script)[0] if script.endswith('.py') else 'render')
+            if flag.lower().endswith(('.json', '.csv')):
+                path = flag
+            else:
+                path = f"{name}_trace.{'csv' if flag.lower() == 'csv' else 'json'}"
+            _TRACE = FrameTrace(name, path)
+            atexit.register(_TRACE.save)
+    return _TRACE
@@ -0,0 +1,93 @@
+"""
+ДВИЖОК КОРОТКИХ РОЛИКОВ «СТОЛБЦЫ ВЫРАСТАЮТ»
+
+Столбцы (одна серия или сгруппированные серии) создаются один раз; кадр
+только выставляет им высоту и двигает подписи. Прогресс роста для всех
+кадров считается заранее одной векторной операцией (кривая из bar_race),
+макет фиксируется один раз по финальному кадру (layout_lock).
+Ролик — len(chart) = grow_frames + hold_frames кадров: grow_frames кадров
+роста, затем hold_frames одинаковых кадров финального состояния (с
+подписями 'end'). Хвост — забота графика, а не вызывающего кода.
+
+    chart = GrowChart(ax, ['2024', '2025'],
+                      [('Tesla', [7.1, 3.8], '#E81010'), ('Toyota', [36.5, 34.5], '#9B9B9B')],
+                      grow_frames=100, hold_frames=1, ease=linear,
+                      label_fmt=lambda v: f'${v}B', labels='end')
+    chart.freeze_layout()
+    ani = FuncAnimation(fig, chart.update, frames=len(chart))
+"""
+
+import numpy as np
+
+import layout_lock
+from bar_race import ease_out_sine, linear  # noqa: F401  (кривые для скриптов)
+
+
+class GrowChart:
+    """
+    series — [(имя, значения, цвет или список цветов)]; несколько серий
+    рисуются группами шириной width у каждой категории.
+
+    grow_frames — кадров роста (прогресс < 1); hold_frames — кадров финального
+    состояния после роста (хотя бы один, чтобы ролик закончился полными столбцами).
+
+    labels: 'grow' — подписи растут вместе со столбцом (прозрачность = прогресс,
+            скрыты ниже label_min); 'end' — только финальные значения на кадрах
+            финального состояния; None — без подписей.
+    """
+
+    def __init__(self, ax, categories, series, grow_frames, hold_frames=1, ease=ease_out_sine,
+                 width=0.6, labels='grow', label_fmt='{:,.0f}'.format, label_offset=0.0, label_min=0.0,
+                 label_kw=None, bar_kw=None):
+        self.ax = ax
+        self.grow_frames, self.total = grow_frames, grow_frames + hold_frames
+        # Прогресс 0..1 на каждый кадр — заранее
+        self.progress = ease(np.clip(np.arange(self.total) / grow_frames, 0.0, 1.0))
+        self.labels, self.label_fmt = labels, label_fmt
+        self.label_offset, self.label_min = label_offset, label_min
+
+        x = np.arange(len(categories))
+        n = len(series)
+        bar_w = width / n if n > 1 else width
+        self.targets, self.containers, self.texts = [], [], []
+        for k, (name, values, color) in enumerate(series):
+            offset = (k - (n - 1) / 2) * bar_w
+            bars = ax.bar(x + offset, np.zeros(len(values)), bar_w, color=color,
+                          label=name, **(bar_kw or {}))
+            self.containers.append(bars)
+            self.targets.append(np.asarray(values, dtype=np.float64))
+            if labels:
+                for b in bars:
+                    self.texts.append(ax.text(b.get_x() + b.get_width() / 2, 0, '', ha='center',
+                                              visible=False, **(label_kw or {})))
+        ax.set_xticks(x, categories)
+        self.bars = [b for c in self.containers for b in c]
+        self.values = np.concatenate(self.targets)
+
+    def __len__(self):
+        return self.total
+
+    def final(self, i):
+        """Кадр i — финальное состояние (все такие кадры одинаковы)"""
+        return i >= self.grow_frames
+
+    def update(self, i):
+        p = float(self.progress[min(i, self.total - 1)])
+        heights = self.values * p
+        for b, h in zip(self.bars, heights):
+            b.set_height(h)
+        if self.labels == 'grow':
+            for t, h in zip(self.texts, heights):
+                t.set_visible(bool(h > self.label_min))
+                t.set_y(h + self.label_offset); t.set_text(self.label_fmt(h)); t.set_alpha(p)
+        elif self.labels == 'end':
+            done = self.final(i)
+            for t, v in zip(self.texts, self.values):
+                t.set_visible(done)
+                t.set_y(v + self.label_offset); t.set_text(self.label_fmt(v))
+        return self.bars + self.texts
+
+    def freeze_layout(self, fig=None):
+        """tight_layout один раз по финальному кадру, дальше макет не пересчитывается"""
+        layout_lock.freeze(fig or self.ax.figure, lambda: self.update(len(self) - 1))
+        self.update(0)
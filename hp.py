@@ -1,12 +1,16 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import datasets
+import frame_trace
+from year_index import YearTopN
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # --- ЗАГРУЗКА ДАННЫХ ---
 # Читаем данные из внешнего CSV файла
 # Столбцы: Year, Company, Engine_Name, Displacement, Horsepower
 try:
-    df = pd.read_csv('engines_data.csv')
+    df = datasets.load('engines_data.csv')
 except FileNotFoundError:
     print("Error: 'engines_data.csv' not found. Please ensure the data file exists.")
     exit()
@@ -17,6 +21,10 @@ fig, ax = plt.subplots(figsize=(12, 7))
 # Список уникальных годов для анимации (начиная с 2000)
 years = sorted(df[df['Year'] >= 2000]['Year'].unique())
 
+# Индекс год -> top-10 за один проход вместо фильтра всей таблицы на каждом кадре
+TOP = YearTopN(df, 'Year', 'Horsepower', n=10, labels=lambda r: r['Horsepower'].astype(str) + ' hp')
+max_hp = TOP.max_value
+
 def animate(year):
     """
     Функция для отрисовки одного кадра анимации (конкретного года).
@@ -24,7 +32,9 @@ def animate(year):
     ax.clear() # Очищаем оси для нового кадра
     
     # Фильтруем топ-10 двигателей за текущий год по лошадиным силам
-    top_10 = df[df['Year'] == year].nlargest(10, 'Horsepower').sort_values(by='Horsepower', ascending=True)
+    with TRACE.stage('prep'):
+        top = TOP[year]
+        top_10 = top.rows
     
     # Создаем горизонтальный столбчатый график
     # English labels and titles as requested
@@ -33,15 +43,15 @@ def animate(year):
     # Настройка осей и заголовков на английском языке
     ax.set_xlabel('Horsepower (hp)', fontsize=12)
     ax.set_title(f'Top 10 Most Powerful Engines: {year}', fontsize=18, fontweight='bold')
-    ax.set_xlim(0, df['Horsepower'].max() * 1.1) # Единый масштаб для всех годов
+    ax.set_xlim(0, max_hp * 1.1) # Единый масштаб для всех годов
     
     # Добавляем значения л.с. и название компании текстом на столбцы
-    for i, (hp, engine) in enumerate(zip(top_10['Horsepower'], top_10['Engine_Name'])):
-        ax.text(hp + 5, i, f'{hp} hp', va='center', fontsize=10, fontweight='bold')
+    for i, (hp, label) in enumerate(zip(top.values, top.labels)):
+        ax.text(hp + 5, i, label, va='center', fontsize=10, fontweight='bold')
 
 # --- ЗАПУСК И СОХРАНЕНИЕ АНИМАЦИИ ---
 # Создаем анимацию с интервалом 500мс между годами
-ani = animation.FuncAnimation(fig, animate, frames=years, repeat=False, interval=500)
+ani = animation.FuncAnimation(fig, TRACE.hook(fig, animate), frames=years, repeat=False, interval=500)
 
 # Сохраняем результат в формате GIF
 # Требуется установленный Pillow (pip install pillow)
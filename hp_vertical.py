@@ -1,18 +1,31 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-import matplotlib.patheffects as path_effects
 import matplotlib.ticker as ticker
+import numpy as np
 import os
+from functools import lru_cache
+import datasets
+import frame_trace
+import render_jobs
+from bar_race import BarPool, RaceTimeline
+from frame_pipe import LadderWriter
+from text_sprites import TextSprites
+from year_index import YearTopN
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # --- НАСТРОЙКИ ---
 DATA_FILE = 'engines_data.csv'
 LOGOS_DIR = 'logos'
 OUTPUT_FILE = 'engine_race_final_consistent.mp4'
-INTERVAL = 2000 
+FPS = 60                 # Плавные переходы между годами
+SECONDS_PER_YEAR = 1     # Темп прежний: один год в секунду
+END_PAUSE = 3            # Пауза на последнем годе, сек
 LOGO_ZOOM = 0.18 
 FONT_SIZE = 14
+PROFILES = None  # Лестница качеств (frame_pipe), например [{'name': '1080p', 'height': 1600, 'bitrate': '2500k'}, {'name': '720p', 'height': 1066, 'bitrate': '1200k'}]
+
+render_jobs.apply_settings(globals())  # Переопределения из очереди render_jobs
 
 # --- ЦВЕТОВАЯ ПАЛИТРА БРЕНДОВ ---
 # Здесь вы можете задать конкретные цвета для узнаваемости.
@@ -30,7 +43,7 @@ BRAND_COLORS = {
 }
 
 # --- ПОДГОТОВКА ДАННЫХ И ФИКСАЦИЯ ЦВЕТОВ ---
-df = pd.read_csv(DATA_FILE)
+df = datasets.load(DATA_FILE)
 unique_companies = sorted(df['Company'].unique()) # Сортировка важна для стабильности индексов
 
 # Создаем единую карту цветов на весь ролик
@@ -43,81 +56,93 @@ for i, company in enumerate(unique_companies):
         # Берем цвет из палитры tab20 по индексу
         company_colors[company] = colormap(i % 20)
 
+# Индекс год -> top-10: строки считаются один раз, а не на каждом кадре
+TOP = YearTopN(df, 'Year', 'Horsepower', n=10)
+overall_max_hp = TOP.max_value
+
+# Сущности гонки — двигатели; цвет и компания фиксируются на весь ролик
+# (объем у одного имени бывает разным по годам — он идет тегом шага таймлайна)
+first = df.drop_duplicates('Engine_Name')
+ENGINES = first['Engine_Name'].astype(str).tolist()
+ENGINE_ID = {name: i for i, name in enumerate(ENGINES)}
+ENGINE_COMPANY = first['Company'].astype(str).tolist()
+ENGINE_COLOR = [company_colors[c] for c in ENGINE_COMPANY]
+
 # --- НАСТРОЙКА ФИГУРЫ ---
 fig, ax = plt.subplots(figsize=(9, 16))
 fig.patch.set_facecolor('white')
 
+@lru_cache(maxsize=None)
 def get_logo(company_name):
     path = os.path.join(LOGOS_DIR, f"{company_name}.png")
     if os.path.exists(path):
         return plt.imread(path)
     return None
 
-def animate(year):
-    ax.clear()
-    ax.set_facecolor('white')
-    
-    # Данные за год
-    top_10 = df[df['Year'] == year].nlargest(10, 'Horsepower').sort_values(by='Horsepower', ascending=True)
-    overall_max_hp = df['Horsepower'].max()
-    max_hp_limit = overall_max_hp * 1.3 # Запас места справа для текста
-
-    # 1. СЕТКА
-    ax.xaxis.set_major_locator(ticker.MultipleLocator(200))
-    ax.xaxis.grid(True, linestyle='--', alpha=0.3, color='gray', zorder=0)
-    ax.set_axisbelow(True)
-
-    # 2. СТОЛБЦЫ (Используем зафиксированные цвета)
-    colors = [company_colors[c] for c in top_10['Company']]
-    ax.barh(top_10['Engine_Name'], top_10['Horsepower'], color=colors, 
-            height=0.6, edgecolor='black', linewidth=0.5, zorder=3)
-
-    # 3. ОФОРМЛЕНИЕ
-    ax.set_xlim(0, max_hp_limit)
-    ax.set_yticks([]) 
-    ax.set_xlabel('Horsepower (HP)', fontsize=15, fontweight='bold', labelpad=15)
-    ax.set_title(f'YEAR: {year}\nTOP 10 ENGINE PERFORMANCE', 
-                 fontsize=24, fontweight='bold', pad=40, color='#222222')
-    
-    for spine in ['top', 'right', 'left']:
-        ax.spines[spine].set_visible(False)
-
-    # --- ОТСТУПЫ ---
-    logo_x = overall_max_hp * 0.02
-    text_x = overall_max_hp * 0.25 # Еще больше увеличил промежуток по вашей просьбе
-
-    # 4. ОТРИСОВКА
-    for i, (idx, row) in enumerate(top_10.iterrows()):
-        company = row['Company']
-        display_text = f"{row['Engine_Name']}   |   {row['Displacement']}L   |   {row['Horsepower']} HP"
-
-        # Логотип
-        img = get_logo(company)
-        if img is not None:
-            imagebox = OffsetImage(img, zoom=LOGO_ZOOM)
-            ab = AnnotationBbox(imagebox, (logo_x, i),
-                                frameon=False, box_alignment=(0, 0.5),
-                                xycoords='data', zorder=4)
-            ax.add_artist(ab)
-
-        # Текст (черный на белой обводке)
-        txt = ax.text(text_x, i, display_text, 
-                      va='center', fontsize=FONT_SIZE, fontweight='bold', color='black', zorder=5)
-        txt.set_path_effects([
-            path_effects.withStroke(linewidth=3, foreground='white'),
-            path_effects.Normal()
-        ])
+# --- ТАЙМЛАЙН: кадры между годами считаются заранее ---
+years = TOP.years
+steps = [(np.array([ENGINE_ID[e] for e in TOP[y].rows['Engine_Name'].astype(str)]), TOP[y].values,
+          TOP[y].rows['Displacement'].astype(str).tolist())
+         for y in years]
+TIMELINE = RaceTimeline(steps, years, n=10, frames_per_step=FPS * SECONDS_PER_YEAR,
+                        hold_frames=FPS * END_PAUSE)
+ENGINE_LOGO = [get_logo(c) for c in ENGINE_COMPANY]
+
+# --- ОФОРМЛЕНИЕ (один раз) ---
+ax.set_facecolor('white')
+max_hp_limit = overall_max_hp * 1.3 # Запас места справа для текста
+
+# 1. СЕТКА
+ax.xaxis.set_major_locator(ticker.MultipleLocator(200))
+ax.xaxis.grid(True, linestyle='--', alpha=0.3, color='gray', zorder=0)
+ax.set_axisbelow(True)
+
+# 2. ОСИ
+ax.set_xlim(0, max_hp_limit)
+ax.set_ylim(-0.6, 9.6)   # Входящие бары выезжают снизу из-за края
+ax.set_yticks([]) 
+ax.set_xlabel('Horsepower (HP)', fontsize=15, fontweight='bold', labelpad=15)
+title = ax.set_title('', fontsize=24, fontweight='bold', pad=40, color='#222222')
+
+for spine in ['top', 'right', 'left']:
+    ax.spines[spine].set_visible(False)
+
+# --- ОТСТУПЫ ---
+logo_x = [overall_max_hp * 0.02] * TIMELINE.slots
+text_x = [overall_max_hp * 0.25] * TIMELINE.slots # Еще больше увеличил промежуток по вашей просьбе
+
+# 3. ПОСТОЯННЫЕ АРТИСТЫ: бары, подписи (черные на белой обводке) и логотипы
+# Подписи с обводкой растрируются один раз на строку, на кадре выводятся картинкой
+LABELS = TextSprites(dpi=fig.dpi, fontsize=FONT_SIZE, fontweight='bold', color='black',
+                     stroke=3, stroke_color='white')
+pool = BarPool(ax, TIMELINE.slots, height=0.6,
+               bar_kw=dict(edgecolor='black', linewidth=0.5, zorder=3),
+               text_kw=dict(va='center', zorder=5), text_sprites=LABELS,
+               logo_zoom=LOGO_ZOOM, logo_kw=dict(box_alignment=(0, 0.5), xycoords='data', zorder=4))
+
+def update(i):
+    with TRACE.stage('prep'):
+        ids, values = TIMELINE.ids[i], TIMELINE.values[i]
+        live = np.maximum(ids, 0)
+        colors = [ENGINE_COLOR[e] for e in live]
+        logos = [ENGINE_LOGO[e] for e in live]
+        labels = [f"{ENGINES[e]}   |   {d}L   |   {v:.0f} HP"
+                  for e, d, v in zip(live, TIMELINE.tags[i], values)]
+
+    title.set_text(f'YEAR: {TIMELINE.labels[i]}\nTOP 10 ENGINE PERFORMANCE')
+    return pool.update(ids, values, TIMELINE.positions[i], TIMELINE.alphas[i],
+                       colors=colors, labels=labels, text_x=text_x, logos=logos, logo_x=logo_x) + [title]
 
 # --- СОХРАНЕНИЕ ---
-years = sorted(df['Year'].unique())
-frames = years + [years[-1]] * 3
-
-try:
-    # Убедитесь, что fps=1 соответствует вашему желаемому темпу (1 год в секунду)
-    writer = animation.FFMpegWriter(fps=1, metadata=dict(artist='Engine Stats'), bitrate=2500)
-    print("Generating video with consistent brand colors...")
-    ani = animation.FuncAnimation(fig, animate, frames=frames, interval=INTERVAL)
-    ani.save(OUTPUT_FILE, writer=writer)
-    print(f"Success! Video saved as {OUTPUT_FILE}")
-except Exception as e:
-    print(f"Error: {e}. Check if ffmpeg is installed.")
\ No newline at end of file
+if __name__ == '__main__':
+    try:
+        if PROFILES:
+            writer = LadderWriter(PROFILES, fps=FPS, metadata=dict(artist='Engine Stats'))
+        else:
+            writer = animation.FFMpegWriter(fps=FPS, metadata=dict(artist='Engine Stats'), bitrate=2500)
+        print("Generating video with consistent brand colors...")
+        ani = animation.FuncAnimation(fig, TRACE.hook(fig, update), frames=len(TIMELINE), interval=1000 / FPS)
+        ani.save(OUTPUT_FILE, writer=writer)
+        print(f"Success! Video saved as {OUTPUT_FILE}")
+    except Exception as e:
+        print(f"Error: {e}. Check if ffmpeg is installed.")
@@ -0,0 +1,35 @@
+"""
+ФИКСИРОВАННЫЙ МАКЕТ: ПОЛЯ СЧИТАЮТСЯ ОДИН РАЗ ПО ХУДШЕМУ КАДРУ
+
+tight_layout / subplots_adjust / bbox_inches='tight' на каждом кадре — это
+лишний проход раскладки, а поля «дышат» вслед за шириной подписей. Здесь
+на фигуре один раз рисуется худший случай всего ролика (самые широкие
+имена, самое большое значение, самый длинный год), по нему считаются поля,
+и дальше макет не меняется.
+
+    names = layout_lock.by_width(fig, df.columns, size=16, fontweight='bold')
+    layout_lock.freeze(fig, lambda: draw(worst_state))
+"""
+
+
+def by_width(fig, strings, **text_kw):
+    """Строки от самой широкой к самой узкой в заданном стиле текста"""
+    renderer = fig.canvas.get_renderer()
+    probe = fig.text(0, 0, '', **text_kw)
+    widths = []
+    for s in strings:
+        probe.set_text(str(s))
+        widths.append(probe.get_window_extent(renderer).width)
+    probe.remove()
+    return [s for _, s in sorted(zip(widths, strings), key=lambda p: -p[0])]
+
+
+def freeze(fig, stage=None, **tight_kw):
+    """
+    stage() выставляет худший кадр; поля считаются tight_layout один раз,
+    после чего движок раскладки отключается — все кадры с одной геометрией.
+    """
+    if stage is not None:
+        stage()
+    fig.tight_layout(**tight_kw)
+    fig.set_layout_engine('none')
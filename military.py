@@ -3,6 +3,10 @@ import matplotlib.animation as animation
 import numpy as np
 import sys
 import os
+import frame_trace
+from grow_chart import GrowChart, ease_out_sine
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # --- 1. ПОДГОТОВКА ДАННЫХ ---
 # Метки для оси X (категории)
@@ -19,67 +23,50 @@ fig, ax = plt.subplots(figsize=(9, 16), facecolor='#111111')
 # set_facecolor — цвет фона внутри области рисования
 ax.set_facecolor('#111111')
 
-# --- 3. ФУНКЦИЯ ОБНОВЛЕНИЯ (ВЫЗЫВАЕТСЯ ДЛЯ КАЖДОГО КАДРА) ---
+# --- 3. ОСИ, СТОЛБЦЫ И ЗАГОЛОВОК (СОЗДАЮТСЯ ОДИН РАЗ) ---
+# Фиксируем масштаб оси Y, чтобы график не "прыгал" во время роста
+ax.set_ylim(0, max(values) * 1.15)
+
+# Убираем лишние элементы рамки (сверху и справа)
+ax.spines['top'].set_visible(False)
+ax.spines['right'].set_visible(False)
+# Красим оставшиеся оси в белый цвет
+ax.spines['left'].set_color('white')
+ax.spines['bottom'].set_color('white')
+
+# Настраиваем цвет и размер подписей на осях
+ax.tick_params(axis='x', colors='white', labelsize=14)
+ax.tick_params(axis='y', colors='white', labelsize=12)
+
+# Рост за 100 кадров с Ease-Out (синус: в конце столбцы замедляются органично), затем пауза 50 кадров.
+# Подписи над столбцами видны выше 500 единиц, прозрачность = прогресс;
+# число с пробелом как разделителем тысяч
+chart = GrowChart(ax, years, [('', values, colors)], grow_frames=100, hold_frames=50,
+                  ease=ease_out_sine, width=0.6, labels='grow',
+                  label_fmt=lambda h: f"{int(h):,}".replace(',', ' '), label_offset=2000, label_min=500,
+                  label_kw=dict(va='bottom', color='white', fontsize=16, fontweight='bold'))
+
+# Заголовок. Прозрачность меняется по кадрам — эффект проявления
+title = ax.set_title("RUSSIAN WAR CRIMES IN UKRAINE\n(Year-by-Year Estimates)",
+                     fontsize=30, color='#FF0000', fontweight='black', pad=30, alpha=0)
+# К 40-му кадру значение станет 1.0 (полная видимость)
+TITLE_ALPHA = np.minimum(1.0, np.arange(len(chart)) / 40.0)
+
+
+# --- 4. ФУНКЦИЯ ОБНОВЛЕНИЯ (ВЫЗЫВАЕТСЯ ДЛЯ КАЖДОГО КАДРА) ---
 def update(frame):
     # Выводим в консоль текущий кадр, чтобы видеть, что рендеринг идет
     if frame % 10 == 0:
-        print(f"Рендеринг кадра: {frame}/150...", end='\r')
-
-    # Очищаем оси, чтобы кадры не накладывались друг на друга
-    ax.clear()
-    
-    # Расчет "времени" анимации от 0.0 до 1.0 за 100 кадров
-    t = frame / 100.0
-    if t > 1: t = 1
-    
-    # Эффект Ease-Out (плавное замедление):
-    # Используем синус, чтобы в конце движения столбцы замедлялись органично
-    progress = np.sin(t * (np.pi / 2)) 
-    
-    # Расчет прозрачности заголовка (Fade-in):
-    # К 40-му кадру значение станет 1.0 (полная видимость)
-    title_alpha = min(1.0, frame / 40.0)
-    
-    # Текущие значения столбцов: целевое значение * прогресс анимации
-    current_values = [v * progress for v in values]
-    
-    # Рисуем столбчатую диаграмму (bar chart)
-    bars = ax.bar(years, current_values, color=colors, width=0.6)
-    
-    # Фиксируем масштаб оси Y, чтобы график не "прыгал" во время роста
-    ax.set_ylim(0, max(values) * 1.15)
-    
-    # Убираем лишние элементы рамки (сверху и справа)
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    # Красим оставшиеся оси в белый цвет
-    ax.spines['left'].set_color('white')
-    ax.spines['bottom'].set_color('white')
-    
-    # Настраиваем цвет и размер подписей на осях
-    ax.tick_params(axis='x', colors='white', labelsize=14)
-    ax.tick_params(axis='y', colors='white', labelsize=12)
-    
-    # Рисуем заголовок. alpha=title_alpha отвечает за эффект проявления
-    ax.set_title("RUSSIAN WAR CRIMES IN UKRAINE\n(Year-by-Year Estimates)", 
-                 fontsize=30, color='#FF0000', fontweight='black', pad=30, alpha=title_alpha)
+        print(f"Рендеринг кадра: {frame}/{len(chart)}...", end='\r')
 
-    # Добавляем текстовые значения над каждым столбцом
-    for bar in bars:
-        height = bar.get_height()
-        # Показываем текст только если столбец заметен (выше 500 единиц)
-        if height > 500:
-            # Форматируем число (добавляем пробел как разделитель тысяч)
-            label = f"{int(height):,}".replace(',', ' ')
-            # ha='center' — центрируем текст по горизонтали относительно столбца
-            ax.text(bar.get_x() + bar.get_width()/2., height + 2000,
-                    label, ha='center', va='bottom', 
-                    color='white', fontsize=16, fontweight='bold', alpha=progress)
+    # Только высоты столбцов, подписи и прозрачность заголовка
+    title.set_alpha(TITLE_ALPHA[frame])
+    return chart.update(frame) + [title]
 
-# --- 4. НАСТРОЙКА СОХРАНЕНИЯ (RENDER) ---
+# --- 5. НАСТРОЙКА СОХРАНЕНИЯ (RENDER) ---
 
-# Создаем объект анимации. frames=150 (движение + пауза в конце)
-ani = animation.FuncAnimation(fig, update, frames=150, interval=30)
+# Создаем объект анимации: 150 кадров (движение + пауза в конце)
+ani = animation.FuncAnimation(fig, TRACE.hook(fig, update), frames=len(chart), interval=30)
 
 if __name__ == "__main__":
     output_filename = 'war_crimes_final.mp4'
@@ -0,0 +1,304 @@
+"""
+ПАНЕЛЬНЫЙ КОМПОЗИТОР: КАЖДАЯ ПАНЕЛЬ — СВОЙ ХОЛСТ, КАДР — СКЛЕЙКА РАСТРОВ
+
+Макет из нескольких осей (год / TOP SPEED / 0-100) режется по ячейкам
+gridspec на панели. Каждая панель рисуется на своей маленькой фигуре,
+растр копируется в общий кадр нужного прямоугольника, кадр уходит в ffmpeg.
+    key(state)  — ключ содержимого панели (например, год): пока ключ тот же,
+                  панель не перерисовывается, в кадр копируется прошлый растр
+    workers > 1 — панели делятся между процессами; процессы пишут прямо в
+                  кольцо кадров в общей памяти, главный процесс отдает
+                  готовые кадры кодировщику по порядку
+Состояние кадра prep(i) каждый процесс считает сам: передаются только номера.
+
+Скрипт задает только make_figure(fmt) -> (fig, axes) и панели; макет и
+выбор пути рендера общие:
+    workers=0  — кадр одной фигурой (compose), все форматы за один проход
+                 (frame_pipe.render_targets); путь по умолчанию
+    workers≠0  — панели на своих холстах, проход на каждый формат (None —
+                 процессов по ядрам задачи). Выигрыш — только при свободных ядрах
+
+    # panels — по одной на ось: [(make(ax) -> draw(state), key(state) | None)]
+    PANELS = [(year_panel, itemgetter(-1)), (speed_panel, None)]
+    LAYOUTS = {fmt: compose(make_figure(fmt), PANELS) for fmt in FORMATS}
+    render_formats(LAYOUTS, range(n), frame_data, PANELS, 'out.mp4', fps=60,
+                   workers=0, codec='libx264', extra_args=['-pix_fmt', 'yuv420p'])
+"""
+
+import multiprocessing as mp
+import queue
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+
+import frame_trace
+import render_jobs
+from frame_pipe import FramePipe, even_size, render_targets
+
+TRACE = frame_trace.get()
+
+RING = 8   # Кадров в кольце общей памяти (в работе одновременно)
+
+
+# --- ГЕОМЕТРИЯ ---
+def _cell_bounds(starts, ends, first, last, lo, hi):
+    """Ячейка сетки с половиной зазора до соседей (у края — до края фигуры)"""
+    a = lo if first == 0 else (ends[first - 1] + starts[first]) / 2
+    b = hi if last == len(starts) - 1 else (ends[last] + starts[last + 1]) / 2
+    return a, b
+
+
+def split(fig, axes):
+    """
+    Прямоугольники панелей в пикселях кадра (x, y сверху, w, h) и положение
+    оси внутри своей панели (доли панели, как Figure.add_axes)
+    """
+    W, H = fig.canvas.get_width_height(physical=True)
+    out = []
+    for ax in axes:
+        ss = ax.get_subplotspec()
+        bottoms, tops, lefts, rights = ss.get_gridspec().get_grid_positions(fig)
+        r0, r1 = ss.rowspan.start, ss.rowspan.stop - 1
+        c0, c1 = ss.colspan.start, ss.colspan.stop - 1
+        # Строки gridspec идут сверху вниз: считаем расстояние от верха фигуры
+        top, bottom = _cell_bounds(1 - tops, 1 - bottoms, r0, r1, 0.0, 1.0)
+        left, right = _cell_bounds(lefts, rights, c0, c1, 0.0, 1.0)
+        x0, x1 = round(left * W), round(right * W)
+        y0, y1 = round(top * H), round(bottom * H)
+        fx0, fy0, fw, fh = x0 / W, 1 - y1 / H, (x1 - x0) / W, (y1 - y0) / H
+        p = ax.get_position()
+        out.append(((x0, y0, x1 - x0, y1 - y0),
+                    ((p.x0 - fx0) / fw, (p.y0 - fy0) / fh, p.width / fw, p.height / fh)))
+    return out
+
+
+class Panel:
+    """Одна ось макета на своей фигуре; растр панели кэшируется по key(state)"""
+
+    def __init__(self, rect, pos, make, key, dpi, facecolor):
+        self.rect = rect
+        x, y, w, h = rect
+        # Запас на округление: холст Agg — ровно w x h пикселей
+        self.fig = Figure(figsize=((w + 0.01) / dpi, (h + 0.01) / dpi), dpi=dpi, facecolor=facecolor)
+        FigureCanvasAgg(self.fig)
+        self.draw = make(self.fig.add_axes(pos))
+        self.key = key
+        self._last = self._raster = None
+        self.drawn = self.cached = 0
+
+    def raster(self, state):
+        k = self.key(state) if self.key else None
+        if self._raster is not None and self.key and k == self._last:
+            self.cached += 1
+            return self._raster
+        TRACE.attach(self.fig)
+        with TRACE.stage('artists'):
+            self.draw(state)
+        self.fig.canvas.draw()
+        x, y, w, h = self.rect
+        self._raster = np.asarray(self.fig.canvas.buffer_rgba())[:h, :w]
+        if self.key:
+            self._raster = self._raster.copy()   # Холст перерисуется, кэш — копия
+        self._last = k
+        self.drawn += 1
+        return self._raster
+
+    def blit(self, frame, state):
+        x, y, w, h = self.rect
+        frame[y:y + h, x:x + w] = self.raster(state)
+
+
+def _background(fig, shape):
+    """Кадр, залитый фоном фигуры (ячейки сетки без панелей)"""
+    frame = np.empty(shape, np.uint8)
+    frame[:] = (to_rgba_array(fig.get_facecolor())[0] * 255).round().astype(np.uint8)
+    return frame
+
+
+# --- ПРОЦЕССЫ ПАНЕЛЕЙ ---
+def _worker(specs, prep, dpi, facecolor, shm_name, shape, tasks, done):
+    """Процесс рисует свои панели каждого кадра прямо в слот кольца"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray(shape, np.uint8, buffer=shm.buf)
+    panels = [Panel(rect, pos, make, key, dpi, facecolor) for rect, pos, make, key in specs]
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        n, i = task
+        state = prep(i)
+        for p in panels:
+            p.blit(ring[n % len(ring)], state)
+        done.put(n)
+    done.put(('stats', sum(p.drawn for p in panels), sum(p.cached for p in panels)))
+    del ring
+    shm.close()
+
+
+def render(frames, prep, fig, axes, panels, out_file, fps, workers=None, **pipe_kwargs):
+    """
+    frames  — номера кадров (prep(i) -> состояние кадра)
+    fig     — полный макет (размер, DPI, фон); axes — его оси, по одной на панель
+    panels  — [(make, key)] по осям: make(ax) -> draw(state), key(state) -> ключ кэша или None
+    workers — процессов на панели (None — по ядрам задачи; 0/1 — в этом процессе)
+    pipe_kwargs — параметры FramePipe (codec, bitrate, extra_args, profiles).
+    Возвращает статистику: кадров, перерисовок панелей, панелей из кэша, файлы.
+    """
+    frames = list(frames)
+    even_size(fig)
+    dpi = fig.dpi
+    W, H = fig.canvas.get_width_height(physical=True)
+    facecolor = fig.get_facecolor()
+    specs = [(rect, pos, make, key) for (rect, pos), (make, key) in zip(split(fig, axes), panels)]
+    background = _background(fig, (H, W, 4))
+
+    if workers is None:
+        workers = render_jobs.job_cpus()
+    workers = min(workers, len(specs))
+    stats = {'frames': len(frames), 'drawn': 0, 'cached': 0, 'workers': max(workers, 1)}
+
+    with FramePipe(out_file, W, H, fps, pix_fmt='rgba', **pipe_kwargs) as pipe:
+        if workers <= 1:
+            local = [Panel(rect, pos, make, key, dpi, facecolor) for rect, pos, make, key in specs]
+            frame = background.copy()
+            for n, i in enumerate(frames):
+                TRACE.frame()
+                with TRACE.stage('prep'):
+                    state = prep(i)
+                for p in local:
+                    p.blit(frame, state)
+                pipe.write(frame)
+                _progress(n, len(frames))
+            stats['drawn'] = sum(p.drawn for p in local)
+            stats['cached'] = sum(p.cached for p in local)
+            stats['outputs'] = pipe.outputs
+            return stats
+
+        # --- Несколько процессов: кольцо кадров в общей памяти ---
+        ring_n = min(RING, len(frames)) or 1
+        shm = shared_memory.SharedMemory(create=True, size=ring_n * H * W * 4)
+        ring = np.ndarray((ring_n, H, W, 4), np.uint8, buffer=shm.buf)
+        ring[:] = background
+        ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+        done = ctx.Queue()
+        queues, procs = [], []
+        try:
+            for k in range(workers):
+                q = ctx.Queue()
+                proc = ctx.Process(target=_worker, daemon=True,
+                                   args=(specs[k::workers], prep, dpi, facecolor, shm.name, ring.shape, q, done))
+                proc.start()
+                queues.append(q)
+                procs.append(proc)
+
+            ready = {}   # Кадр -> сколько процессов его закончили
+            for n, i in enumerate(frames[:ring_n]):
+                for q in queues:
+                    q.put((n, i))
+            for n in range(len(frames)):
+                # Слоты кольца переиспользуются: кадр n + ring_n ставится после записи кадра n
+                while ready.get(n, 0) < workers:
+                    msg = _get(done, procs)
+                    ready[msg] = ready.get(msg, 0) + 1
+                del ready[n]
+                TRACE.frame()
+                pipe.write(ring[n % ring_n])
+                if n + ring_n < len(frames):
+                    for q in queues:
+                        q.put((n + ring_n, frames[n + ring_n]))
+                _progress(n, len(frames))
+            for q in queues:
+                q.put(None)
+            for _ in procs:
+                msg = _get(done, procs)
+                stats['drawn'] += msg[1]
+                stats['cached'] += msg[2]
+            for proc in procs:
+                proc.join()
+        finally:
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+            del ring
+            shm.close()
+            shm.unlink()
+        stats['outputs'] = pipe.outputs
+    return stats
+
+
+# --- МАКЕТ И ВЫБОР ПУТИ РЕНДЕРА ---
+def compose(figure, panels):
+    """
+    Все панели на одной фигуре: figure — (fig, axes) из make_figure скрипта,
+    panels — [(make, key)] по осям. Возвращает (fig, draw); draw.axes — оси панелей.
+    """
+    fig, axes = figure
+    drawers = [make(ax) for (make, _), ax in zip(panels, axes)]
+
+    def draw(state):
+        for d in drawers:
+            d(state)
+
+    draw.axes = axes
+    return fig, draw
+
+
+def traced(prep):
+    """prep(i) под этапом 'prep' трассы кадров"""
+    def frame_state(i):
+        with TRACE.stage('prep'):
+            return prep(i)
+    return frame_state
+
+
+def output_names(output_file, formats):
+    """Один формат — прежнее имя файла, несколько — суффикс формата (_9x16)"""
+    formats = list(formats)
+    if len(formats) == 1:
+        return {formats[0]: output_file}
+    root, ext = output_file.rsplit('.', 1)
+    return {fmt: f"{root}_{fmt.replace(':', 'x')}.{ext}" for fmt in formats}
+
+
+def render_formats(layouts, frames, prep, panels, output_file, fps, workers=0, dpi=None, **pipe_kwargs):
+    """
+    layouts — {формат: (fig, draw)} из compose; prep(i) -> состояние кадра.
+    workers=0 — все форматы одним проходом render_targets; иначе render() на
+    каждый формат с геометрией панелей, взятой с фигуры макета.
+    Возвращает список записанных файлов.
+    """
+    names = output_names(output_file, layouts)
+    for fig, _ in layouts.values():
+        if dpi:
+            fig.set_dpi(dpi)
+    if workers == 0:
+        targets = [(fig, draw, names[fmt]) for fmt, (fig, draw) in layouts.items()]
+        return render_targets(frames, traced(prep), targets, fps, **pipe_kwargs)
+
+    saved = []
+    for fmt, (fig, draw) in layouts.items():
+        stats = render(frames, prep, fig, draw.axes, panels, names[fmt], fps, workers=workers, **pipe_kwargs)
+        print(f"   {fmt}: процессов {stats['workers']}, перерисовок панелей {stats['drawn']}, "
+              f"из кэша {stats['cached']}")
+        saved += stats['outputs']
+    return saved
+
+
+def _get(done, procs):
+    """Сообщение от процессов панелей; упавший процесс — ошибка, а не вечное ожидание"""
+    while True:
+        try:
+            return done.get(timeout=1)
+        except queue.Empty:
+            dead = [p for p in procs if p.exitcode not in (None, 0)]
+            if dead:
+                raise RuntimeError(f"процесс панелей завершился с кодом {dead[0].exitcode}")
+
+
+def _progress(n, total):
+    if n % 30 == 0:
+        print(f"Rendering: {int(n / total * 100)}%", end='\r', file=sys.stderr)
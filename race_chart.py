@@ -7,34 +7,47 @@
 
 import pandas as pd
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 from matplotlib.ticker import StrMethodFormatter
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 import numpy as np
 import subprocess
 import os
 import re
+from functools import lru_cache
 from tqdm import tqdm
+import datasets
+import frame_cache
+import frame_trace
+import layout_lock
+import render_jobs
+from bar_race import TopK
+from frame_pipe import ladder_args, ladder_filename, render_targets
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 
 # --- 1. ГЛОБАЛЬНЫЕ НАСТРОЙКИ (SETTINGS) ---
 SETTINGS = {
     'FILENAME': 'car_sales.csv',    # Имя файла с данными
-    'ORIENTATION': '9:16',          # '9:16' (Shorts/TikTok) или '16:9' (YouTube)
+    'ORIENTATION': '9:16',          # '9:16' (Shorts/TikTok), '16:9' (YouTube) или оба: ['9:16', '16:9']
     'LOGO_DIR': 'logos',            # Папка с PNG логотипами
     'SHOW_LOGOS': True,             # Отображать логотипы на барах
     
     # ПАРАМЕТРЫ СКОРОСТИ
-    'APPLY_SLOWMO': False,          # ВКЛЮЧИТЬ замедление через FFmpeg
+    'APPLY_SLOWMO': False,          # ВКЛЮЧИТЬ замедление (кадры досчитываются из данных)
     'SPEED_FACTOR': 0.15,           # Коэффициент замедления (0.15 = 15% от ориг. скорости)
     
     # ТЕХНИЧЕСКИЕ НАСТРОЙКИ
     'USE_GPU': False,               # Поставьте True только если есть NVIDIA GPU
     'VIDEO_FPS': 60,                # Частота кадров
-    'DPI': 144,                     # Качество изображения
+    'DPI': 144,                     # Качество изображения (рендер один раз в максимальном разрешении)
+    'PROFILES': None,               # Лестница качеств (frame_pipe), например [{'name': '1080p', 'height': 1920, 'bitrate': '6M'}, {'name': '720p', 'height': 1280, 'bitrate': '3M'}]
     'FRAMES_PER_YEAR': 15,          # Количество кадров анимации на один год
-    'EXTRA_FINAL_PAUSE': 5          # ЗАПАС В КОНЦЕ (сек): чтобы видео не обрывалось на 2025!
+    'TOP_N': 10,                    # Сколько брендов на экране
+    'EXTRA_FINAL_PAUSE': 5,         # ЗАПАС В КОНЦЕ (сек): чтобы видео не обрывалось на 2025!
+    'FRAME_CACHE': True             # Кэш кадров (.cache/frames): повторный рендер только измененных кадров
 }
+render_jobs.apply_settings(SETTINGS)  # Переопределения из очереди render_jobs
 
 # Настройка шрифтов (Arial лучше всего подходит для английского языка)
 plt.rcParams['font.family'] = 'Arial'
@@ -49,98 +62,189 @@ COLORS = {
 }
 
 # --- 2. ПОДГОТОВКА ДАННЫХ ---
+def frames_per_year():
+    """
+    Кадров на год с учетом замедления: slow-motion — это просто больше
+    промежуточных кадров из тех же данных (точные кадры, без minterpolate)
+    """
+    if SETTINGS['APPLY_SLOWMO']:
+        return SETTINGS['FRAMES_PER_YEAR'] / SETTINGS['SPEED_FACTOR']
+    return SETTINGS['FRAMES_PER_YEAR']
+
 def prepare_data():
     """Загрузка CSV и создание плавных переходов между годами"""
     if not os.path.exists(SETTINGS['FILENAME']):
         raise FileNotFoundError(f"Файл {SETTINGS['FILENAME']} не найден!")
     
-    df = pd.read_csv(SETTINGS['FILENAME']).set_index('Year')
+    df = datasets.load(SETTINGS['FILENAME'])  # Индекс Year задан схемой datasets
     # Линейная интерполяция данных
     years_expanded = np.linspace(df.index.min(), df.index.max(), 
-                                 num=int((df.index.max() - df.index.min()) * SETTINGS['FRAMES_PER_YEAR']))
+                                 num=int(round((df.index.max() - df.index.min()) * frames_per_year())))
     df_interp = df.reindex(df.index.union(years_expanded)).interpolate(method='linear').reindex(years_expanded)
     return df_interp, years_expanded
 
 # --- 3. НАСТРОЙКА ВИЗУАЛИЗАЦИИ ---
-# Автоматический выбор размеров под формат видео
-if SETTINGS['ORIENTATION'] == '9:16':
-    fig, ax = plt.subplots(figsize=(7, 12.4))
-    TITLE_SIZE, LABEL_SIZE, YEAR_SIZE, LOGO_ZOOM = 22, 16, 75, 0.15
-else:
-    fig, ax = plt.subplots(figsize=(12.5, 7))
-    TITLE_SIZE, LABEL_SIZE, YEAR_SIZE, LOGO_ZOOM = 18, 14, 60, 0.22
+# Несколько форматов рендерятся за один проход: данные и логотипы общие
+ORIENTATIONS = [SETTINGS['ORIENTATION']] if isinstance(SETTINGS['ORIENTATION'], str) else list(SETTINGS['ORIENTATION'])
 
-def draw_barchart(current_year):
-    """Функция отрисовки каждого кадра анимации с исправленным положением текста"""
-    d = df.loc[current_year].sort_values(ascending=True).tail(10)
-    ax.clear()
-    
-    y_pos = np.arange(len(d))
-    bar_colors = [COLORS.get(x, '#adb5bd') for x in d.index]
-    
-    ax.barh(y_pos, d.values, color=bar_colors, height=0.8)
-    
-    # Оформление осей
+@lru_cache(maxsize=None)
+def load_logo(name):
+    """Логотип бренда (читается с диска один раз на весь рендер)"""
+    logo_path = os.path.join(SETTINGS['LOGO_DIR'], f"{name}.png")
+    return plt.imread(logo_path) if os.path.exists(logo_path) else None
+
+def logo_files():
+    """Файлы логотипов брендов ролика: имя -> (mtime, размер) или None — для ключа кэша кадров"""
+    files = {}
+    for name in df.columns:
+        path = os.path.join(SETTINGS['LOGO_DIR'], f"{name}.png")
+        st = os.stat(path) if os.path.exists(path) else None
+        files[str(name)] = (st.st_mtime_ns, st.st_size) if st else None
+    return files
+
+_top = {}
+
+def top_k():
+    """Top-N по матрице кадры × бренды (bar_race.TopK): строится один раз на df"""
+    if _top.get('df') is not df:
+        _top.update(df=df, engine=TopK(df.to_numpy(), SETTINGS['TOP_N']))
+    return _top['engine']
+
+def frame_state(current_year):
+    """Данные кадра — общие для всех форматов"""
+    with TRACE.stage('prep'):
+        ids, values = top_k()(df.index.get_loc(current_year))
+        d = pd.Series(values, index=df.columns[ids])
+    return current_year, d
+
+def make_layout(orientation):
+    """Фигура и функция отрисовки кадра для одного формата"""
+    # Автоматический выбор размеров под формат видео
+    if orientation == '9:16':
+        fig, ax = plt.subplots(figsize=(7, 12.4))
+        TITLE_SIZE, LABEL_SIZE, YEAR_SIZE, LOGO_ZOOM = 22, 16, 75, 0.15
+    else:
+        fig, ax = plt.subplots(figsize=(12.5, 7))
+        TITLE_SIZE, LABEL_SIZE, YEAR_SIZE, LOGO_ZOOM = 18, 14, 60, 0.22
+
+    # --- Статичное оформление: один раз на фигуру (без ax.clear на кадре) ---
     ax.set_xlim(0, 13)
     ax.xaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}M'))
     ax.xaxis.set_ticks_position('top')
     ax.tick_params(axis='x', colors='#777777', labelsize=LABEL_SIZE-4)
-    
-    ax.set_yticks(y_pos)
-    ax.set_yticklabels(d.index, size=LABEL_SIZE, fontweight='bold', color='#333333')
-    
-    for i, (value, name) in enumerate(zip(d.values, d.index)):
-        ax.text(value + 0.2, i, f'{value:,.1f}M', ha='left', va='center', 
-                size=LABEL_SIZE, fontweight='bold', color='#444444')
+    for spine in ax.spines.values(): spine.set_visible(False)
+
+    # 1. Год внизу справа (y 0.05 для 9:16); кадр меняет только текст
+    y_year_pos = 0.05 if orientation == '9:16' else 0.1
+    year_text = ax.text(0.95, y_year_pos, '', transform=ax.transAxes,
+                        color='#00CC00', size=YEAR_SIZE, ha='right', weight=900, alpha=0.7)
+
+    # 2. Заголовок (для 9:16 сдвигается влево при расчете полей)
+    title = ax.set_title('NEXUS INNOVATE: GLOBAL CAR SALES', size=TITLE_SIZE,
+                         loc='left', weight='bold', pad=40)
+
+    dynamic = []   # Столбцы, подписи и логотипы текущего кадра
+    frozen = []    # Поля фигуры посчитаны (по худшему кадру всего ролика)
+
+    def draw_content(current_year, d):
+        for artist in dynamic:
+            artist.remove()
+        dynamic.clear()
+
+        y_pos = np.arange(len(d))
+        bar_colors = [COLORS.get(x, '#adb5bd') for x in d.index]
+        
+        dynamic.append(ax.barh(y_pos, d.values, color=bar_colors, height=0.8))
+        ax.set_yticks(y_pos)
+        ax.set_yticklabels(d.index, size=LABEL_SIZE, fontweight='bold', color='#333333')
         
-        if SETTINGS['SHOW_LOGOS']:
-            logo_path = os.path.join(SETTINGS['LOGO_DIR'], f"{name}.png")
-            if os.path.exists(logo_path):
-                img = plt.imread(logo_path)
-                imagebox = OffsetImage(img, zoom=LOGO_ZOOM)
-                ab = AnnotationBbox(imagebox, (value - 0.5, i), frameon=False, box_alignment=(1, 0.5))
-                ax.add_artist(ab)
+        for i, (value, name) in enumerate(zip(d.values, d.index)):
+            dynamic.append(ax.text(value + 0.2, i, f'{value:,.1f}M', ha='left', va='center',
+                                   size=LABEL_SIZE, fontweight='bold', color='#444444'))
+            
+            if SETTINGS['SHOW_LOGOS']:
+                img = load_logo(name)
+                if img is not None:
+                    imagebox = OffsetImage(img, zoom=LOGO_ZOOM)
+                    ab = AnnotationBbox(imagebox, (value - 0.5, i), frameon=False, box_alignment=(1, 0.5))
+                    dynamic.append(ax.add_artist(ab))
 
-    
-    # 1. Опускаем год вниз (изменили y_year_pos с 0.15 на 0.05)
-    y_year_pos = 0.05 if SETTINGS['ORIENTATION'] == '9:16' else 0.1
-    ax.text(0.95, y_year_pos, int(current_year), transform=ax.transAxes, 
-            color='#00CC00', size=YEAR_SIZE, ha='right', weight=900, alpha=0.7)
+        year_text.set_text(int(current_year))
 
-    # 2. Смещаем заголовок влево (добавили параметр x=-0.15)
-    title_x = -0.15 if SETTINGS['ORIENTATION'] == '9:16' else 0
-    plt.title('NEXUS INNOVATE: GLOBAL CAR SALES', size=TITLE_SIZE, 
-              loc='left', weight='bold', pad=40, x=title_x)
+    def freeze_layout():
+        """
+        3. Поля фигуры — один раз по худшему кадру всего ролика: самые
+        широкие имена брендов, самое большое значение, самый длинный год
+        """
+        names = layout_lock.by_width(fig, df.columns, size=LABEL_SIZE, fontweight='bold')
+        n = min(SETTINGS['TOP_N'], len(names))
+        worst = pd.Series(np.nanmax(df.to_numpy()), index=names[:n])
+        longest_year = layout_lock.by_width(fig, np.unique(df.index.astype(int)), size=YEAR_SIZE, weight=900)[0]
+        layout_lock.freeze(fig, lambda: draw_content(longest_year, worst))
+        if orientation == '9:16':
+            # Длинный заголовок узкого кадра начинается от левого края имен брендов
+            pos = ax.get_position()
+            x0 = ax.yaxis.get_tightbbox(fig.canvas.get_renderer()).x0 / fig.bbox.width
+            title.set_x(min(0, (x0 - pos.x0) / pos.width))
+            layout_lock.freeze(fig)
+        frozen.append(True)
 
-    for spine in ax.spines.values(): spine.set_visible(False)
-    
-    # 3. Настройка отступов всей фигуры, чтобы текст не обрезался
-    plt.subplots_adjust(left=0.15, right=0.95, top=0.88, bottom=0.08)
+    def draw(state):
+        """Функция отрисовки каждого кадра: меняются только данные, макет зафиксирован"""
+        if not frozen:
+            freeze_layout()
+        draw_content(*state)
+
+    def layout():
+        """Зафиксированный макет (поля, шкала, сдвиг заголовка) — входит в ключ кэша кадров"""
+        if not frozen:
+            freeze_layout()
+        return {'axes': tuple(ax.get_position().bounds), 'xlim': ax.get_xlim(),
+                'title_x': title.get_position()[0]}
+
+    draw.layout = layout
+    return fig, draw
+
+LAYOUTS = {o: make_layout(o) for o in ORIENTATIONS}
+fig, draw_frame = LAYOUTS[ORIENTATIONS[0]]
+
+def draw_barchart(current_year):
+    """Кадр основного формата (одиночный рендер / бенчмарк)"""
+    draw_frame(frame_state(current_year))
 
 # --- 4. FFmpeg ОБРАБОТКА (ИСПРАВЛЕННАЯ) ---
+def encoder():
+    """Кодек и пресет финального видео"""
+    if SETTINGS['USE_GPU']:
+        return 'h264_nvenc', 'p4'
+    return 'libx264', 'medium'
+
 def run_ffmpeg_processing(input_file, output_file):
     """Сборка финального видео без ошибок с "0 длиной"""
-    codec = 'h264_nvenc' if SETTINGS['USE_GPU'] else 'libx264'
-    preset = 'p4' if SETTINGS['USE_GPU'] else 'medium'
+    codec, preset = encoder()
     
+    # Замедление уже заложено в кадры (frames_per_year), здесь только перекодирование
     if SETTINGS['APPLY_SLOWMO']:
-        print(f"\n--- ПРИМЕНЕНИЕ SLOW-MOTION (x{SETTINGS['SPEED_FACTOR']}) ---")
-        pts_multiplier = 1 / SETTINGS['SPEED_FACTOR']
-        # ИСПРАВЛЕНИЕ: Удален scdet для совместимости
-        filter_str = f"setpts={pts_multiplier}*PTS,minterpolate=mi_mode=mci:mc_mode=aobmc:vsbmc=1"
-        total_duration = (len(extended_frames) / SETTINGS['VIDEO_FPS']) * pts_multiplier
+        print(f"\n--- РЕЖИМ: SLOW-MOTION (x{SETTINGS['SPEED_FACTOR']}, кадры из данных) ---")
     else:
         print("\n--- РЕЖИМ: ОБЫЧНАЯ СКОРОСТЬ ---")
-        filter_str = "null"
-        total_duration = len(extended_frames) / SETTINGS['VIDEO_FPS']
+    filter_str = "null"
+    total_duration = len(extended_frames) / SETTINGS['VIDEO_FPS']
 
-    cmd = [
-        'ffmpeg', '-y', '-hide_banner', '-i', input_file,
-        '-vf', filter_str,
-        '-c:v', codec, '-preset', preset,
-        '-b:v', '6M', '-pix_fmt', 'yuv420p',
-        output_file
-    ]
+    if SETTINGS['PROFILES']:
+        # Все варианты лестницы из одного декодирования: split/scale в одном процессе
+        profiles = [dict({'bitrate': '6M'}, **p) for p in SETTINGS['PROFILES']]
+        print("Варианты: " + ", ".join(ladder_filename(output_file, p) for p in profiles))
+        cmd = ['ffmpeg', '-y', '-hide_banner'] + render_jobs.ffmpeg_progress_args(output_file) + ['-i', input_file] + \
+              ladder_args(output_file, profiles, codec, ['-preset', preset, '-pix_fmt', 'yuv420p'])
+    else:
+        cmd = [
+            'ffmpeg', '-y', '-hide_banner', *render_jobs.ffmpeg_progress_args(output_file), '-i', input_file,
+            '-vf', filter_str,
+            '-c:v', codec, '-preset', preset, *render_jobs.ffmpeg_thread_args(),
+            '-b:v', '6M', '-pix_fmt', 'yuv420p',
+            output_file
+        ]
 
     process = subprocess.Popen(cmd, stderr=subprocess.PIPE, universal_newlines=True, encoding='utf-8')
     pbar = tqdm(total=100, desc="Rendering Final Video", unit="%")
@@ -168,25 +272,49 @@ if __name__ == '__main__':
         extra_padding = [frames[-1]] * (SETTINGS['VIDEO_FPS'] * SETTINGS['EXTRA_FINAL_PAUSE'])
         extended_frames = np.concatenate([frames, extra_padding])
 
-        temp_raw = 'temp_raw.mp4'
-        final_video = f"nexus_innovate_race_{SETTINGS['ORIENTATION'].replace(':','x')}.mp4"
+
+        # Один проход по кадрам: каждый формат пишется в свой временный файл
+        targets, final_videos = [], []
+        for o, (f, draw) in LAYOUTS.items():
+            tag = o.replace(':', 'x')
+            f.set_dpi(SETTINGS['DPI'])
+            targets.append((f, draw, f"temp_raw_{tag}.mp4"))
+            final_videos.append(f"nexus_innovate_race_{tag}.mp4")
 
         # Удаление старых файлов
-        for f in [temp_raw, final_video]:
+        for f in [t[2] for t in targets] + final_videos:
             if os.path.exists(f): os.remove(f)
 
-        print(f"Этап 1: Генерация базовой анимации ({len(extended_frames)} кадров)...")
-        anim = animation.FuncAnimation(fig, draw_barchart, frames=extended_frames, interval=1000/SETTINGS['VIDEO_FPS'])
-        
-        # Сохранение временного файла
-        anim.save(temp_raw, writer='ffmpeg', fps=SETTINGS['VIDEO_FPS'], dpi=SETTINGS['DPI'])
-
-        # Этап 2: Финальная обработка через FFmpeg
-        run_ffmpeg_processing(temp_raw, final_video)
+        if SETTINGS['FRAME_CACHE']:
+            # Кэш: сегменты сразу в финальных параметрах кодирования, неизмененные — склейкой
+            states = [frame_state(y) for y in extended_frames]
+            codec, preset = encoder()
+            style = {k: SETTINGS[k] for k in ('SHOW_LOGOS', 'LOGO_DIR')}
+            if SETTINGS['SHOW_LOGOS']:
+                style['logos'] = logo_files()   # Замененный или новый PNG сбрасывает кэш
+            for (f, draw, temp_raw), final_video, o in zip(targets, final_videos, LAYOUTS):
+                print(f"Этап 1: Рендер с кэшем кадров ({len(states)} кадров, формат {o})...")
+                out = temp_raw if SETTINGS['PROFILES'] else final_video
+                stats = frame_cache.render(states, draw, f, out, SETTINGS['VIDEO_FPS'],
+                                           style=dict(style, orientation=o, layout=draw.layout()), codec=codec,
+                                           extra_args=['-preset', preset, '-b:v', '6M', '-pix_fmt', 'yuv420p'])
+                print(f"   отрисовано {stats['drawn']}, из растров {stats['rasters']}, "
+                      f"сегментов из кэша {stats['segments_cached']}/{stats['segments']} за {stats['seconds']} с")
+                if SETTINGS['PROFILES']:
+                    run_ffmpeg_processing(temp_raw, final_video)
+                    os.remove(temp_raw)
+                print(f"\n✅ УСПЕХ! Видео готово: {final_video}")
+        else:
+            print(f"Этап 1: Генерация базовой анимации ({len(extended_frames)} кадров, форматы: {', '.join(LAYOUTS)})...")
+            render_targets(extended_frames, frame_state, targets, SETTINGS['VIDEO_FPS'],
+                           extra_args=['-pix_fmt', 'yuv420p'])
 
-        if os.path.exists(temp_raw): os.remove(temp_raw)
-        print(f"\n✅ УСПЕХ! Видео готово: {final_video}")
+            # Этап 2: Финальная обработка через FFmpeg
+            for (_, _, temp_raw), final_video in zip(targets, final_videos):
+                run_ffmpeg_processing(temp_raw, final_video)
+                if os.path.exists(temp_raw): os.remove(temp_raw)
+                print(f"\n✅ УСПЕХ! Видео готово: {final_video}")
         
 
     except Exception as e:
-        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
\ No newline at end of file
+        print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: {e}")
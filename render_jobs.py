@@ -0,0 +1,282 @@
+"""
+ЛОКАЛЬНАЯ ОЧЕРЕДЬ РЕНДЕРА С БЮДЖЕТОМ ЯДЕР И ПАМЯТИ
+
+Скрипты (бар-гонки, hp, пакеты фракталов) запускаются как задачи очереди.
+Одновременно работает столько задач, сколько помещается в общий бюджет
+ядер и памяти; каждой задаче выставляются свои потоки:
+    NUMBA_NUM_THREADS / OMP_NUM_THREADS — ядра Numba prange и BLAS
+    RENDER_THREADS                       — -threads для x264 (frame_pipe)
+Прогресс берется из вывода ffmpeg -progress (frame / fps / out_time).
+Оценка памяти задачи уточняется по пиковому RSS прошлых запусков скрипта.
+
+Файл задач — JSON-список:
+    [{"script": "race_chart.py", "settings": {"ORIENTATION": "16:9"}, "cpus": 2},
+     {"script": "hp_vertical.py", "settings": {"FPS": 30}, "mem_mb": 1500, "frames": 870},
+     {"script": "fractal/batch.py", "args": ["fractal", "--jobs", "1"], "cpus": 4}]
+settings переопределяют SETTINGS / константы скрипта (render_jobs.apply_settings).
+
+Запуск:
+    python render_jobs.py run jobs.json --cpus 8 --mem-budget 24000
+    python render_jobs.py status
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# --- НАСТРОЙКИ ---
+SETTINGS = {
+    'CPU_BUDGET': os.cpu_count() or 1,   # Ядер на все задачи сразу
+    'MEM_BUDGET_MB': None,               # Память на все задачи; None — 80% физической
+    'JOB_CPUS': 2,                       # Ядер на задачу по умолчанию
+    'JOB_MEM_MB': 2000,                  # Оценка памяти задачи без истории запусков
+    'STATE_DIR': os.path.join(ROOT, '.cache', 'jobs'),
+    'POLL': 0.5,                         # Период опроса задач, с
+}
+
+SETTINGS_ENV = 'RENDER_SETTINGS'   # JSON переопределений настроек скрипта
+THREADS_ENV = 'RENDER_THREADS'     # Потоки кодировщика x264
+PROGRESS_ENV = 'RENDER_PROGRESS'   # Папка для файлов ffmpeg -progress
+
+
+# --- СТОРОНА СКРИПТА ---
+def apply_settings(target):
+    """
+    Переопределения из задачи очереди: SETTINGS-словарь скрипта или globals()
+    для скриптов с константами. Неизвестный ключ — ошибка (опечатка в задаче).
+    """
+    raw = os.environ.get(SETTINGS_ENV)
+    if not raw:
+        return target
+    for key, value in json.loads(raw).items():
+        if key not in target:
+            raise KeyError(f"{SETTINGS_ENV}: неизвестная настройка {key}")
+        target[key] = value
+    return target
+
+
+def ffmpeg_progress_args(output_file):
+    """Глобальные аргументы ffmpeg задачи: -progress в папку задачи (пусто вне очереди)"""
+    progress_dir = os.environ.get(PROGRESS_ENV)
+    if not progress_dir:
+        return []
+    name = os.path.basename(output_file) + '.progress'
+    return ['-progress', os.path.join(progress_dir, name), '-stats_period', '1']
+
+
+def ffmpeg_thread_args():
+    """Потоки кодировщика задачи; ставятся после -c:v каждого выхода (пусто вне очереди)"""
+    threads = os.environ.get(THREADS_ENV)
+    return ['-threads', threads] if threads else []
+
+
+def job_cpus():
+    """Ядер задачи: выданные очередью (RENDER_THREADS), вне очереди — все ядра машины"""
+    return int(os.environ.get(THREADS_ENV) or os.cpu_count() or 1)
+
+
+# --- ОЦЕНКИ РЕСУРСОВ ---
+def physical_mem_mb():
+    try:
+        import psutil
+        return psutil.virtual_memory().total / 2**20
+    except ImportError:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 2**20
+
+
+def _history_path():
+    return os.path.join(SETTINGS['STATE_DIR'], 'history.json')
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def read_progress(progress_dir):
+    """Последний блок ffmpeg -progress по всем выходам задачи: кадры, fps, завершенность"""
+    frame, fps, ended = 0, 0.0, []
+    if not os.path.isdir(progress_dir):
+        return None
+    for name in os.listdir(progress_dir):
+        last, block = None, {}
+        with open(os.path.join(progress_dir, name), encoding='utf-8', errors='replace') as f:
+            for line in f:
+                key, _, value = line.strip().partition('=')
+                block[key] = value
+                if key == 'progress':   # Конец блока
+                    last, block = block, {}
+        if last is None:
+            continue
+        frame = max(frame, int(last.get('frame', 0) or 0))
+        fps = max(fps, float(last.get('fps', 0) or 0))
+        ended.append(last.get('progress') == 'end')
+    return {'frame': frame, 'fps': fps, 'ended': bool(ended) and all(ended)}
+
+
+# --- ЗАДАЧИ ---
+class Job:
+    def __init__(self, spec, index):
+        self.script = spec['script']
+        self.name = spec.get('name') or f"{index:02d}_{os.path.splitext(os.path.basename(self.script))[0]}"
+        self.settings = spec.get('settings', {})
+        self.args = [str(a) for a in spec.get('args', [])]
+        self.cpus = int(spec.get('cpus', SETTINGS['JOB_CPUS']))
+        self.mem_mb = spec.get('mem_mb')
+        self.frames = spec.get('frames')
+        self.state, self.proc, self.code = 'queued', None, None
+        self.started = self.finished = None
+        self.peak_mb = None
+
+    @property
+    def progress_dir(self):
+        return os.path.join(SETTINGS['STATE_DIR'], self.name)
+
+    def env(self):
+        env = dict(os.environ, MPLBACKEND='Agg', PYTHONUNBUFFERED='1')
+        threads = str(self.cpus)
+        env.update(NUMBA_NUM_THREADS=threads, OMP_NUM_THREADS=threads, MKL_NUM_THREADS=threads,
+                   OPENBLAS_NUM_THREADS=threads)
+        env[THREADS_ENV] = threads
+        env[PROGRESS_ENV] = self.progress_dir
+        if self.settings:
+            env[SETTINGS_ENV] = json.dumps(self.settings, ensure_ascii=False)
+        return env
+
+    def start(self):
+        script = os.path.join(ROOT, self.script)
+        os.makedirs(self.progress_dir, exist_ok=True)
+        for old in os.listdir(self.progress_dir):
+            os.remove(os.path.join(self.progress_dir, old))
+        self._log = open(os.path.join(SETTINGS['STATE_DIR'], f"{self.name}.log"), 'w', encoding='utf-8')
+        # Рабочая папка — папка скрипта: относительные пути к данным и логотипам как при ручном запуске
+        self.proc = subprocess.Popen([sys.executable, script] + self.args, cwd=os.path.dirname(script),
+                                     env=self.env(), stdout=self._log, stderr=subprocess.STDOUT)
+        self.state, self.started = 'running', time.time()
+
+    def poll(self):
+        """True, если задача завершилась; пиковый RSS берется из rusage дочернего процесса"""
+        if hasattr(os, 'wait4'):
+            pid, status, usage = os.wait4(self.proc.pid, os.WNOHANG)
+            if pid == 0:
+                return False
+            self.proc.returncode = os.waitstatus_to_exitcode(status)
+            self.peak_mb = usage.ru_maxrss / (2**20 if sys.platform == 'darwin' else 1024)
+        elif self.proc.poll() is None:
+            return False
+        self._log.close()
+        self.code = self.proc.returncode
+        self.state = 'done' if self.code == 0 else 'failed'
+        self.finished = time.time()
+        return True
+
+    def row(self):
+        now = self.finished or time.time()
+        row = {'name': self.name, 'script': self.script, 'state': self.state, 'cpus': self.cpus,
+               'mem_mb': round(self.mem_mb or 0), 'pid': self.proc.pid if self.proc else None,
+               'elapsed': round(now - self.started, 1) if self.started else 0.0,
+               'code': self.code, 'peak_mb': round(self.peak_mb) if self.peak_mb else None,
+               'frames_total': self.frames}
+        if self.started:
+            row.update(read_progress(self.progress_dir) or {})
+        return row
+
+
+def plan(job, history, cpu_budget):
+    """Ядра не больше бюджета; память — из задачи, истории скрипта или по умолчанию"""
+    job.cpus = max(1, min(job.cpus, cpu_budget))
+    if job.mem_mb is None:
+        job.mem_mb = history.get(job.script, SETTINGS['JOB_MEM_MB'])
+
+
+def run_queue(specs, cpu_budget=SETTINGS['CPU_BUDGET'], mem_budget_mb=SETTINGS['MEM_BUDGET_MB']):
+    mem_budget_mb = mem_budget_mb or physical_mem_mb() * 0.8
+    history = _read_json(_history_path(), {})
+    jobs = [Job(s, i) for i, s in enumerate(specs, 1)]
+    for job in jobs:
+        plan(job, history, cpu_budget)
+    status_path = os.path.join(SETTINGS['STATE_DIR'], 'status.json')
+    print(f">>> {len(jobs)} задач, бюджет: {cpu_budget} ядер, {mem_budget_mb:.0f} МБ")
+
+    queue, running = deque(jobs), []
+    t0 = time.time()
+    while queue or running:
+        for job in [j for j in running if j.poll()]:
+            running.remove(job)
+            if job.peak_mb and job.state == 'done':
+                history[job.script] = round(job.peak_mb * 1.1)  # Запас 10% к наблюдаемому пику
+            mark = '✔' if job.state == 'done' else '✘'
+            print(f"  {mark} {job.name}: {job.finished - job.started:.1f} с, код {job.code}, "
+                  f"пик RSS {job.peak_mb or 0:.0f} МБ")
+
+        # Порядок очереди с добором: следующая задача, которая помещается в свободный бюджет
+        free_cpu = cpu_budget - sum(j.cpus for j in running)
+        free_mem = mem_budget_mb - sum(j.mem_mb for j in running)
+        for job in list(queue):
+            if (job.cpus <= free_cpu and job.mem_mb <= free_mem) or not running:
+                queue.remove(job)
+                job.start()
+                running.append(job)
+                free_cpu -= job.cpus; free_mem -= job.mem_mb
+                print(f"  ▶ {job.name}: {job.cpus} ядер, ~{job.mem_mb:.0f} МБ")
+
+        _write_json(status_path, {'updated': time.time(), 'cpu_budget': cpu_budget,
+                                  'mem_budget_mb': round(mem_budget_mb), 'jobs': [j.row() for j in jobs]})
+        if queue or running:
+            time.sleep(SETTINGS['POLL'])
+
+    _write_json(_history_path(), history)
+    failed = sum(j.state == 'failed' for j in jobs)
+    print(f"\nГОТОВО за {(time.time() - t0) / 60:.1f} мин, ошибок: {failed}. Логи: {SETTINGS['STATE_DIR']}")
+    return failed
+
+
+def print_status():
+    data = _read_json(os.path.join(SETTINGS['STATE_DIR'], 'status.json'), None)
+    if not data:
+        print("Очередь еще не запускалась")
+        return
+    age = time.time() - data['updated']
+    print(f"Обновлено {age:.0f} с назад, бюджет: {data['cpu_budget']} ядер, {data['mem_budget_mb']} МБ")
+    print(f"{'задача':<28}{'состояние':<10}{'ядра':>5}{'МБ':>7}{'кадры':>12}{'fps':>7}{'время, с':>10}")
+    for r in data['jobs']:
+        frames = str(r.get('frame', ''))
+        if r.get('frames_total') and 'frame' in r:
+            frames = f"{r['frame']}/{r['frames_total']}"
+        fps = f"{r['fps']:.1f}" if r.get('fps') else ''
+        mem = r['peak_mb'] or r['mem_mb']
+        print(f"{r['name']:<28}{r['state']:<10}{r['cpus']:>5}{mem:>7}{frames:>12}{fps:>7}{r['elapsed']:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Локальная очередь рендера с бюджетом ядер и памяти")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="выполнить задачи из JSON-файла")
+    run.add_argument('jobs', help="JSON-список задач")
+    run.add_argument('--cpus', type=int, default=SETTINGS['CPU_BUDGET'])
+    run.add_argument('--mem-budget', type=float, default=SETTINGS['MEM_BUDGET_MB'])
+    sub.add_parser('status', help="состояние последней очереди")
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status()
+    else:
+        with open(args.jobs, encoding='utf-8') as f:
+            specs = json.load(f)
+        sys.exit(1 if run_queue(specs, args.cpus, args.mem_budget) else 0)
@@ -0,0 +1,84 @@
+"""
+КЭШ РАСТРОВ ТЕКСТА С ОБВОДКОЙ
+
+Подпись с path_effects.withStroke Agg рисует дважды (обводка + заливка)
+на каждом кадре. Строки подписей меняются редко (целое число км/ч, HP),
+поэтому каждая строка со своим стилем растрируется один раз, а на кадре
+выводится готовой картинкой (AnnotationBbox + OffsetImage).
+
+Размер на экране не зависит от DPI фигуры (zoom компенсирует DPI
+растра); для максимальной резкости создавайте кэш с DPI рендера.
+
+    sprites = TextSprites(dpi=120, fontsize=11, weight='bold', color='black',
+                          stroke=3, stroke_color='white')
+    ab = sprites.artist(ax, (x, y), "FERRARI (F40) | 324 km/h", ha='left')
+    sprites.set(ab, "FERRARI (F40) | 325 km/h")   # на следующем кадре
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import matplotlib.patheffects as path_effects
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+
+# ha / va -> box_alignment AnnotationBbox
+_ALIGN_X = {'left': 0.0, 'center': 0.5, 'right': 1.0}
+_ALIGN_Y = {'bottom': 0.0, 'center': 0.5, 'top': 1.0}
+
+
+class TextSprites:
+    """Строка -> RGBA-растр подписи (LRU на maxsize строк)"""
+
+    def __init__(self, dpi=100, maxsize=4096, stroke=3, stroke_color='white', **text_kw):
+        self.dpi, self.maxsize = dpi, maxsize
+        self.zoom = 72 / dpi
+        self.pad = int(np.ceil(stroke * dpi / 72)) + 2   # Поля под обводку
+        effects = [path_effects.withStroke(linewidth=stroke, foreground=stroke_color),
+                   path_effects.Normal()] if stroke else []
+        self._fig = Figure(dpi=dpi)
+        self._fig.patch.set_alpha(0)
+        self._canvas = FigureCanvasAgg(self._fig)
+        self._text = self._fig.text(0.5, 0.5, '', ha='center', va='center', path_effects=effects, **text_kw)
+        self._cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def _render(self, s):
+        self._text.set_text(s)
+        bb = self._text.get_window_extent(self._canvas.get_renderer())
+        w, h = int(np.ceil(bb.width)) + 2 * self.pad, int(np.ceil(bb.height)) + 2 * self.pad
+        self._fig.set_size_inches(w / self.dpi, h / self.dpi)
+        self._canvas.draw()
+        return np.asarray(self._canvas.buffer_rgba()).copy()
+
+    def image(self, s):
+        img = self._cache.get(s)
+        if img is not None:
+            self._cache.move_to_end(s)
+            self.hits += 1
+            return img
+        self.misses += 1
+        img = self._cache[s] = self._render(s)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return img
+
+    def artist(self, ax, xy, s, ha='left', va='center', **kw):
+        """Подпись-картинка в координатах данных ax"""
+        box = OffsetImage(self.image(s), zoom=self.zoom)
+        ax_, ay_ = _ALIGN_X[ha], _ALIGN_Y[va]
+        # Поля под обводку не должны сдвигать текст относительно точки привязки
+        pad_pt = self.pad * self.zoom
+        ab = AnnotationBbox(box, xy, xybox=((2 * ax_ - 1) * pad_pt, (2 * ay_ - 1) * pad_pt),
+                            boxcoords='offset points', frameon=False, pad=0,
+                            box_alignment=(ax_, ay_), **kw)
+        ab._sprite_text = s
+        ax.add_artist(ab)
+        return ab
+
+    def set(self, ab, s):
+        """Новая строка для существующей подписи (растр меняется, только если строка другая)"""
+        if ab._sprite_text != s:
+            ab.offsetbox.set_data(self.image(s))
+            ab._sprite_text = s
@@ -2,6 +2,9 @@
 import os
 import random
 from PIL import Image, ImageDraw, ImageFont
+import frame_trace
+
+TRACE = frame_trace.get()  # Покадровый замер этапов: FRAME_TRACE=1
 
 # --- ГЛОБАЛЬНЫЕ НАСТРОЙКИ ВИЗУАЛИЗАЦИИ ---
 INPUT_FILE = "input.txt"   # Исходный файл с данными (формат: Год | Язык | Ранг | Процент)
@@ -95,18 +98,14 @@ def generate_image(year, languages):
         os.makedirs(OUTPUT_DIR)
     
     # Сохраняем готовый файл в формате PNG
-    img.save(os.path.join(OUTPUT_DIR, f"{year}_stats.png"))
+    with TRACE.stage('encode'):
+        img.save(os.path.join(OUTPUT_DIR, f"{year}_stats.png"))
 
-def main():
+def load_languages(path=INPUT_FILE):
     """
-    Точка входа в программу. Отвечает за чтение данных и запуск цикла генерации.
+    Читает файл данных и группирует строки по годам: {год: [(название, ранг, процент), ...]}
     """
-    if not os.path.exists(INPUT_FILE):
-        print(f"Файл {INPUT_FILE} не найден!")
-        return
-
-    # Читаем данные из текстового файла
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
+    with open(path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
 
     # Группируем данные по годам (один год — много языков)
@@ -123,10 +122,23 @@ def main():
                 data_by_year[year] = []
             # Добавляем данные (Имя, Ранг, Процент) в список этого года
             data_by_year[year].append((parts[1], parts[2], parts[3]))
+    return data_by_year
+
+def main():
+    """
+    Точка входа в программу. Отвечает за чтение данных и запуск цикла генерации.
+    """
+    if not os.path.exists(INPUT_FILE):
+        print(f"Файл {INPUT_FILE} не найден!")
+        return
+
+    data_by_year = load_languages(INPUT_FILE)
 
     # Сортируем годы по порядку и запускаем генерацию для каждого
     for year in sorted(data_by_year.keys()):
-        generate_image(year, data_by_year[year])
+        TRACE.frame()
+        with TRACE.stage('draw'):
+            generate_image(year, data_by_year[year])
         print(f"Готово: {year}")
 
 if __name__ == "__main__":
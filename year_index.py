@@ -0,0 +1,51 @@
+"""
+ИНДЕКС «ГОД -> TOP-N» ДЛЯ ГОДОВЫХ БАР-ЧАРТОВ
+
+Строится один раз за проход сортировки + groupby: для каждого года хранятся
+уже упорядоченные строки top-N, готовые подписи и цвета. Кадр анимации
+получает всё по ключу — без фильтра df[df['Year'] == year] по всей таблице
+на каждом кадре.
+
+    index = YearTopN(df, 'Year', 'Horsepower', n=10,
+                     labels=lambda rows: rows['Engine_Name'].astype(str) + ' | ' + ...,
+                     colors=lambda rows: rows['Company'].map(company_colors))
+    entry = index[2005]   # entry.rows, entry.values, entry.labels, entry.colors
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+YearEntry = namedtuple('YearEntry', 'rows values labels colors')
+
+
+class YearTopN:
+    """Top-N строк каждого года по колонке value, по возрастанию (снизу вверх для barh)"""
+
+    def __init__(self, df, by, value, n=10, labels=None, colors=None):
+        # Стабильная сортировка: при равных значениях порядок как у nlargest(keep='first')
+        top = (df.sort_values([by, value], ascending=[True, False], kind='stable')
+                 .groupby(by, sort=True, observed=True).head(n))
+        # Внутри года — по возрастанию: нижний бар самый слабый
+        top = top.iloc[::-1].sort_values(by, kind='stable')
+
+        labels = list(labels(top)) if labels else [None] * len(top)
+        colors = list(colors(top)) if colors else [None] * len(top)
+        keys = top[by].to_numpy()
+        bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+
+        self.max_value = df[value].max()
+        self._entries = {}
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            rows = top.iloc[a:b]
+            self._entries[keys[a].item()] = YearEntry(rows, rows[value].to_numpy(), labels[a:b], colors[a:b])
+        self.years = sorted(self._entries)
+
+    def __getitem__(self, year):
+        return self._entries[year.item() if hasattr(year, 'item') else year]
+
+    def __contains__(self, year):
+        return (year.item() if hasattr(year, 'item') else year) in self._entries
+
+    def __len__(self):
+        return len(self._entries)